@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Shared test fixtures
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from core.llm.llm_manager import LLMManager
+from core.llm.quota_manager import QuotaManager
+
+def build_manager(clients, cache: bool = False) -> LLMManager:
+    """LLMManager over test clients with its own quota state, without loading provider config"""
+    manager = LLMManager(quota_manager=QuotaManager(), clients=clients)
+    manager.response_cache.enabled = cache
+    return manager
+
+@pytest.fixture
+def make_manager():
+    """Factory for LLMManager instances backed only by the given clients"""
+    return build_manager
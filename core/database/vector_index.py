@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Vector Index - Embedded cosine-similarity index used when Qdrant is unreachable
+"""
+
+import os
+import json
+import logging
+from typing import Dict, List, Optional, Any, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+class LocalVectorIndex:
+    """In-process vector index over one contiguous float32 matrix
+
+    Rows are stored L2-normalised, so cosine similarity is a dot product and
+    a batch of queries is scored with one matrix multiply. Search is exact
+    by default. With ivf_lists > 0 the collection is partitioned by k-means
+    once it holds ivf_min_size vectors, and a query only scores the rows of
+    its ivf_probes closest partitions (approximate, much less work).
+    Deleted rows are filled by the last row, keeping the matrix dense.
+    The index lives in memory; save() and load() persist it to an .npz file.
+    """
+
+    def __init__(self, dimension: Optional[int] = None, ivf_lists: int = 0, ivf_probes: int = 8,
+                 ivf_min_size: int = 50000, block_rows: int = 65536):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy is required for the local vector index")
+
+        self.logger = logging.getLogger("vector_index")
+        self.dimension = dimension
+        self.ivf_lists = ivf_lists
+        self.ivf_probes = ivf_probes
+        self.ivf_min_size = ivf_min_size
+        self.block_rows = block_rows
+
+        self.ids: List[str] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._vectors = None        # (capacity, dimension) float32, first len(self) rows in use
+
+        # IVF state: centroids (ivf_lists, dimension) and the partition of each row
+        self._centroids = None
+        self._assignments = None
+        self._trained_size = 0
+        self._list_rows = None      # Rows grouped by partition, rebuilt lazily after changes
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, point_id: str) -> bool:
+        return point_id in self._rows
+
+    def upsert(self, point_id: str, vector: Sequence[float], payload: Optional[Dict[str, Any]] = None):
+        """Add a vector, or replace the vector and payload stored under point_id"""
+        row_vector = self._normalize(self._as_matrix(vector))[0]
+
+        row = self._rows.get(point_id)
+        if row is None:
+            row = len(self.ids)
+            self._reserve(row + 1)
+            self._rows[point_id] = row
+            self.ids.append(point_id)
+            self.payloads.append(payload or {})
+        else:
+            self.payloads[row] = payload or {}
+
+        self._vectors[row] = row_vector
+        if self._centroids is not None:
+            self._assignments[row] = int(np.argmax(self._centroids @ row_vector))
+            self._list_rows = None
+        self._maybe_train()
+
+    def delete(self, point_id: str) -> bool:
+        """Remove a vector; returns False if the id is unknown"""
+        row = self._rows.pop(point_id, None)
+        if row is None:
+            return False
+
+        last = len(self.ids) - 1
+        if row != last:
+            moved_id = self.ids[last]
+            self._vectors[row] = self._vectors[last]
+            self.ids[row] = moved_id
+            self.payloads[row] = self.payloads[last]
+            self._rows[moved_id] = row
+            if self._centroids is not None:
+                self._assignments[row] = self._assignments[last]
+        self.ids.pop()
+        self.payloads.pop()
+        self._list_rows = None
+        return True
+
+    def search(self, query_vector: Sequence[float], limit: int = 5) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """Most similar (id, cosine score, payload) for one query, best first"""
+        return self.search_batch([query_vector], limit)[0]
+
+    def search_batch(self, query_vectors: Sequence[Sequence[float]],
+                     limit: int = 5) -> List[List[Tuple[str, float, Dict[str, Any]]]]:
+        """Most similar (id, cosine score, payload) for each query, best first"""
+        queries = self._normalize(self._as_matrix(query_vectors))
+        if not len(self.ids) or limit <= 0:
+            return [[] for _ in range(len(queries))]
+
+        if self._centroids is None:
+            top_rows, top_scores = self._exact_top(queries, limit)
+        else:
+            top_rows, top_scores = self._ivf_top(queries, limit)
+
+        return [
+            [(self.ids[row], float(score), self.payloads[row]) for row, score in zip(rows, scores)]
+            for rows, scores in zip(top_rows, top_scores)
+        ]
+
+    def _exact_top(self, queries, limit: int, rows=None):
+        """Top-limit rows per query, scanning the matrix in blocks to bound memory"""
+        count = len(self.ids) if rows is None else len(rows)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+
+        for start in range(0, count, self.block_rows):
+            stop = min(start + self.block_rows, count)
+            if rows is None:
+                block_rows = np.arange(start, stop)
+                block = self._vectors[start:stop]
+            else:
+                block_rows = rows[start:stop]
+                block = self._vectors[block_rows]
+
+            scores = np.concatenate([best_scores, queries @ block.T], axis=1)
+            candidates = np.concatenate([best_rows, np.broadcast_to(block_rows, (len(queries), len(block_rows)))], axis=1)
+            if scores.shape[1] > limit:
+                keep = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+                scores = np.take_along_axis(scores, keep, axis=1)
+                candidates = np.take_along_axis(candidates, keep, axis=1)
+            best_rows, best_scores = candidates, scores
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def _ivf_top(self, queries, limit: int):
+        """Score only the rows in each query's closest partitions"""
+        if self._list_rows is None:
+            assignments = self._assignments[:len(self.ids)]
+            order = np.argsort(assignments, kind="stable")
+            bounds = np.searchsorted(assignments[order], np.arange(len(self._centroids) + 1))
+            self._list_rows = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+
+        probes = min(self.ivf_probes, len(self._centroids))
+        nearest = np.argpartition(-(queries @ self._centroids.T), probes - 1, axis=1)[:, :probes]
+
+        top_rows, top_scores = [], []
+        for query, lists in zip(queries, nearest):
+            rows = np.concatenate([self._list_rows[i] for i in lists])
+            found_rows, found_scores = self._exact_top(query[None, :], limit, rows)
+            top_rows.append(found_rows[0])
+            top_scores.append(found_scores[0])
+        return top_rows, top_scores
+
+    def save(self, path: str):
+        """Write ids, vectors and payloads to path (.npz), replacing the file atomically"""
+        size = len(self.ids)
+        vectors = self._vectors[:size] if self._vectors is not None else np.empty((0, self.dimension or 0), np.float32)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, ids=np.array(self.ids, dtype=str), vectors=vectors,
+                     payloads=np.array(json.dumps(self.payloads)), dimension=np.array(self.dimension or 0))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.logger.info(f"Saved {size} vectors to {path}")
+
+    @classmethod
+    def load(cls, path: str, dimension: Optional[int] = None, **kwargs) -> "LocalVectorIndex":
+        """Index with the contents written by save() (kwargs as for the constructor)"""
+        with np.load(path, allow_pickle=False) as data:
+            saved_dimension = int(data["dimension"]) or None
+            ids = data["ids"].tolist()
+            vectors = data["vectors"]
+            payloads = json.loads(str(data["payloads"]))
+
+        if dimension and saved_dimension and dimension != saved_dimension:
+            raise ValueError(f"{path} holds vectors of dimension {saved_dimension}, expected {dimension}")
+
+        index = cls(dimension=dimension or saved_dimension, **kwargs)
+        if ids:
+            index._reserve(len(ids))
+            index._vectors[:len(ids)] = vectors
+            index.ids = ids
+            index.payloads = payloads
+            index._rows = {point_id: row for row, point_id in enumerate(ids)}
+            index._maybe_train()
+        return index
+
+    def _maybe_train(self):
+        """(Re)partition when IVF is on and the collection reached or doubled ivf_min_size"""
+        size = len(self.ids)
+        if self.ivf_lists <= 0 or size < max(self.ivf_min_size, self.ivf_lists):
+            return
+        if self._trained_size and size < self._trained_size * 2:
+            return
+        self.train_ivf()
+
+    def train_ivf(self, iterations: int = 10, sample_size: int = 100000, seed: int = 0):
+        """Cluster the stored vectors into ivf_lists partitions (spherical k-means)"""
+        size = len(self.ids)
+        vectors = self._vectors[:size]
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(size, min(size, sample_size), replace=False)]
+
+        centroids = sample[rng.choice(len(sample), self.ivf_lists, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for cluster in range(self.ivf_lists):
+                members = sample[labels == cluster]
+                if len(members):
+                    centroids[cluster] = members.sum(axis=0)
+            centroids = self._normalize(centroids)
+
+        self._centroids = centroids
+        self._assignments = np.empty(len(self._vectors), dtype=np.int32)
+        for start in range(0, size, self.block_rows):
+            stop = min(start + self.block_rows, size)
+            self._assignments[start:stop] = np.argmax(vectors[start:stop] @ centroids.T, axis=1)
+        self._trained_size = size
+        self._list_rows = None
+        self.logger.info(f"Partitioned {size} vectors into {self.ivf_lists} lists")
+
+    def _reserve(self, size: int):
+        """Grow the matrix (doubling) so it holds at least size rows"""
+        if self._vectors is not None and len(self._vectors) >= size:
+            return
+        capacity = max(size, 1024, 2 * (len(self._vectors) if self._vectors is not None else 0))
+        vectors = np.empty((capacity, self.dimension), dtype=np.float32)
+        if self._vectors is not None:
+            vectors[:len(self.ids)] = self._vectors[:len(self.ids)]
+        self._vectors = vectors
+
+        if self._assignments is not None:
+            assignments = np.empty(capacity, dtype=np.int32)
+            assignments[:len(self.ids)] = self._assignments[:len(self.ids)]
+            self._assignments = assignments
+
+    def _as_matrix(self, vectors):
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        if self.dimension is None:
+            self.dimension = matrix.shape[1]
+        if matrix.ndim != 2 or matrix.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of dimension {self.dimension}, got shape {matrix.shape}")
+        return matrix
+
+    @staticmethod
+    def _normalize(matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
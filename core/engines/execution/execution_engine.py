@@ -14,6 +14,7 @@ from .result_processor import ResultProcessor, ProcessedResult, DataType
 from .recovery_system import RecoverySystem, RecoveryStrategy
 from .parameter_mapper import parameter_mapper
 from modules.tools.base_tool import ToolResult, tool_registry
+from core.optimization.lazy import services
 
 @dataclass
 class ExecutionRequest:
@@ -231,7 +232,7 @@ class ExecutionEngine:
         
         for tool_name, tool_result in result.tool_results.items():
             # Process result
-            processed = self.result_processor.process_result(
+            processed = await self.result_processor.process_result_async(
                 tool_result,
                 validation_rules=request.validation_rules
             )
@@ -392,5 +393,5 @@ class ExecutionEngine:
         
         return request
 
-# Global execution engine instance
-execution_engine = ExecutionEngine()
+# Global execution engine instance (tools are registered on first use)
+execution_engine = services.lazy("execution_engine", ExecutionEngine)
@@ -10,6 +10,7 @@ from enum import Enum
 import logging
 
 from modules.tools.base_tool import ToolResult, ToolStatus
+from core.optimization.offload import offloader
 
 class DataType(Enum):
     TEXT = "text"
@@ -95,6 +96,14 @@ class ResultProcessor:
         self.logger.info(f"Result processed: type={data_type.value}, valid={validation_passed}, confidence={confidence:.2f}")
         return processed
     
+    async def process_result_async(self, result: ToolResult, expected_type: Optional[DataType] = None,
+                                   validation_rules: Optional[Dict] = None) -> ProcessedResult:
+        """process_result, run off the event loop for large outputs"""
+        return await offloader.run(
+            "result_processor.process_result", self.process_result, result, expected_type, validation_rules,
+            size=len(result.output) if isinstance(result.output, str) else 0
+        )
+    
     def _detect_data_type(self, data: Any) -> DataType:
         """Detect the data type of the output"""
         
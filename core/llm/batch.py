@@ -0,0 +1,154 @@
+"""
+Batch Generation - Run many LLM requests with bounded concurrency
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Optional, List, Union, AsyncIterator
+from dataclasses import dataclass
+
+from .circuit_breaker import is_retryable_error
+
+@dataclass
+class BatchResult:
+    """Outcome of one batch item"""
+    index: int
+    request: Dict[str, Any]
+    response: Optional[Any] = None        # LLMResponse on success
+    error: Optional[str] = None
+    provider: Optional[str] = None
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+class BatchRunner:
+    """Fans requests out over LLMManager.generate without failing the batch on item errors"""
+
+    def __init__(self, manager, max_concurrency: int = 8,
+                 per_provider_limits: Optional[Dict[str, int]] = None):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        self.manager = manager
+        self.max_concurrency = max_concurrency
+        self.per_provider_limits = per_provider_limits or {}
+        self.logger = logging.getLogger("llm_batch")
+
+        self._in_use: Dict[str, int] = {}
+        self._capacity_changed: Optional[asyncio.Condition] = None
+
+    @staticmethod
+    def normalize(request: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Accept a bare prompt or a dict with prompt/system_prompt/provider/kwargs"""
+        if isinstance(request, str):
+            return {"prompt": request}
+        if "prompt" not in request:
+            raise ValueError(f"Batch request missing 'prompt': {request}")
+        return dict(request)
+
+    async def run(self, requests: List[Union[str, Dict[str, Any]]]) -> AsyncIterator[BatchResult]:
+        """Yield results as they complete"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._capacity_changed = asyncio.Condition()
+
+        tasks = [
+            asyncio.ensure_future(self._run_item(index, request, semaphore))
+            for index, request in enumerate(requests)
+        ]
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _run_item(self, index: int, request: Union[str, Dict[str, Any]],
+                        semaphore: asyncio.Semaphore) -> BatchResult:
+        try:
+            kwargs = self.normalize(request)
+        except ValueError as e:
+            return BatchResult(index, {"request": request}, error=str(e))
+
+        result = BatchResult(index, kwargs)
+
+        async with semaphore:
+            start_time = time.monotonic()
+            provider = kwargs.pop("provider", None)
+            prompt = kwargs.pop("prompt")
+            system_prompt = kwargs.pop("system_prompt", None)
+
+            try:
+                if provider is None and self.per_provider_limits:
+                    result.response = await self._generate_with_slots(prompt, system_prompt, kwargs)
+                else:
+                    result.response = await self.manager.generate(prompt, system_prompt, provider=provider, **kwargs)
+                result.provider = result.response.provider
+
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+                result.provider = provider
+
+            finally:
+                result.duration = time.monotonic() - start_time
+
+        return result
+
+    async def _generate_with_slots(self, prompt: str, system_prompt: Optional[str],
+                                   kwargs: Dict[str, Any]):
+        """Generate on providers with spare per-provider capacity, falling back on retryable errors
+
+        Each attempt holds a slot on the provider it runs on; a retryable
+        failure releases it and claims a slot on the next untried provider.
+        """
+        tried: List[str] = []
+
+        while True:
+            provider = await self._claim_provider(tried)
+            try:
+                return await self.manager.generate(prompt, system_prompt, provider=provider, **kwargs)
+
+            except Exception as e:
+                tried.append(provider)
+                remaining = [p for p in self.manager.get_available_providers() if p not in tried]
+                if not is_retryable_error(e) or not remaining:
+                    raise
+                self.logger.warning(f"🔄 Batch item falling back after {provider} failed: {e}")
+
+            finally:
+                await self._release_provider(provider)
+
+    async def _claim_provider(self, exclude: List[str]) -> str:
+        """Wait for an untried provider with spare per-provider capacity, chosen by quota routing"""
+        quota_manager = self.manager.quota_manager
+
+        async with self._capacity_changed:
+            while True:
+                available = [p for p in self.manager.get_available_providers() if p not in exclude]
+                candidates = [
+                    p for p in available
+                    if self._in_use.get(p, 0) < self.per_provider_limits.get(p, float("inf"))
+                ]
+                provider = quota_manager.get_best_provider(candidates)
+
+                if provider:
+                    self._in_use[provider] = self._in_use.get(provider, 0) + 1
+                    return provider
+
+                if not any(quota_manager.is_provider_available(p) for p in available):
+                    raise ValueError("No provider available for batch item")
+
+                # Wake on a release, or periodically in case a circuit closes
+                try:
+                    await asyncio.wait_for(self._capacity_changed.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _release_provider(self, provider: str):
+        async with self._capacity_changed:
+            self._in_use[provider] -= 1
+            self._capacity_changed.notify_all()
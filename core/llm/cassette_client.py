@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Cassette LLM Client - Record real responses once, replay them offline with realistic timing
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Any
+from dataclasses import dataclass, field, asdict
+
+from core.llm.llm_manager import BaseLLMClient, LLMConfig, LLMResponse
+from core.llm.connection_pool import ConnectionPool
+
+@dataclass
+class CassetteEntry:
+    """One recorded call"""
+    key: str
+    content: str
+    model: str
+    provider: str
+    latency: float
+    tokens_used: Optional[int] = None
+    error: Optional[str] = None
+
+@dataclass
+class LatencyModel:
+    """Replay latency distribution (seconds)
+
+    kind is "recorded" (the recorded latency), "fixed", "uniform",
+    "normal" or "lognormal"; the result is multiplied by scale.
+    """
+    kind: str = "recorded"
+    mean: float = 0.5
+    stddev: float = 0.1
+    low: float = 0.1
+    high: float = 1.0
+    scale: float = 1.0
+
+    def sample(self, rng: random.Random, recorded: float) -> float:
+        if self.kind == "recorded":
+            value = recorded
+        elif self.kind == "fixed":
+            value = self.mean
+        elif self.kind == "uniform":
+            value = rng.uniform(self.low, self.high)
+        elif self.kind == "normal":
+            value = rng.gauss(self.mean, self.stddev)
+        elif self.kind == "lognormal":
+            # mean/stddev describe the distribution itself, not the underlying normal
+            variance = (self.stddev / self.mean) ** 2
+            sigma = (1 + variance) ** 0.5
+            value = rng.lognormvariate(math.log(self.mean / sigma), math.sqrt(math.log(1 + variance)))
+        else:
+            raise ValueError(f"Unknown latency model: {self.kind}")
+
+        return max(0.0, value * self.scale)
+
+@dataclass
+class ErrorInjection:
+    """Probability of each injected failure per call"""
+    rate_limit: float = 0.0       # "API error 429"
+    timeout: float = 0.0          # asyncio.TimeoutError after timeout_after seconds
+    server_error: float = 0.0     # "API error 503"
+    timeout_after: Optional[float] = None   # Defaults to the client's configured timeout
+
+@dataclass
+class CassetteConfig:
+    """Cassette client settings (LLMConfig.extra_params["cassette"])"""
+    path: str = "cassette.jsonl"
+    mode: str = "replay"                  # "replay" or "record"
+    on_miss: str = "error"                # "error" or "cycle" through all entries
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    errors: ErrorInjection = field(default_factory=ErrorInjection)
+    max_concurrency: Optional[int] = None
+    on_overload: str = "queue"            # "queue" or "reject" (429) beyond max_concurrency
+    seed: Optional[int] = None
+    upstream: Optional[BaseLLMClient] = None   # Real client to record from
+    flush_every: int = 100                # Recorded entries buffered before a background write
+
+    @classmethod
+    def from_params(cls, params: Dict[str, Any]) -> "CassetteConfig":
+        params = dict(params)
+        if isinstance(params.get("latency"), dict):
+            params["latency"] = LatencyModel(**params["latency"])
+        if isinstance(params.get("errors"), dict):
+            params["errors"] = ErrorInjection(**params["errors"])
+        return cls(**params)
+
+def request_key(messages: List[Dict[str, str]], **kwargs) -> str:
+    """Stable key for a request (messages plus sampling parameters)"""
+    payload = json.dumps({"messages": messages, **kwargs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+def load_cassette(path: str) -> List[CassetteEntry]:
+    """Read entries from a JSON Lines cassette (gzip if the path ends in .gz)"""
+    opener = gzip.open if path.endswith(".gz") else open
+    try:
+        with opener(path, "rt", encoding="utf-8") as f:
+            return [CassetteEntry(**json.loads(line)) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+class CassetteClient(BaseLLMClient):
+    """Records an upstream client's responses, or replays them with injected latency and errors
+
+    Recorded entries are buffered and written in a worker thread every
+    flush_every entries; close() writes the rest.
+    """
+
+    def __init__(self, config: LLMConfig, pool: Optional[ConnectionPool] = None):
+        super().__init__(config, pool)
+
+        self.cassette = CassetteConfig.from_params((config.extra_params or {}).get("cassette", {}))
+        self.rng = random.Random(self.cassette.seed)
+
+        self.entries = load_cassette(self.cassette.path)
+        self._by_key: Dict[str, List[CassetteEntry]] = {}
+        for entry in self.entries:
+            self._by_key.setdefault(entry.key, []).append(entry)
+        self._replay_index: Dict[str, int] = {}
+        self._cycle_index = 0
+
+        self._pending: List[CassetteEntry] = []
+        self._write_lock = threading.Lock()
+        self._flush_task: Optional[asyncio.Future] = None
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+        self.in_flight = 0
+        self.stats = {"calls": 0, "hits": 0, "misses": 0, "recorded": 0,
+                      "injected_errors": 0, "rejected": 0, "peak_concurrency": 0}
+
+    def validate_config(self) -> bool:
+        if self.cassette.mode == "record":
+            return self.cassette.upstream is not None
+        return bool(self.entries)
+
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> LLMResponse:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        upstream_call = lambda: self.cassette.upstream.generate(prompt, system_prompt, **kwargs)
+        return await self._call(messages, kwargs, upstream_call)
+
+    async def chat(self, messages: List[Dict[str, str]], **kwargs) -> LLMResponse:
+        upstream_call = lambda: self.cassette.upstream.chat(messages, **kwargs)
+        return await self._call(messages, kwargs, upstream_call)
+
+    async def _call(self, messages: List[Dict[str, str]], kwargs: Dict[str, Any], upstream_call) -> LLMResponse:
+        key = request_key(messages, **{k: v for k, v in kwargs.items() if k in ("temperature", "max_tokens")})
+        self.stats["calls"] += 1
+
+        if self.cassette.mode == "record":
+            return await self._record(key, upstream_call)
+
+        semaphore = self._get_semaphore()
+        if semaphore is None:
+            return await self._replay(key)
+
+        if self.cassette.on_overload == "reject" and semaphore.locked():
+            self.stats["rejected"] += 1
+            raise Exception("Cassette API error 429: too many concurrent requests")
+
+        async with semaphore:
+            return await self._replay(key)
+
+    async def _record(self, key: str, upstream_call) -> LLMResponse:
+        start_time = time.monotonic()
+        try:
+            response = await upstream_call()
+        except Exception as e:
+            self._append(CassetteEntry(key, "", self.config.model, self.config.provider.value,
+                                       time.monotonic() - start_time, error=str(e)))
+            raise
+
+        self._append(CassetteEntry(key, response.content, response.model, response.provider,
+                                   time.monotonic() - start_time, response.tokens_used))
+        return response
+
+    def _append(self, entry: CassetteEntry):
+        """Add one entry to the in-memory index and the write buffer"""
+        self.entries.append(entry)
+        self._by_key.setdefault(entry.key, []).append(entry)
+        self.stats["recorded"] += 1
+
+        self._pending.append(entry)
+        if len(self._pending) >= self.cassette.flush_every and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.ensure_future(asyncio.to_thread(self.flush))
+
+    def flush(self):
+        """Append buffered entries to the cassette file (blocking)"""
+        with self._write_lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+
+            opener = gzip.open if self.cassette.path.endswith(".gz") else open
+            with opener(self.cassette.path, "at", encoding="utf-8") as f:
+                f.write("".join(json.dumps(asdict(entry), separators=(",", ":")) + "\n" for entry in pending))
+
+    async def close(self):
+        """Write any buffered recordings, then release the pool"""
+        if self._flush_task is not None:
+            await self._flush_task
+        await asyncio.to_thread(self.flush)
+        await super().close()
+
+    async def _replay(self, key: str) -> LLMResponse:
+        self.in_flight += 1
+        self.stats["peak_concurrency"] = max(self.stats["peak_concurrency"], self.in_flight)
+        try:
+            entry = self._lookup(key)
+            errors = self.cassette.errors
+
+            roll = self.rng.random()
+            if roll < errors.timeout:
+                self.stats["injected_errors"] += 1
+                await asyncio.sleep(errors.timeout_after if errors.timeout_after is not None else self.config.timeout)
+                raise asyncio.TimeoutError("Cassette request timed out")
+
+            await asyncio.sleep(self.cassette.latency.sample(self.rng, entry.latency))
+
+            roll -= errors.timeout
+            if roll < errors.rate_limit:
+                self.stats["injected_errors"] += 1
+                raise Exception("Cassette API error 429: rate limited")
+            roll -= errors.rate_limit
+            if roll < errors.server_error:
+                self.stats["injected_errors"] += 1
+                raise Exception("Cassette API error 503: service unavailable")
+
+            if entry.error:
+                raise Exception(entry.error)
+
+            return LLMResponse(
+                content=entry.content,
+                model=entry.model,
+                provider=self.config.provider.value,
+                tokens_used=entry.tokens_used,
+                metadata={"cassette": True, "recorded_provider": entry.provider}
+            )
+        finally:
+            self.in_flight -= 1
+
+    def _lookup(self, key: str) -> CassetteEntry:
+        """Recorded entry for key, cycling through repeated recordings"""
+        recorded = self._by_key.get(key)
+        if recorded:
+            self.stats["hits"] += 1
+            index = self._replay_index.get(key, 0)
+            self._replay_index[key] = index + 1
+            return recorded[index % len(recorded)]
+
+        self.stats["misses"] += 1
+        if self.cassette.on_miss == "cycle" and self.entries:
+            entry = self.entries[self._cycle_index % len(self.entries)]
+            self._cycle_index += 1
+            return entry
+
+        raise Exception(f"Cassette miss: no recording for request {key} in {self.cassette.path}")
+
+    def _get_semaphore(self) -> Optional[asyncio.Semaphore]:
+        if not self.cassette.max_concurrency:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.cassette.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
@@ -0,0 +1,156 @@
+"""
+Circuit Breaker - Closed/open/half-open provider health with exponential cooldown
+"""
+
+import re
+import time
+import asyncio
+from enum import Enum
+from typing import Dict, Any, Optional, Union
+from dataclasses import dataclass
+
+class CircuitState(Enum):
+    CLOSED = "closed"          # Healthy, all requests allowed
+    OPEN = "open"              # Failing, no requests until cooldown ends
+    HALF_OPEN = "half_open"    # Cooldown over, a few probe requests allowed
+
+class FailureKind(Enum):
+    RATE_LIMIT = "rate_limit"
+    TIMEOUT = "timeout"
+    SERVER_ERROR = "server_error"
+    OTHER = "other"
+
+_SERVER_ERROR_PATTERN = re.compile(r"(?:error|status|code)\D{0,3}5\d\d\b")
+_SERVER_ERROR_TEXT = ("internal server error", "bad gateway", "service unavailable",
+                      "overloaded", "cannot connect", "connection refused", "connection reset")
+
+def classify_error(error: Union[str, BaseException]) -> FailureKind:
+    """Classify a provider failure for breaker and fallback decisions"""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+        return FailureKind.TIMEOUT
+    if isinstance(error, ConnectionError):
+        return FailureKind.SERVER_ERROR
+
+    message = str(error).lower()
+
+    if "429" in message or "quota" in message or "rate limit" in message or "too many requests" in message:
+        return FailureKind.RATE_LIMIT
+    if "timeout" in message or "timed out" in message:
+        return FailureKind.TIMEOUT
+    if _SERVER_ERROR_PATTERN.search(message) or any(text in message for text in _SERVER_ERROR_TEXT):
+        return FailureKind.SERVER_ERROR
+
+    return FailureKind.OTHER
+
+def is_retryable_error(error: Union[str, BaseException]) -> bool:
+    """Whether another provider may succeed where this one failed"""
+    return classify_error(error) != FailureKind.OTHER
+
+@dataclass
+class BreakerConfig:
+    """Circuit breaker settings"""
+    failure_threshold: int = 3          # Consecutive timeouts/5xx before opening
+    base_cooldown: float = 5.0          # First open period for timeouts/5xx (seconds)
+    rate_limit_cooldown: float = 30.0   # First open period after a 429 (opens immediately)
+    backoff_multiplier: float = 2.0     # Cooldown growth per consecutive trip
+    max_cooldown: float = 300.0
+    half_open_probes: int = 1           # Concurrent probe requests allowed when half-open
+
+class CircuitBreaker:
+    """Tracks one provider's health
+    
+    Each time the circuit opens its generation increases. Results reported
+    with the generation a request was sent under are ignored once the
+    circuit has opened since, so a slow request sent before a trip cannot
+    close (or re-open) the circuit.
+    """
+
+    def __init__(self, config: Optional[BreakerConfig] = None):
+        self.config = config or BreakerConfig()
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0                  # Consecutive opens without a successful probe
+        self.open_until: Optional[float] = None
+        self.probes_in_flight = 0
+        self.last_failure: Optional[FailureKind] = None
+        self.generation = 0
+
+    def allow_request(self) -> bool:
+        """Whether a request may be sent now"""
+        if self.state == CircuitState.OPEN:
+            if time.time() < self.open_until:
+                return False
+            self.state = CircuitState.HALF_OPEN
+            self.probes_in_flight = 0
+
+        if self.state == CircuitState.HALF_OPEN:
+            return self.probes_in_flight < self.config.half_open_probes
+
+        return True
+
+    def on_request_start(self):
+        """Count a probe when a request is sent in half-open state"""
+        if self.state == CircuitState.HALF_OPEN:
+            self.probes_in_flight += 1
+
+    def on_request_end(self):
+        """Release a probe slot (success, failure or cancellation)"""
+        self.probes_in_flight = max(0, self.probes_in_flight - 1)
+
+    def is_stale(self, generation: Optional[int]) -> bool:
+        """Whether a request sent under generation predates the last trip"""
+        return generation is not None and generation != self.generation
+
+    def record_success(self, generation: Optional[int] = None) -> bool:
+        """Close the circuit; returns False if the result was stale and ignored"""
+        if self.is_stale(generation):
+            return False
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.open_until = None
+        self.last_failure = None
+        return True
+
+    def record_failure(self, kind: FailureKind, generation: Optional[int] = None) -> bool:
+        """Record a failure (may open the circuit); returns False if the result was stale and ignored"""
+        if self.is_stale(generation):
+            return False
+        self.last_failure = kind
+
+        # Client-side errors say nothing about provider health
+        if kind == FailureKind.OTHER:
+            return True
+
+        self.consecutive_failures += 1
+
+        if kind == FailureKind.RATE_LIMIT:
+            self._open(self.config.rate_limit_cooldown)
+        elif self.state == CircuitState.HALF_OPEN or self.consecutive_failures >= self.config.failure_threshold:
+            self._open(self.config.base_cooldown)
+        return True
+
+    def _open(self, base_cooldown: float):
+        cooldown = min(self.config.max_cooldown, base_cooldown * self.config.backoff_multiplier ** self.trips)
+        self.trips += 1
+        self.generation += 1
+        self.state = CircuitState.OPEN
+        self.open_until = time.time() + cooldown
+        self.probes_in_flight = 0
+
+    @property
+    def cooldown_remaining(self) -> float:
+        if self.state != CircuitState.OPEN or self.open_until is None:
+            return 0
+        return max(0, self.open_until - time.time())
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get breaker status"""
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "generation": self.generation,
+            "cooldown_remaining": self.cooldown_remaining,
+            "last_failure": self.last_failure.value if self.last_failure else None
+        }
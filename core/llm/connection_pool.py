@@ -0,0 +1,142 @@
+"""
+Connection Pool - Shared, long-lived HTTP transports for LLM providers
+"""
+
+import asyncio
+import logging
+from typing import Dict, Any, Optional, Callable, Tuple
+from dataclasses import dataclass
+
+@dataclass
+class PoolConfig:
+    """Connection pool limits for a provider"""
+    limit: int = 100                  # Total open connections
+    limit_per_host: int = 20          # Open connections per host
+    keepalive_timeout: float = 30.0   # Seconds an idle connection is kept
+    ttl_dns_cache: int = 300          # Seconds resolved addresses are cached
+    connect_timeout: float = 10.0     # Seconds to establish a connection
+
+class ConnectionPool:
+    """Keeps one keep-alive transport per provider for the process lifetime"""
+
+    def __init__(self, default_config: Optional[PoolConfig] = None,
+                 provider_configs: Optional[Dict[str, PoolConfig]] = None):
+        self.logger = logging.getLogger("connection_pool")
+        self.default_config = default_config or PoolConfig()
+        self.provider_configs = provider_configs or {}
+
+        # aiohttp sessions only work on the loop that created them
+        self._sessions: Dict[Tuple[str, asyncio.AbstractEventLoop], Any] = {}
+        self._clients: Dict[str, Any] = {}
+        self._closed = False
+
+    def get_config(self, provider: str) -> PoolConfig:
+        """Get pool limits for provider"""
+        return self.provider_configs.get(provider, self.default_config)
+
+    def configure(self, provider: str, config: PoolConfig):
+        """Set pool limits for provider (applies to transports created afterwards)"""
+        self.provider_configs[provider] = config
+
+    async def get_session(self, provider: str):
+        """Get the shared aiohttp session for provider on the running event loop"""
+        loop = asyncio.get_running_loop()
+        self._drop_dead_sessions()
+
+        session = self._sessions.get((provider, loop))
+        if session is None or session.closed:
+            import aiohttp
+
+            config = self.get_config(provider)
+            connector = aiohttp.TCPConnector(
+                limit=config.limit,
+                limit_per_host=config.limit_per_host,
+                keepalive_timeout=config.keepalive_timeout,
+                ttl_dns_cache=config.ttl_dns_cache,
+                use_dns_cache=True
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=None, connect=config.connect_timeout)
+            )
+            self._sessions[(provider, loop)] = session
+            self._closed = False
+            self.logger.debug(f"Opened pooled session for {provider}")
+
+        return session
+
+    def _drop_dead_sessions(self):
+        """Forget sessions whose event loop has closed (e.g. after asyncio.run returns)"""
+        for key in [k for k in self._sessions if k[1].is_closed()]:
+            del self._sessions[key]
+            self.logger.debug(f"Dropped pooled session for {key[0]} from a closed event loop")
+
+    def build_http_client(self, provider: str):
+        """Build a pooled httpx client for SDKs that accept one (anthropic, openai)"""
+        import httpx
+
+        config = self.get_config(provider)
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config.limit,
+                max_keepalive_connections=config.limit_per_host,
+                keepalive_expiry=config.keepalive_timeout
+            )
+        )
+
+    def get_client(self, key: str, factory: Callable[[], Any]) -> Any:
+        """Get or build a long-lived SDK client"""
+        client = self._clients.get(key)
+        if client is None:
+            client = factory()
+            self._clients[key] = client
+            self._closed = False
+            self.logger.debug(f"Created pooled client for {key}")
+
+        return client
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get pool status"""
+        return {
+            "sessions": sorted({p for (p, loop), s in self._sessions.items()
+                                if not s.closed and not loop.is_closed()}),
+            "clients": list(self._clients.keys()),
+            "closed": self._closed
+        }
+
+    async def close(self):
+        """Close every pooled transport"""
+        sessions = list(self._sessions.items())
+        clients = list(self._clients.items())
+        self._sessions.clear()
+        self._clients.clear()
+
+        current_loop = asyncio.get_running_loop()
+        for (provider, loop), session in sessions:
+            if session.closed or loop.is_closed():
+                continue
+            try:
+                if loop is current_loop:
+                    await session.close()
+                else:
+                    # Sessions must be closed on their own loop
+                    asyncio.run_coroutine_threadsafe(session.close(), loop)
+            except Exception as e:
+                self.logger.warning(f"Error closing session for {provider}: {e}")
+
+        for key, client in clients:
+            close = getattr(client, "close", None)
+            if close is None:
+                continue
+            try:
+                result = close()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                self.logger.warning(f"Error closing client {key}: {e}")
+
+        if sessions:
+            # Give SSL transports a moment to shut down cleanly
+            await asyncio.sleep(0.1)
+
+        self._closed = True
@@ -4,7 +4,96 @@ Content Filter - Separates code from conversational text
 
 import re
 import logging
-from typing import Optional, Dict, Any
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, AsyncIterator
+
+from core.optimization.offload import offloader
+
+FENCE = '```'
+
+_LANG_TAG = re.compile(r'\w+')
+
+# Lines that are conversation rather than code
+_CONVERSATIONAL_LINE = re.compile('|'.join([
+    r'(?:I\'ll|I will|Let me|Here\'s|This is|I\'ve created)',
+    r'(?:Sure|Certainly|Of course|Absolutely)',
+    r'(?:The above|This code|This will|You can)',
+    r'(?:Note:|Important:|Remember:)',
+    r'\*\*.*?\*\*',    # Bold text
+    r'#{1,6}\s',       # Markdown headers
+    r'```\w*\s*$',     # Code block markers
+    r'\s*```\s*$',     # Code block end markers
+]), re.IGNORECASE)
+
+_FENCE_OPEN_LINE = re.compile(r'^```\w*\s*', re.MULTILINE)
+_FENCE_CLOSE_LINE = re.compile(r'\s*```\s*$', re.MULTILINE)
+_BACKTICK_PREFIX = re.compile(r'^`+\w*\s*', re.MULTILINE)
+
+# Where code starts, in priority order (the first alternative found anywhere wins)
+_CODE_START = re.compile(
+    r'(<!DOCTYPE html)|(<html)|(#!/usr/bin)|(import\s)|(from\s)|(def\s)|(class\s)'
+    r'|(function\s)|(const\s)|(let\s)|(var\s)|(\{)',
+    re.IGNORECASE
+)
+
+_PYTHON_CODE = re.compile(r'((?:import|from|def|class).*?)(?=\n\n[A-Z]|\n\n#[^#]|\Z)', re.DOTALL)
+_PYTHON_SCRIPT = re.compile(r'(#!/usr/bin/env python.*?)(?=\n\n[A-Z]|\Z)', re.DOTALL)
+
+_PYTHON_STARTS = ('import', 'from', 'def', 'class', 'if', 'for', 'while', 'try')
+_JAVASCRIPT_STARTS = ('function', 'const', 'let', 'var', 'class')
+_HTML_STARTS = ('<!doctype html', '<html')
+_HTML_END = '</html>'
+
+# Fence tags streamed for each file type, and how an untagged block of that type starts
+_STREAM_TAGS = {
+    'html': ('html', 'htm'),
+    'python': ('python', 'py', 'python3'),
+    'javascript': ('javascript', 'js', 'jsx', 'mjs'),
+    'css': ('css',),
+    'json': ('json',),
+}
+_UNTAGGED_STARTS = {
+    'html': _HTML_STARTS,
+    'python': _PYTHON_STARTS,
+    'javascript': _JAVASCRIPT_STARTS,
+    'json': ('{',),
+}
+
+@dataclass
+class FencedBlock:
+    """Text between one ``` marker and the next"""
+    lang: str       # Lowercased language tag ("" when untagged)
+    raw: str        # Everything between the markers, tag included (stripped)
+    body: str       # The block without its language tag (stripped)
+    start: int      # Offset of the opening marker
+    end: int        # Offset just past the closing marker
+
+def scan_fences(content: str) -> List[FencedBlock]:
+    """Tokenize the response's fences and language tags in one pass
+
+    Every ``` starts an entry that runs to the next ```, so in a well-formed
+    response the code blocks are every other entry and the prose between
+    them the rest. An entry never spans more than two adjacent markers
+    (the old per-language `.*?` patterns could run across several fences),
+    and its tag is the whole word after the marker, lowercased: ```json is
+    tagged json, where the old ```js pattern also matched it.
+    """
+    blocks = []
+    pos = content.find(FENCE)
+
+    while pos != -1:
+        close = content.find(FENCE, pos + 3)
+        if close == -1:
+            break
+
+        raw = content[pos + 3:close]
+        tag = _LANG_TAG.match(raw)
+        lang = tag.group().lower() if tag else ''
+        body = raw[tag.end():] if tag else raw
+        blocks.append(FencedBlock(lang, raw.strip(), body.strip(), pos, close + 3))
+        pos = close
+
+    return blocks
 
 class ContentFilter:
     """Filters and extracts clean code from LLM responses"""
@@ -19,19 +108,39 @@ class ContentFilter:
         if not file_type:
             file_type = self._detect_file_type(content)
         
+        # Every extractor works from the same single parse of the fences
+        blocks = scan_fences(content)
+
         # Apply appropriate extraction method
         if file_type == 'html':
-            return self._extract_html_code(content)
+            return self._extract_html_code(content, blocks)
         elif file_type == 'python':
-            return self._extract_python_code(content)
+            return self._extract_python_code(content, blocks)
         elif file_type == 'javascript':
-            return self._extract_javascript_code(content)
+            return self._extract_javascript_code(content, blocks)
         elif file_type == 'css':
-            return self._extract_css_code(content)
+            return self._extract_css_code(content, blocks)
         elif file_type == 'json':
-            return self._extract_json_code(content)
+            return self._extract_json_code(content, blocks)
         else:
-            return self._extract_generic_code(content)
+            return self._extract_generic_code(content, blocks)
+
+    async def extract_code_async(self, content: str, file_type: str = None) -> str:
+        """extract_code, run off the event loop for large responses"""
+        return await offloader.run("content_filter.extract_code", self.extract_code, content, file_type)
+
+    async def extract_code_stream(self, chunks: AsyncIterator[str], file_type: str = None) -> AsyncIterator[str]:
+        """Extract clean code from a streamed LLM response as it arrives"""
+
+        stream_filter = StreamingCodeFilter(file_type)
+        async for chunk in chunks:
+            code = stream_filter.feed(chunk)
+            if code:
+                yield code
+
+        code = stream_filter.finish()
+        if code:
+            yield code
     
     def _detect_file_type(self, content: str) -> str:
         """Detect file type from content"""
@@ -50,130 +159,148 @@ class ContentFilter:
         else:
             return 'generic'
     
-    def _extract_html_code(self, content: str) -> str:
+    def _blocks(self, content: str, blocks: Optional[List[FencedBlock]]) -> List[FencedBlock]:
+        if blocks is None:
+            blocks = scan_fences(content)
+        return blocks
+
+    def _tagged_block(self, blocks: List[FencedBlock], *langs: str) -> Optional[str]:
+        """Body of the first block tagged with each language, in preference order"""
+        for lang in langs:
+            for block in blocks:
+                if block.lang == lang:
+                    return block.body
+        return None
+
+    def _find_between(self, content: str, content_lower: str, start: str, end: str) -> Optional[str]:
+        """First start...end span (case-insensitive), like a non-greedy search"""
+        i = content_lower.find(start)
+        if i == -1:
+            return None
+        j = content_lower.find(end, i + len(start))
+        if j == -1:
+            return None
+        return content[i:j + len(end)].strip()
+
+    def _extract_html_code(self, content: str, blocks: Optional[List[FencedBlock]] = None) -> str:
         """Extract HTML code from response"""
+        blocks = self._blocks(content, blocks)
         
         # Look for code blocks first
-        code_block_patterns = [
-            r'```html\s*(.*?)\s*```',
-            r'```\s*(<!DOCTYPE html.*?</html>)\s*```',
-            r'```\s*(<html.*?</html>)\s*```'
-        ]
-        
-        for pattern in code_block_patterns:
-            match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
+        code = self._tagged_block(blocks, 'html')
+        if code is not None:
+            return code
+        
+        for doc_start in ('<!doctype html', '<html'):
+            for block in blocks:
+                raw_lower = block.raw.lower()
+                if raw_lower.startswith(doc_start) and raw_lower.endswith('</html>'):
+                    return block.raw
         
         # Look for HTML document structure
-        html_patterns = [
-            r'(<!DOCTYPE html.*?</html>)',
-            r'(<html.*?</html>)',
-            r'(<HTML.*?</HTML>)'
-        ]
-        
-        for pattern in html_patterns:
-            match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
+        content_lower = content.lower()
+        for doc_start in ('<!doctype html', '<html'):
+            code = self._find_between(content, content_lower, doc_start, '</html>')
+            if code is not None:
+                return code
         
         # If no complete HTML found, return cleaned content
         cleaned = self._remove_conversational_text(content)
         
         # Remove any remaining markdown code block markers
-        cleaned = re.sub(r'^```\w*\s*', '', cleaned, flags=re.MULTILINE)
-        cleaned = re.sub(r'\s*```\s*$', '', cleaned, flags=re.MULTILINE)
+        cleaned = _FENCE_OPEN_LINE.sub('', cleaned)
+        cleaned = _FENCE_CLOSE_LINE.sub('', cleaned)
         
         return cleaned.strip()
     
-    def _extract_python_code(self, content: str) -> str:
+    def _extract_python_code(self, content: str, blocks: Optional[List[FencedBlock]] = None) -> str:
         """Extract Python code from response"""
+        blocks = self._blocks(content, blocks)
         
         # Look for code blocks
-        code_block_patterns = [
-            r'```python\s*(.*?)\s*```',
-            r'```py\s*(.*?)\s*```',
-            r'```\s*((?:import|from|def|class|if|for|while|try).*?)\s*```'
-        ]
-        
-        for pattern in code_block_patterns:
-            match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
+        code = self._tagged_block(blocks, 'python', 'py')
+        if code is not None:
+            return code
         
-        # Extract Python code patterns
-        python_patterns = [
-            r'((?:import|from|def|class).*?)(?=\n\n[A-Z]|\n\n#[^#]|\Z)',
-            r'(#!/usr/bin/env python.*?)(?=\n\n[A-Z]|\Z)'
-        ]
+        for block in blocks:
+            if block.raw.lower().startswith(_PYTHON_STARTS):
+                return block.raw
         
-        for pattern in python_patterns:
-            match = re.search(pattern, content, re.DOTALL)
+        # Extract Python code patterns
+        for pattern in (_PYTHON_CODE, _PYTHON_SCRIPT):
+            match = pattern.search(content)
             if match:
                 return match.group(1).strip()
         
         return self._remove_conversational_text(content)
     
-    def _extract_javascript_code(self, content: str) -> str:
+    def _extract_javascript_code(self, content: str, blocks: Optional[List[FencedBlock]] = None) -> str:
         """Extract JavaScript code from response"""
+        blocks = self._blocks(content, blocks)
         
-        code_block_patterns = [
-            r'```javascript\s*(.*?)\s*```',
-            r'```js\s*(.*?)\s*```',
-            r'```\s*((?:function|const|let|var|class).*?)\s*```'
-        ]
+        code = self._tagged_block(blocks, 'javascript', 'js')
+        if code is not None:
+            return code
         
-        for pattern in code_block_patterns:
-            match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
+        for block in blocks:
+            if block.raw.lower().startswith(_JAVASCRIPT_STARTS):
+                return block.raw
         
         return self._remove_conversational_text(content)
     
-    def _extract_css_code(self, content: str) -> str:
+    def _extract_css_code(self, content: str, blocks: Optional[List[FencedBlock]] = None) -> str:
         """Extract CSS code from response"""
+        blocks = self._blocks(content, blocks)
         
-        code_block_patterns = [
-            r'```css\s*(.*?)\s*```',
-            r'```\s*((?:/\*.*?\*/|[^{}]*\{[^{}]*\}).*?)\s*```'
-        ]
+        code = self._tagged_block(blocks, 'css')
+        if code is not None:
+            return code
         
-        for pattern in code_block_patterns:
-            match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
+        for block in blocks:
+            if self._looks_like_css(block.raw):
+                return block.raw
         
         return self._remove_conversational_text(content)
     
-    def _extract_json_code(self, content: str) -> str:
+    def _looks_like_css(self, code: str) -> bool:
+        """Starts with a comment, or contains a flat `selector { ... }` rule"""
+        if code.startswith('/*') and code.find('*/', 2) != -1:
+            return True
+        open_brace = code.find('{')
+        if open_brace == -1:
+            return False
+        close_brace = code.find('}', open_brace)
+        if close_brace == -1:
+            return False
+        nested = code.find('{', open_brace + 1)
+        return (nested == -1 or nested > close_brace) and code.rfind('}', 0, open_brace) == -1
+
+    def _extract_json_code(self, content: str, blocks: Optional[List[FencedBlock]] = None) -> str:
         """Extract JSON code from response"""
+        blocks = self._blocks(content, blocks)
         
-        code_block_patterns = [
-            r'```json\s*(.*?)\s*```',
-            r'```\s*(\{.*?\})\s*```'
-        ]
+        code = self._tagged_block(blocks, 'json')
+        if code is not None:
+            return code
         
-        for pattern in code_block_patterns:
-            match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
+        for block in blocks:
+            if block.raw.startswith('{') and block.raw.endswith('}'):
+                return block.raw
         
         # Look for JSON structure
-        json_pattern = r'(\{.*?\})'
-        match = re.search(json_pattern, content, re.DOTALL)
-        if match:
-            return match.group(1).strip()
+        code = self._find_between(content, content, '{', '}')
+        if code is not None:
+            return code
         
         return self._remove_conversational_text(content)
     
-    def _extract_generic_code(self, content: str) -> str:
+    def _extract_generic_code(self, content: str, blocks: Optional[List[FencedBlock]] = None) -> str:
         """Extract code from generic content"""
+        blocks = self._blocks(content, blocks)
         
         # Look for any code blocks
-        code_block_pattern = r'```(?:\w+)?\s*(.*?)\s*```'
-        match = re.search(code_block_pattern, content, re.DOTALL)
-        if match:
-            return match.group(1).strip()
+        if blocks:
+            return blocks[0].body
         
         return self._remove_conversational_text(content)
     
@@ -183,17 +310,6 @@ class ContentFilter:
         lines = content.split('\n')
         filtered_lines = []
         
-        conversational_patterns = [
-            r'^(I\'ll|I will|Let me|Here\'s|This is|I\'ve created)',
-            r'^(Sure|Certainly|Of course|Absolutely)',
-            r'^(The above|This code|This will|You can)',
-            r'^(Note:|Important:|Remember:)',
-            r'^\*\*.*?\*\*',  # Bold text
-            r'^#{1,6}\s',     # Markdown headers
-            r'^```\w*\s*$',   # Code block markers
-            r'^\s*```\s*$',   # Code block end markers
-        ]
-        
         for line in lines:
             line = line.strip()
             
@@ -202,44 +318,231 @@ class ContentFilter:
                 continue
             
             # Skip conversational patterns
-            is_conversational = any(re.match(pattern, line, re.IGNORECASE) for pattern in conversational_patterns)
-            
-            if not is_conversational:
+            if not _CONVERSATIONAL_LINE.match(line):
                 filtered_lines.append(line)
         
         # Join and clean up
         result = '\n'.join(filtered_lines).strip()
         
         # Remove any remaining markdown artifacts
-        result = re.sub(r'^```\w*\s*', '', result, flags=re.MULTILINE)
-        result = re.sub(r'\s*```\s*$', '', result, flags=re.MULTILINE)
-        result = re.sub(r'^`+\w*\s*', '', result, flags=re.MULTILINE)
+        result = _FENCE_OPEN_LINE.sub('', result)
+        result = _FENCE_CLOSE_LINE.sub('', result)
+        result = _BACKTICK_PREFIX.sub('', result)
         
         # Remove leading conversational text before code starts
-        code_start_patterns = [
-            r'^.*?(?=<!DOCTYPE html)',
-            r'^.*?(?=<html)',
-            r'^.*?(?=#!/usr/bin)',
-            r'^.*?(?=import\s)',
-            r'^.*?(?=from\s)',
-            r'^.*?(?=def\s)',
-            r'^.*?(?=class\s)',
-            r'^.*?(?=function\s)',
-            r'^.*?(?=const\s)',
-            r'^.*?(?=let\s)',
-            r'^.*?(?=var\s)',
-            r'^.*?(?=\{)'
-        ]
-        
-        for pattern in code_start_patterns:
-            match = re.search(pattern, result, re.DOTALL | re.IGNORECASE)
-            if match:
-                # Find where actual code starts
-                code_start = match.end() - len(match.group().split()[-1]) if match.group().split() else match.end()
-                result = result[code_start:].strip()
-                break
+        code_start = self._find_code_start(result)
+        if code_start is not None:
+            preamble = result[:code_start].split()
+            # Keep the preamble's last word (matches the historical behaviour)
+            if preamble:
+                code_start -= len(preamble[-1])
+            result = result[code_start:].strip()
         
         return result
 
+    def _find_code_start(self, text: str) -> Optional[int]:
+        """Offset of the highest-priority code start marker, found in one pass"""
+        first: Dict[int, int] = {}
+        for match in _CODE_START.finditer(text):
+            group = match.lastindex
+            if group not in first:
+                first[group] = match.start()
+                if group == 1:
+                    break
+        if not first:
+            return None
+        return first[min(first)]
+
+class StreamingCodeFilter:
+    """Incremental extract_code: feed response chunks, get code back as it arrives
+
+    Code streams from the first fence that is the wanted kind of block:
+    tagged for file_type (aliases such as py, js and htm included), or
+    untagged but starting the way that kind of code does. For other file
+    types the first fence of any kind is taken. For html, and when no
+    file_type is given, a line starting an HTML document streams up to its
+    </html>. Without a file_type, the first block recognised sets it.
+    Other fences are skipped whole, and everything after the streamed
+    block is ignored.
+
+    The response is buffered only until that block starts; if none does,
+    finish() returns extract_code over the whole response. After
+    max_buffer characters without one, the text is passed through as it
+    arrives rather than buffered further.
+    """
+
+    def __init__(self, file_type: str = None, max_buffer: int = 256 * 1024):
+        self.file_type = file_type
+        self.max_buffer = max_buffer
+        self.logger = logging.getLogger("content_filter")
+
+        self.state = "scan"         # scan, fenced, document, raw or done
+        self._buffer = ""           # Response so far while scanning, code held back afterwards
+        self._scan_from = 0         # Where the next fence may start in the buffer
+        self._line_from = 0         # Start of the next line to check for a document start
+        self._in_skipped = False    # Inside a fence that is not the wanted block
+        self.chars_in = 0
+        self.chars_out = 0
+
+    def feed(self, chunk: str) -> str:
+        """Consume one chunk, returning the code it completed (possibly empty)"""
+        self.chars_in += len(chunk)
+        out: List[str] = []
+        if self.state == "done":
+            return ""
+
+        self._buffer += chunk
+        if self.state == "scan":
+            self._scan()
+            if self.state == "scan" and len(self._buffer) > self.max_buffer:
+                self.logger.warning(f"No code block in the first {self.max_buffer} chars, passing the stream through")
+                self.state = "raw"
+
+        if self.state == "fenced":
+            self._feed_fenced(out)
+        elif self.state == "document":
+            self._feed_document(out)
+        elif self.state == "raw":
+            cut = len(self._buffer.rstrip())
+            self._emit(self._buffer[:cut], out)
+            self._buffer = self._buffer[cut:]
+
+        return "".join(out)
+
+    def finish(self) -> str:
+        """Flush whatever is held back once the stream has ended"""
+        out: List[str] = []
+
+        if self.state in ("fenced", "document", "raw"):
+            # Unclosed block: keep what arrived
+            self._emit(self._buffer.rstrip(), out)
+        elif self.state == "scan":
+            self._emit(content_filter.extract_code(self._buffer, self.file_type), out)
+
+        self.state = "done"
+        self._buffer = ""
+        return "".join(out)
+
+    def _emit(self, code: str, out: List[str]):
+        if not self.chars_out:
+            code = code.lstrip()
+        if code:
+            out.append(code)
+            self.chars_out += len(code)
+
+    def _scan(self):
+        """Walk the fences and lines seen so far until the wanted block starts"""
+        buffer = self._buffer
+        while True:
+            pos = buffer.find(FENCE, self._scan_from)
+            if not self._in_skipped:
+                document = self._document_start(pos if pos != -1 else len(buffer))
+                if document is not None:
+                    self.state = "document"
+                    self._buffer = buffer[document:]
+                    return
+
+            if pos == -1:
+                # A fence may be split across chunks
+                self._scan_from = max(self._scan_from, len(buffer) - 2)
+                return
+
+            if self._in_skipped:
+                self._in_skipped = False
+                self._scan_from = self._line_from = pos + 3
+                continue
+
+            tag = _LANG_TAG.match(buffer, pos + 3)
+            body = tag.end() if tag else pos + 3
+            block_type = self._block_type(tag.group().lower() if tag else '', body) if body < len(buffer) else None
+            if block_type is None:
+                # The tag or the first line of the block is still arriving
+                self._scan_from = pos
+                return
+
+            if block_type:
+                self.state = "fenced"
+                self.file_type = self.file_type or block_type
+                self._buffer = buffer[body:]
+                return
+
+            self._in_skipped = True
+            self._scan_from = pos + 3
+
+    def _block_type(self, lang: str, body: int):
+        """File type of the block whose body starts at body, False to skip it, None if not known yet"""
+        if self.file_type and self.file_type not in _STREAM_TAGS:
+            return self.file_type
+
+        file_types = [self.file_type] if self.file_type else list(_STREAM_TAGS)
+        for file_type in file_types:
+            if lang in _STREAM_TAGS[file_type]:
+                return file_type
+        if lang:
+            return False
+
+        # Untagged: go by how the block starts
+        head = self._buffer[body:body + 256].lstrip()
+        if head.startswith(FENCE):
+            return False
+        if len(head) < 16 and body + 256 > len(self._buffer):
+            return None
+        head = head[:16].lower()
+        for file_type in file_types:
+            if head.startswith(_UNTAGGED_STARTS.get(file_type, ())):
+                return file_type
+        return False
+
+    def _document_start(self, end: int) -> Optional[int]:
+        """Offset of a line before end that starts an HTML document, when HTML is wanted"""
+        if self.file_type not in (None, 'html'):
+            return None
+
+        buffer = self._buffer
+        start = self._line_from
+        while start < end:
+            newline = buffer.find('\n', start, end)
+            line = buffer[start:min(newline if newline != -1 else end, start + 64)]
+            stripped = line.lstrip()
+            if stripped.lower().startswith(_HTML_STARTS):
+                self.file_type = 'html'
+                return start + len(line) - len(stripped)
+            if newline == -1:
+                # Check the rest of this line again once it has arrived
+                break
+            start = newline + 1
+
+        self._line_from = start
+        return None
+
+    def _feed_fenced(self, out: List[str]):
+        pending = self._buffer
+        close = pending.find(FENCE)
+        if close != -1:
+            self._emit(pending[:close].rstrip(), out)
+            self.state = "done"
+            self._buffer = ""
+            return
+
+        # Hold back a possible start of the closing fence and trailing whitespace
+        keep = next((k for k in (2, 1) if pending.endswith(FENCE[:k])), 0)
+        cut = len(pending[:len(pending) - keep].rstrip())
+        self._emit(pending[:cut], out)
+        self._buffer = pending[cut:]
+
+    def _feed_document(self, out: List[str]):
+        pending = self._buffer
+        close = pending.lower().find(_HTML_END)
+        if close != -1:
+            self._emit(pending[:close + len(_HTML_END)], out)
+            self.state = "done"
+            self._buffer = ""
+            return
+
+        # Hold back a possible start of </html>
+        cut = max(0, len(pending) - len(_HTML_END) + 1)
+        self._emit(pending[:cut], out)
+        self._buffer = pending[cut:]
+
 # Global content filter
 content_filter = ContentFilter()
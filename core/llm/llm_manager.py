@@ -6,13 +6,28 @@ LLM Integration System - Multiple LLM providers with switching capabilities
 import os
 import asyncio
 import logging
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Optional, List, Union, AsyncIterator, Callable, Awaitable
 from dataclasses import dataclass
 from enum import Enum
+import copy
 import json
+import time
 import yaml
 from abc import ABC, abstractmethod
 
+from .connection_pool import ConnectionPool
+from .response_cache import LLMResponseCache
+from .rate_limiter import RateLimitConfig, estimate_tokens
+from .tokenizer import ContextBudgeter
+from .prompt_cache import (
+    PromptCacheConfig, stable_prefix, split_system_messages,
+    anthropic_system, anthropic_messages, anthropic_cache_usage, openai_cache_usage
+)
+from .circuit_breaker import is_retryable_error
+from .quota_manager import QuotaManager, quota_manager as default_quota_manager
+from .batch import BatchRunner, BatchResult
+from core.optimization.lazy import services
+
 class LLMProvider(Enum):
     """Supported LLM providers"""
     QWEN = "qwen"
@@ -24,6 +39,7 @@ class LLMProvider(Enum):
     DEEPSEEK = "deepseek"
     LLAMA_LOCAL = "llama_local"
     OLLAMA = "ollama"
+    CASSETTE = "cassette"      # Offline record/replay (core.llm.cassette_client)
 
 @dataclass
 class LLMResponse:
@@ -47,12 +63,55 @@ class LLMConfig:
     timeout: int = 30
     extra_params: Optional[Dict[str, Any]] = None
 
+@dataclass
+class HedgeConfig:
+    """Hedged request settings"""
+    enabled: bool = False          # Default when generate() is called without hedge=
+    percentile: float = 95.0       # Primary latency percentile that triggers the hedge
+    min_samples: int = 5           # Samples needed before the percentile is trusted
+    default_delay: float = 2.0     # Hedge delay (seconds) until enough samples exist
+    min_delay: float = 0.25
+    max_delay: float = 10.0
+
+def _copy_response(response: LLMResponse, **metadata) -> LLMResponse:
+    """Copy a response so callers can mutate it independently"""
+    result = copy.copy(response)
+    result.metadata = {**(response.metadata or {}), **metadata}
+    return result
+
+async def _iter_sse_data(lines) -> AsyncIterator[str]:
+    """Yield the data payloads of a Server-Sent Events stream (OpenAI format)"""
+    async for raw_line in lines:
+        line = raw_line.decode("utf-8") if isinstance(raw_line, bytes) else raw_line
+        line = line.strip()
+        
+        # Skip keep-alives, comments and non-data fields
+        if not line.startswith("data:"):
+            continue
+        
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        yield data
+
+async def _iter_ndjson(lines) -> AsyncIterator[Dict[str, Any]]:
+    """Yield decoded objects from a newline-delimited JSON stream (Ollama format)"""
+    async for raw_line in lines:
+        line = raw_line.decode("utf-8") if isinstance(raw_line, bytes) else raw_line
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
 class BaseLLMClient(ABC):
     """Abstract base class for LLM clients"""
     
-    def __init__(self, config: LLMConfig):
+    def __init__(self, config: LLMConfig, pool: Optional[ConnectionPool] = None):
         self.config = config
         self.logger = logging.getLogger(f"llm.{config.provider.value}")
+        
+        # Standalone clients keep a private pool so connections are still reused
+        self._owns_pool = pool is None
+        self.pool = pool or ConnectionPool()
     
     @abstractmethod
     async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> LLMResponse:
@@ -64,27 +123,51 @@ class BaseLLMClient(ABC):
         """Chat with conversation history"""
         pass
     
+    async def generate_stream(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+        """Stream response text as it is generated.
+        
+        Providers without native streaming yield the full completion as one chunk.
+        """
+        response = await self.generate(prompt, system_prompt, **kwargs)
+        yield response.content
+    
+    async def chat_stream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """Stream chat response text as it is generated"""
+        response = await self.chat(messages, **kwargs)
+        yield response.content
+    
+    @property
+    def context_window(self) -> Optional[int]:
+        """Tokens the server accepts, None to use the model's known window, or 0 to send prompts untrimmed"""
+        return None
+    
     def validate_config(self) -> bool:
         """Validate configuration"""
         return True
+    
+    async def close(self):
+        """Release the client's pool if it owns one"""
+        if self._owns_pool:
+            await self.pool.close()
 
 class QwenClient(BaseLLMClient):
     """Qwen LLM client with OAuth authentication"""
     
-    def __init__(self, config: LLMConfig):
-        super().__init__(config)
-        self.session = None
+    def __init__(self, config: LLMConfig, pool: Optional[ConnectionPool] = None):
+        super().__init__(config, pool)
         
         # Import auth manager
         from .qwen_auth import qwen_auth
         self.auth_manager = qwen_auth
     
     async def _get_session(self):
-        """Get HTTP session"""
-        if not self.session:
-            import aiohttp
-            self.session = aiohttp.ClientSession()
-        return self.session
+        """Get pooled HTTP session"""
+        return await self.pool.get_session(self.config.provider.value)
+    
+    async def close(self):
+        """Stop background token refresh and release the pool"""
+        await self.auth_manager.stop_background_refresh()
+        await super().close()
     
     def validate_config(self) -> bool:
         """Validate Qwen configuration"""
@@ -108,12 +191,12 @@ class QwenClient(BaseLLMClient):
         try:
             # Get authenticated session and headers
             session = await self._get_session()
-            headers = self.auth_manager.get_auth_headers()
+            headers = await self.auth_manager.get_auth_headers_async()
             base_url = self.auth_manager.get_base_url()
             
             payload = {
                 "model": self.config.model,
-                "messages": messages,
+                "messages": stable_prefix(messages),
                 "temperature": kwargs.get("temperature", self.config.temperature),
                 "max_tokens": kwargs.get("max_tokens", self.config.max_tokens)
             }
@@ -135,7 +218,7 @@ class QwenClient(BaseLLMClient):
                         model=self.config.model,
                         provider=self.config.provider.value,
                         tokens_used=data.get("usage", {}).get("total_tokens"),
-                        metadata={"response_data": data}
+                        metadata={"response_data": data, **openai_cache_usage(data.get("usage"))}
                     )
                 else:
                     error_text = await response.text()
@@ -145,87 +228,144 @@ class QwenClient(BaseLLMClient):
             self.logger.error(f"Qwen API call failed: {e}")
             raise
     
-    async def close(self):
-        """Close HTTP session properly"""
-        if self.session and not self.session.closed:
-            try:
-                await self.session.close()
-                # Wait a bit for the underlying connections to close
-                await asyncio.sleep(0.1)
-            except Exception as e:
-                self.logger.warning(f"Error closing session: {e}")
-            finally:
-                self.session = None
+    async def generate_stream(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+        """Stream response from Qwen"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        async for chunk in self.chat_stream(messages, **kwargs):
+            yield chunk
+    
+    async def chat_stream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """Stream chat completion deltas from Qwen (SSE, OpenAI format)"""
+        try:
+            session = await self._get_session()
+            headers = await self.auth_manager.get_auth_headers_async()
+            base_url = self.auth_manager.get_base_url()
+            
+            payload = {
+                "model": self.config.model,
+                "messages": stable_prefix(messages),
+                "temperature": kwargs.get("temperature", self.config.temperature),
+                "max_tokens": kwargs.get("max_tokens", self.config.max_tokens),
+                "stream": True
+            }
+            
+            async with session.post(
+                f"{base_url}/chat/completions",
+                json=payload,
+                headers=headers
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise Exception(f"Qwen API error {response.status}: {error_text}")
+                
+                async for data in _iter_sse_data(response.content):
+                    event = json.loads(data)
+                    choices = event.get("choices") or []
+                    if not choices:
+                        continue
+                    
+                    delta = (choices[0].get("delta") or {}).get("content")
+                    if delta:
+                        yield delta
+        
+        except Exception as e:
+            self.logger.error(f"Qwen streaming call failed: {e}")
+            raise
+    
 
 class ClaudeClient(BaseLLMClient):
     """Anthropic Claude client"""
     
+    def __init__(self, config: LLMConfig, pool: Optional[ConnectionPool] = None):
+        super().__init__(config, pool)
+        self.prompt_cache = PromptCacheConfig(**(config.extra_params or {}).get("prompt_cache", {}))
+    
+    def _get_client(self):
+        """Get the pooled AsyncAnthropic client"""
+        import anthropic
+        
+        provider = self.config.provider.value
+        return self.pool.get_client(provider, lambda: anthropic.AsyncAnthropic(
+            api_key=self.config.api_key,
+            http_client=self.pool.build_http_client(provider)
+        ))
+    
+    def _request(self, system_prompt: str, messages: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        """Messages API arguments with the stable prefix marked cacheable"""
+        return {
+            "model": self.config.model,
+            "max_tokens": kwargs.get("max_tokens", self.config.max_tokens),
+            "temperature": kwargs.get("temperature", self.config.temperature),
+            "system": anthropic_system(system_prompt, self.prompt_cache),
+            "messages": anthropic_messages(messages, system_prompt, self.prompt_cache)
+        }
+    
     async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> LLMResponse:
+        return await self._create(system_prompt or "", [{"role": "user", "content": prompt}], **kwargs)
+    
+    async def chat(self, messages: List[Dict[str, str]], **kwargs) -> LLMResponse:
+        # Merge system messages into the top-level system prompt
+        system_prompt, chat_messages = split_system_messages(messages)
+        return await self._create(system_prompt, chat_messages, **kwargs)
+    
+    async def _create(self, system_prompt: str, messages: List[Dict[str, Any]], **kwargs) -> LLMResponse:
         try:
-            import anthropic
-            
-            client = anthropic.AsyncAnthropic(api_key=self.config.api_key)
+            client = self._get_client()
             
-            response = await client.messages.create(
-                model=self.config.model,
-                max_tokens=kwargs.get("max_tokens", self.config.max_tokens),
-                temperature=kwargs.get("temperature", self.config.temperature),
-                system=system_prompt or "",
-                messages=[{"role": "user", "content": prompt}]
-            )
+            response = await client.messages.create(**self._request(system_prompt, messages, **kwargs))
             
             return LLMResponse(
                 content=response.content[0].text,
                 model=self.config.model,
                 provider=self.config.provider.value,
-                tokens_used=response.usage.input_tokens + response.usage.output_tokens
+                tokens_used=response.usage.input_tokens + response.usage.output_tokens,
+                metadata=anthropic_cache_usage(response.usage)
             )
         
         except Exception as e:
             self.logger.error(f"Claude API call failed: {e}")
             raise
     
-    async def chat(self, messages: List[Dict[str, str]], **kwargs) -> LLMResponse:
-        # Convert system message if present
-        system_prompt = ""
-        chat_messages = []
-        
-        for msg in messages:
-            if msg["role"] == "system":
-                system_prompt = msg["content"]
-            else:
-                chat_messages.append(msg)
-        
-        if len(chat_messages) == 1 and chat_messages[0]["role"] == "user":
-            return await self.generate(chat_messages[0]["content"], system_prompt, **kwargs)
+    async def generate_stream(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+        async for chunk in self._stream_messages(system_prompt or "", [{"role": "user", "content": prompt}], **kwargs):
+            yield chunk
+    
+    async def chat_stream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        system_prompt, chat_messages = split_system_messages(messages)
         
+        async for chunk in self._stream_messages(system_prompt, chat_messages, **kwargs):
+            yield chunk
+    
+    async def _stream_messages(self, system_prompt: str, messages: List[Dict[str, Any]], **kwargs) -> AsyncIterator[str]:
+        """Stream text deltas from the Messages API"""
         try:
-            import anthropic
-            
-            client = anthropic.AsyncAnthropic(api_key=self.config.api_key)
+            client = self._get_client()
             
-            response = await client.messages.create(
-                model=self.config.model,
-                max_tokens=kwargs.get("max_tokens", self.config.max_tokens),
-                temperature=kwargs.get("temperature", self.config.temperature),
-                system=system_prompt,
-                messages=chat_messages
-            )
-            
-            return LLMResponse(
-                content=response.content[0].text,
-                model=self.config.model,
-                provider=self.config.provider.value,
-                tokens_used=response.usage.input_tokens + response.usage.output_tokens
-            )
+            async with client.messages.stream(**self._request(system_prompt, messages, **kwargs)) as stream:
+                async for text in stream.text_stream:
+                    yield text
         
         except Exception as e:
-            self.logger.error(f"Claude API call failed: {e}")
+            self.logger.error(f"Claude streaming call failed: {e}")
             raise
 
 class GPTClient(BaseLLMClient):
     """OpenAI GPT client"""
     
+    def _get_client(self):
+        """Get the pooled AsyncOpenAI client"""
+        import openai
+        
+        provider = self.config.provider.value
+        return self.pool.get_client(provider, lambda: openai.AsyncOpenAI(
+            api_key=self.config.api_key,
+            http_client=self.pool.build_http_client(provider)
+        ))
+    
     async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> LLMResponse:
         messages = []
         if system_prompt:
@@ -236,13 +376,11 @@ class GPTClient(BaseLLMClient):
     
     async def chat(self, messages: List[Dict[str, str]], **kwargs) -> LLMResponse:
         try:
-            import openai
-            
-            client = openai.AsyncOpenAI(api_key=self.config.api_key)
+            client = self._get_client()
             
             response = await client.chat.completions.create(
                 model=self.config.model,
-                messages=messages,
+                messages=stable_prefix(messages),
                 temperature=kwargs.get("temperature", self.config.temperature),
                 max_tokens=kwargs.get("max_tokens", self.config.max_tokens)
             )
@@ -251,22 +389,61 @@ class GPTClient(BaseLLMClient):
                 content=response.choices[0].message.content,
                 model=self.config.model,
                 provider=self.config.provider.value,
-                tokens_used=response.usage.total_tokens
+                tokens_used=response.usage.total_tokens,
+                metadata=openai_cache_usage(response.usage)
             )
         
         except Exception as e:
             self.logger.error(f"GPT API call failed: {e}")
             raise
+    
+    async def generate_stream(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        async for chunk in self.chat_stream(messages, **kwargs):
+            yield chunk
+    
+    async def chat_stream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        try:
+            client = self._get_client()
+            
+            stream = await client.chat.completions.create(
+                model=self.config.model,
+                messages=stable_prefix(messages),
+                temperature=kwargs.get("temperature", self.config.temperature),
+                max_tokens=kwargs.get("max_tokens", self.config.max_tokens),
+                stream=True
+            )
+            
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        
+        except Exception as e:
+            self.logger.error(f"GPT streaming call failed: {e}")
+            raise
 
 class GeminiClient(BaseLLMClient):
     """Google Gemini client"""
     
+    def _get_model(self):
+        """Get the pooled GenerativeModel (configures the SDK once)"""
+        import google.generativeai as genai
+        
+        def build_model():
+            genai.configure(api_key=self.config.api_key)
+            return genai.GenerativeModel(self.config.model)
+        
+        return self.pool.get_client(f"{self.config.provider.value}:{self.config.model}", build_model)
+    
     async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> LLMResponse:
         try:
             import google.generativeai as genai
             
-            genai.configure(api_key=self.config.api_key)
-            model = genai.GenerativeModel(self.config.model)
+            model = self._get_model()
             
             full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
             
@@ -303,42 +480,93 @@ class GeminiClient(BaseLLMClient):
         
         full_prompt = "\n\n".join(prompt_parts)
         return await self.generate(full_prompt, **kwargs)
+    
+    async def generate_stream(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+        try:
+            import google.generativeai as genai
+            
+            model = self._get_model()
+            
+            full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+            
+            response = await model.generate_content_async(
+                full_prompt,
+                generation_config=genai.types.GenerationConfig(
+                    temperature=kwargs.get("temperature", self.config.temperature),
+                    max_output_tokens=kwargs.get("max_tokens", self.config.max_tokens)
+                ),
+                stream=True
+            )
+            
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        
+        except Exception as e:
+            self.logger.error(f"Gemini streaming call failed: {e}")
+            raise
+    
+    async def chat_stream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        prompt_parts = []
+        for msg in messages:
+            role = msg["role"]
+            content = msg["content"]
+            if role == "system":
+                prompt_parts.append(f"System: {content}")
+            elif role == "user":
+                prompt_parts.append(f"User: {content}")
+            elif role == "assistant":
+                prompt_parts.append(f"Assistant: {content}")
+        
+        async for chunk in self.generate_stream("\n\n".join(prompt_parts), **kwargs):
+            yield chunk
 
 class OllamaClient(BaseLLMClient):
     """Local Ollama client"""
     
+    @property
+    def context_window(self) -> int:
+        """Configured num_ctx, or 0 when unset since the server's own default is not known"""
+        return int((self.config.extra_params or {}).get("num_ctx") or 0)
+    
+    def _options(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Sampling options, plus num_ctx when configured"""
+        options = {
+            "temperature": kwargs.get("temperature", self.config.temperature),
+            "num_predict": kwargs.get("max_tokens", self.config.max_tokens)
+        }
+        num_ctx = (self.config.extra_params or {}).get("num_ctx")
+        if num_ctx:
+            options["num_ctx"] = int(num_ctx)
+        return options
+    
     async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> LLMResponse:
         try:
-            import aiohttp
-            
             payload = {
                 "model": self.config.model,
                 "prompt": f"{system_prompt}\n\n{prompt}" if system_prompt else prompt,
                 "stream": False,
-                "options": {
-                    "temperature": kwargs.get("temperature", self.config.temperature),
-                    "num_predict": kwargs.get("max_tokens", self.config.max_tokens)
-                }
+                "options": self._options(kwargs)
             }
             
             base_url = self.config.base_url or "http://localhost:11434"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{base_url}/api/generate",
-                    json=payload,
-                    timeout=self.config.timeout
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return LLMResponse(
-                            content=data["response"],
-                            model=self.config.model,
-                            provider=self.config.provider.value
-                        )
-                    else:
-                        error_text = await response.text()
-                        raise Exception(f"Ollama API error {response.status}: {error_text}")
+            session = await self.pool.get_session(self.config.provider.value)
+            async with session.post(
+                f"{base_url}/api/generate",
+                json=payload,
+                timeout=self.config.timeout
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return LLMResponse(
+                        content=data["response"],
+                        model=self.config.model,
+                        provider=self.config.provider.value
+                    )
+                else:
+                    error_text = await response.text()
+                    raise Exception(f"Ollama API error {response.status}: {error_text}")
         
         except Exception as e:
             self.logger.error(f"Ollama API call failed: {e}")
@@ -346,49 +574,127 @@ class OllamaClient(BaseLLMClient):
     
     async def chat(self, messages: List[Dict[str, str]], **kwargs) -> LLMResponse:
         try:
-            import aiohttp
-            
             payload = {
                 "model": self.config.model,
                 "messages": messages,
                 "stream": False,
-                "options": {
-                    "temperature": kwargs.get("temperature", self.config.temperature),
-                    "num_predict": kwargs.get("max_tokens", self.config.max_tokens)
-                }
+                "options": self._options(kwargs)
             }
             
             base_url = self.config.base_url or "http://localhost:11434"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{base_url}/api/chat",
-                    json=payload,
-                    timeout=self.config.timeout
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return LLMResponse(
-                            content=data["message"]["content"],
-                            model=self.config.model,
-                            provider=self.config.provider.value
-                        )
-                    else:
-                        error_text = await response.text()
-                        raise Exception(f"Ollama API error {response.status}: {error_text}")
+            session = await self.pool.get_session(self.config.provider.value)
+            async with session.post(
+                f"{base_url}/api/chat",
+                json=payload,
+                timeout=self.config.timeout
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return LLMResponse(
+                        content=data["message"]["content"],
+                        model=self.config.model,
+                        provider=self.config.provider.value
+                    )
+                else:
+                    error_text = await response.text()
+                    raise Exception(f"Ollama API error {response.status}: {error_text}")
         
         except Exception as e:
             self.logger.error(f"Ollama API call failed: {e}")
             raise
+    
+    async def generate_stream(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+        payload = {
+            "model": self.config.model,
+            "prompt": f"{system_prompt}\n\n{prompt}" if system_prompt else prompt,
+            "stream": True,
+            "options": self._options(kwargs)
+        }
+        
+        async for data in self._stream_ndjson("/api/generate", payload):
+            if data.get("response"):
+                yield data["response"]
+    
+    async def chat_stream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        payload = {
+            "model": self.config.model,
+            "messages": messages,
+            "stream": True,
+            "options": self._options(kwargs)
+        }
+        
+        async for data in self._stream_ndjson("/api/chat", payload):
+            content = (data.get("message") or {}).get("content")
+            if content:
+                yield content
+    
+    async def _stream_ndjson(self, path: str, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """POST to an Ollama endpoint and yield NDJSON events until done"""
+        try:
+            base_url = self.config.base_url or "http://localhost:11434"
+            
+            session = await self.pool.get_session(self.config.provider.value)
+            async with session.post(
+                f"{base_url}{path}",
+                json=payload,
+                timeout=self.config.timeout
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise Exception(f"Ollama API error {response.status}: {error_text}")
+                
+                async for data in _iter_ndjson(response.content):
+                    if data.get("error"):
+                        raise Exception(f"Ollama API error: {data['error']}")
+                    yield data
+                    if data.get("done"):
+                        break
+        
+        except Exception as e:
+            self.logger.error(f"Ollama streaming call failed: {e}")
+            raise
 
 class LLMManager:
     """Manages multiple LLM providers and switching"""
     
-    def __init__(self, config_path: Optional[str] = None):
+    def __init__(self, config_path: Optional[str] = None, pool: Optional[ConnectionPool] = None,
+                 quota_manager: Optional[QuotaManager] = None,
+                 clients: Optional[Dict[str, BaseLLMClient]] = None):
+        """Pass clients to use them instead of loading providers from config"""
         self.logger = logging.getLogger("llm_manager")
         self.clients: Dict[str, BaseLLMClient] = {}
         self.current_provider: Optional[str] = None
         
+        # Set by switch_provider(); chat() tries it before routing picks one
+        self.switched_provider: Optional[str] = None
+        
+        # Routing, rate-limit and circuit state (process-wide unless given)
+        self.quota_manager = quota_manager or default_quota_manager
+        
+        # Shared keep-alive transports for every registered client
+        self.pool = pool or ConnectionPool()
+        
+        # Response cache in front of generate/chat (attach_redis() adds the Redis tier)
+        self.response_cache = LLMResponseCache()
+        
+        # Identical concurrent requests share one provider call
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.single_flight_stats = {"leaders": 0, "coalesced": 0}
+        
+        # Opt-in hedging across providers for latency-sensitive callers
+        self.hedge_config = HedgeConfig()
+        self.hedge_stats = {"hedged": 0, "hedge_wins": 0}
+        self._metrics = None     # JarvisMetrics, loaded on first use (False if unavailable)
+        
+        # Trim prompts to each model's context window before sending
+        self.budgeter = ContextBudgeter()
+        self.context_budget_enabled = True
+        self.budget_stats = {"trimmed_requests": 0, "tokens_saved": 0}
+        
+        # Provider-side prompt prefix cache usage reported by clients
+        self.prompt_cache_stats = {"cache_read_tokens": 0, "cache_write_tokens": 0}
+        
         # Use config manager for settings
         from core.config.config_manager import config_manager
         jarvis_config = config_manager.get_config()
@@ -402,6 +708,9 @@ class LLMManager:
         self.config_path = config_path or "/home/krawin/code/jarvis/config.yaml"
         
         # Client mapping
+        # Imported here because the cassette module builds on BaseLLMClient
+        from .cassette_client import CassetteClient
+        
         self.client_classes = {
             LLMProvider.QWEN: QwenClient,
             LLMProvider.CLAUDE: ClaudeClient,
@@ -409,20 +718,26 @@ class LLMManager:
             LLMProvider.GEMINI: GeminiClient,
             LLMProvider.OLLAMA: OllamaClient,
             LLMProvider.LLAMA_LOCAL: OllamaClient,  # Use Ollama for local Llama
+            LLMProvider.CASSETTE: CassetteClient,
         }
         
-        self.load_config()
+        if clients is None:
+            self.load_config()
+        else:
+            self.clients.update(clients)
+            self.current_provider = next(iter(self.clients), None)
     
     def load_config(self):
         """Load LLM configurations"""
         try:
             # Try to load from the working config path first
             working_config_path = "/home/krawin/code/jarvis/config.yaml"
+            llm_config = {}
             if os.path.exists(working_config_path):
                 with open(working_config_path, 'r') as f:
                     config_data = yaml.safe_load(f)
                 
-                llm_config = config_data.get('llm', {})
+                llm_config = config_data.get('llm') or {}
                 
                 # Load Qwen config with OAuth authentication
                 if llm_config.get('provider') == 'qwen':
@@ -438,14 +753,39 @@ class LLMManager:
                     self.logger.info("✅ Loaded Qwen config with OAuth authentication")
             
             # Load other providers from environment (when available)
-            self._load_env_configs()
+            self._load_env_configs(llm_config)
+            self._load_routing_config(llm_config)
+            self._load_rate_limits(llm_config)
             
         except Exception as e:
             self.logger.error(f"Failed to load config: {e}")
             self._load_env_configs()
+            self._load_routing_config()
+            self._load_rate_limits()
     
-    def _load_env_configs(self):
-        """Load configurations from environment variables"""
+    def _load_routing_config(self, llm_config: Optional[Dict[str, Any]] = None):
+        """Apply LLM_ROUTING_POLICY or llm.routing_policy; routing stays on provider priority otherwise"""
+        
+        policy = os.getenv('LLM_ROUTING_POLICY') or (llm_config or {}).get('routing_policy')
+        if policy:
+            try:
+                self.set_routing_policy(policy)
+            except ValueError as e:
+                self.logger.warning(f"{e} - keeping {self.quota_manager.routing_policy.name} routing")
+    
+    def _load_rate_limits(self, llm_config: Optional[Dict[str, Any]] = None):
+        """Pace each registered provider to the requests/tokens per minute set in its config block or env"""
+        
+        providers_config = (llm_config or {}).get('providers') or {}
+        for name in self.clients:
+            config = RateLimitConfig.from_settings(name, providers_config.get(name))
+            if config:
+                self.quota_manager.configure_rate_limit(name, config)
+    
+    def _load_env_configs(self, llm_config: Optional[Dict[str, Any]] = None):
+        """Load configurations from environment variables (and the llm section of config.yaml)"""
+        
+        providers_config = (llm_config or {}).get('providers') or {}
         
         # Claude
         if os.getenv('ANTHROPIC_API_KEY'):
@@ -474,11 +814,13 @@ class LLMManager:
             )
             self.register_client('gemini', gemini_config)
         
-        # Ollama (local)
+        # Ollama (local); a configured num_ctx is requested from the server and bounds prompt trimming
+        num_ctx = os.getenv('OLLAMA_NUM_CTX') or (providers_config.get('ollama') or {}).get('num_ctx')
         ollama_config = LLMConfig(
             provider=LLMProvider.OLLAMA,
             model=os.getenv('OLLAMA_MODEL', 'llama3.2'),
-            base_url=os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
+            base_url=os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434'),
+            extra_params={"num_ctx": int(num_ctx)} if num_ctx else None
         )
         self.register_client('ollama', ollama_config)
         
@@ -518,7 +860,7 @@ class LLMManager:
         try:
             client_class = self.client_classes.get(config.provider)
             if client_class:
-                client = client_class(config)
+                client = client_class(config, pool=self.pool)
                 if client.validate_config():
                     self.clients[name] = client
                     self.logger.info(f"Registered LLM client: {name} ({config.provider.value})")
@@ -530,15 +872,25 @@ class LLMManager:
             self.logger.error(f"Failed to register {name}: {e}")
     
     def switch_provider(self, provider_name: str) -> bool:
-        """Switch to a different LLM provider"""
+        """Switch to a different LLM provider
+        
+        chat() and chat_stream() send to the switched provider while it is
+        available and fall back to routing otherwise. generate() always
+        routes by policy; pass provider= to pin a single call.
+        """
         if provider_name in self.clients:
             self.current_provider = provider_name
+            self.switched_provider = provider_name
             self.logger.info(f"Switched to LLM provider: {provider_name}")
             return True
         else:
             self.logger.error(f"Provider {provider_name} not available")
             return False
     
+    def set_routing_policy(self, policy):
+        """Set how generate() picks providers (see core.llm.routing_policy)"""
+        self.quota_manager.set_routing_policy(policy)
+    
     def get_available_providers(self) -> List[str]:
         """Get list of available providers"""
         return list(self.clients.keys())
@@ -548,10 +900,347 @@ class LLMManager:
         return self.current_provider
     
     async def generate(self, prompt: str, system_prompt: Optional[str] = None, 
-                      provider: Optional[str] = None, **kwargs) -> LLMResponse:
-        """Generate response using current or specified provider with quota management"""
+                      provider: Optional[str] = None, use_cache: bool = True,
+                      cache_ttl: Optional[float] = None, coalesce: bool = True,
+                      hedge: Optional[bool] = None, **kwargs) -> LLMResponse:
+        """Generate response using current or specified provider with quota management
+        
+        Pass use_cache=False to bypass the response cache, or cache_ttl to
+        override how long this response is kept. Identical concurrent
+        requests share one provider call unless coalesce=False. hedge=True
+        races a second provider when the first is slower than usual.
+        """
+        
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        async def call(client: BaseLLMClient) -> LLMResponse:
+            fitted_prompt, fitted_system, fitted_kwargs, saved = self._fit_prompt(client, prompt, system_prompt, kwargs)
+            response = await client.generate(fitted_prompt, fitted_system, **fitted_kwargs)
+            return _copy_response(response, context_tokens_saved=saved) if saved else response
+        
+        return await self._dispatch(
+            call, self._estimate_tokens(prompt, system_prompt),
+            messages, kwargs, provider, hedge, use_cache, cache_ttl, coalesce
+        )
+    
+    async def _dispatch(self, call: Callable[[BaseLLMClient], Awaitable[LLMResponse]],
+                        estimated_tokens: int, messages: List[Dict[str, str]],
+                        kwargs: Dict[str, Any], provider: Optional[str],
+                        hedge: Optional[bool], use_cache: bool,
+                        cache_ttl: Optional[float], coalesce: bool,
+                        preferred: Optional[str] = None) -> LLMResponse:
+        """Shared generate/chat pipeline: routing, cache, single-flight, hedging and fallback"""
+        
+        target_providers, best_provider = self._select_provider(provider, preferred)
+        
+        if hedge is None:
+            hedge = self.hedge_config.enabled
+        
+        # A pinned provider has nothing to race against
+        dispatch = self._dispatch_hedged if hedge and not provider else self._dispatch_with_fallback
+        
+        # best_provider is reserved; release it exactly once, when its call ends
+        released = False
+        started = False
+        
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.quota_manager.end_request(best_provider)
+        
+        async def run():
+            nonlocal started
+            started = True
+            try:
+                return await dispatch(call, estimated_tokens, target_providers, best_provider)
+            finally:
+                release()
+        
+        try:
+            return await self._cached_dispatch(
+                best_provider, messages, kwargs, run,
+                use_cache, cache_ttl, coalesce, pinned=provider is not None
+            )
+        finally:
+            # Cache hits and coalesced callers never used their reservation
+            if not started:
+                release()
+    
+    async def _dispatch_with_fallback(self, call: Callable[[BaseLLMClient], Awaitable[LLMResponse]],
+                                      estimated_tokens: int, target_providers: List[str],
+                                      best_provider: str) -> LLMResponse:
+        """Call the selected (already reserved) provider, falling back on quota errors"""
+        
+        # Try the selected provider
+        try:
+            return await self._call_provider(best_provider, call, estimated_tokens)
+            
+        except Exception as e:
+            # Try fallback provider on quota, timeout or server errors
+            if is_retryable_error(e):
+                remaining_providers = [p for p in target_providers if p != best_provider]
+                fallback_provider = self.quota_manager.get_best_provider(remaining_providers, reserve=True)
+                
+                if fallback_provider:
+                    self.logger.warning(f"🔄 Falling back to {fallback_provider} after {best_provider} failed: {e}")
+                    try:
+                        response = await self._call_provider(fallback_provider, call, estimated_tokens)
+                        return _copy_response(response, fallback_provider=fallback_provider)
+                    finally:
+                        self.quota_manager.end_request(fallback_provider)
+            
+            raise e
+    
+    async def _dispatch_hedged(self, call: Callable[[BaseLLMClient], Awaitable[LLMResponse]],
+                               estimated_tokens: int, target_providers: List[str],
+                               best_provider: str) -> LLMResponse:
+        """Race a second provider if the primary misses its latency deadline"""
+        
+        remaining_providers = [p for p in target_providers if p != best_provider]
+        
+        if not remaining_providers:
+            return await self._dispatch_with_fallback(
+                call, estimated_tokens, target_providers, best_provider
+            )
+        
+        delay = self._hedge_delay(best_provider)
+        primary = asyncio.ensure_future(self._call_provider(best_provider, call, estimated_tokens))
+        tasks = {primary: best_provider}
+        hedge_provider = None
+        
+        try:
+            # Give the primary until its usual tail latency (or until it fails)
+            await asyncio.wait({primary}, timeout=delay)
+            
+            if primary.done():
+                error = primary.exception()
+                # A bad request (400, auth) would fail on any provider
+                if error is None or not is_retryable_error(error):
+                    return primary.result()
+            
+            # Only reserve the hedge once it is needed, so it holds no probe slot otherwise
+            hedge_provider = self.quota_manager.get_best_provider(remaining_providers, reserve=True)
+            if not hedge_provider:
+                return await primary
+            
+            self.hedge_stats["hedged"] += 1
+            self.logger.info(f"⏱️ {best_provider} missed {delay:.2f}s deadline, hedging with {hedge_provider}")
+            
+            hedged = asyncio.ensure_future(self._call_provider(hedge_provider, call, estimated_tokens))
+            tasks[hedged] = hedge_provider
+            
+            pending = set(tasks) - {primary} if primary.done() else set(tasks)
+            last_error = primary.exception() if primary.done() else None
+            
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedged:
+                            self.hedge_stats["hedge_wins"] += 1
+                        return _copy_response(task.result(), hedged=True, hedge_winner=tasks[task])
+                    last_error = task.exception()
+                    if not is_retryable_error(last_error):
+                        raise last_error
+            
+            raise last_error
+        
+        finally:
+            # Cancel the loser (or everything, if the caller was cancelled)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()
+            if hedge_provider:
+                self.quota_manager.end_request(hedge_provider)
+    
+    def _estimate_tokens(self, *texts: Optional[str]) -> int:
+        """Token estimate for rate-limit admission, skipped unless some provider limits tokens"""
+        
+        if not self.quota_manager.limits_tokens():
+            return 0
+        return estimate_tokens(*texts)
+    
+    def _hedge_delay(self, provider_name: str) -> float:
+        """Adaptive hedge deadline from the provider's recent latency percentile"""
+        
+        config = self.hedge_config
+        delay = self.quota_manager.get_latency_percentile(provider_name, config.percentile, config.min_samples)
+        if delay is None:
+            delay = config.default_delay
+        
+        return min(config.max_delay, max(config.min_delay, delay))
+    
+    async def _call_provider(self, provider_name: str,
+                             call: Callable[[BaseLLMClient], Awaitable[LLMResponse]],
+                             estimated_tokens: int = 0) -> LLMResponse:
+        """Call one provider and record the outcome with quota manager and metrics
+        
+        The caller reserves the provider with get_best_provider(reserve=True)
+        and releases it with end_request().
+        """
+        
+        # Queue behind the provider's rate limit before sending anything
+        await self.quota_manager.acquire_rate_limit(provider_name, estimated_tokens)
+        
+        client = self.clients[provider_name]
+        generation = self.quota_manager.breaker_generation(provider_name)
+        start_time = time.monotonic()
+        try:
+            response = await call(client)
+        except Exception as e:
+            self.quota_manager.record_quota_error(provider_name, e, generation=generation)
+            self._record_metrics(provider_name, client.config.model, time.monotonic() - start_time, error=e)
+            raise
+        
+        latency = time.monotonic() - start_time
+        self.quota_manager.record_token_usage(provider_name, estimated_tokens, response.tokens_used)
+        self.quota_manager.record_success(provider_name, latency=latency, tokens_used=response.tokens_used,
+                                          generation=generation)
+        self._record_metrics(provider_name, response.model or client.config.model, latency, response.tokens_used)
+        
+        metadata = response.metadata or {}
+        for key in self.prompt_cache_stats:
+            self.prompt_cache_stats[key] += metadata.get(key) or 0
+        return response
+    
+    def _fit_messages(self, client: BaseLLMClient, messages: List[Dict[str, str]],
+                      kwargs: Dict[str, Any]):
+        """Trim messages to the client's context budget, returning (messages, kwargs, tokens_saved)
+        
+        kwargs comes back with max_tokens clamped to what the window has
+        left after the prompt (a copy, so fallback providers get their own).
+        """
+        
+        window = client.context_window
+        if not self.context_budget_enabled or window == 0:
+            return messages, kwargs, 0
+        
+        config = client.config
+        max_tokens = kwargs.get("max_tokens", config.max_tokens)
+        result = self.budgeter.fit(messages, config.model, max_tokens, context_window=window)
+        
+        if result.max_tokens is not None and result.max_tokens != max_tokens:
+            self.logger.info(f"Clamped max_tokens for {config.model} from {max_tokens} to {result.max_tokens}")
+            kwargs = {**kwargs, "max_tokens": result.max_tokens}
+        
+        if not result.trimmed:
+            return messages, kwargs, 0
+        
+        self.budget_stats["trimmed_requests"] += 1
+        self.budget_stats["tokens_saved"] += result.tokens_saved
+        self.logger.warning(
+            f"✂️ Trimmed prompt for {config.model} from {result.original_tokens} to "
+            f"{result.final_tokens} tokens ({result.dropped_messages} dropped, "
+            f"{result.truncated_messages} compacted)"
+        )
+        return result.messages, kwargs, result.tokens_saved
+    
+    def _fit_prompt(self, client: BaseLLMClient, prompt: str, system_prompt: Optional[str],
+                    kwargs: Dict[str, Any]):
+        """Trim a prompt/system prompt pair, returning (prompt, system_prompt, kwargs, tokens_saved)"""
+        
+        messages = [{"role": "user", "content": prompt}]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+        
+        fitted, kwargs, saved = self._fit_messages(client, messages, kwargs)
+        if not saved:
+            return prompt, system_prompt, kwargs, 0
+        
+        return fitted[-1]["content"], fitted[0]["content"] if system_prompt else None, kwargs, saved
+    
+    def _record_metrics(self, provider_name: str, model: str, duration: float,
+                        tokens_used: Optional[int] = None, error: Optional[Exception] = None):
+        """Report a provider call to JarvisMetrics when monitoring is installed"""
+        
+        if self._metrics is None:
+            try:
+                from ..monitoring.metrics import jarvis_metrics
+                self._metrics = jarvis_metrics
+            except Exception as e:
+                # prometheus_client/psutil are optional
+                self.logger.debug(f"Metrics unavailable: {e}")
+                self._metrics = False
+        
+        if not self._metrics:
+            return
         
-        from .quota_manager import quota_manager
+        try:
+            if error is not None:
+                self._metrics.record_error(f"llm_{provider_name}", type(error).__name__)
+            else:
+                self._metrics.record_llm_request(provider_name, model, duration, tokens_used or 0)
+        except Exception as e:
+            self.logger.debug(f"Failed to record LLM metrics: {e}")
+    
+    async def generate_many(self, requests: List[Union[str, Dict[str, Any]]],
+                            max_concurrency: int = 8,
+                            per_provider_limits: Optional[Dict[str, int]] = None) -> List[BatchResult]:
+        """Generate many prompts concurrently, returning results in request order
+        
+        Each request is a prompt string or a dict with "prompt" and optional
+        "system_prompt", "provider" and generate() keyword arguments. Failed
+        items carry an error instead of failing the batch.
+        """
+        
+        results = [
+            result async for result in
+            self.generate_many_as_completed(requests, max_concurrency, per_provider_limits)
+        ]
+        return sorted(results, key=lambda r: r.index)
+    
+    async def generate_many_as_completed(self, requests: List[Union[str, Dict[str, Any]]],
+                                         max_concurrency: int = 8,
+                                         per_provider_limits: Optional[Dict[str, int]] = None) -> AsyncIterator[BatchResult]:
+        """Generate many prompts concurrently, yielding results as they finish"""
+        
+        runner = BatchRunner(self, max_concurrency, per_provider_limits)
+        succeeded = failed = 0
+        
+        async for result in runner.run(requests):
+            if result.ok:
+                succeeded += 1
+            else:
+                failed += 1
+            yield result
+        
+        self.logger.info(f"Batch finished: {succeeded} succeeded, {failed} failed")
+    
+    async def generate_stream(self, prompt: str, system_prompt: Optional[str] = None,
+                              provider: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+        """Stream response chunks using current or specified provider with quota management"""
+        
+        def open_stream(client: BaseLLMClient) -> AsyncIterator[str]:
+            fitted_prompt, fitted_system, fitted_kwargs, _ = self._fit_prompt(client, prompt, system_prompt, kwargs)
+            return client.generate_stream(fitted_prompt, fitted_system, **fitted_kwargs)
+        
+        estimated_tokens = estimate_tokens(prompt, system_prompt)
+        async for chunk in self._stream_with_fallback(open_stream, estimated_tokens, provider):
+            yield chunk
+    
+    async def chat_stream(self, messages: List[Dict[str, str]],
+                          provider: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+        """Stream chat response chunks with quota management"""
+        
+        def open_stream(client: BaseLLMClient) -> AsyncIterator[str]:
+            fitted, fitted_kwargs, _ = self._fit_messages(client, messages, kwargs)
+            return client.chat_stream(fitted, **fitted_kwargs)
+        
+        estimated_tokens = estimate_tokens(*(m.get("content") for m in messages))
+        async for chunk in self._stream_with_fallback(open_stream, estimated_tokens, provider, self.switched_provider):
+            yield chunk
+    
+    def _select_provider(self, provider: Optional[str] = None, preferred: Optional[str] = None):
+        """Pick the best provider for a request considering quotas
+        
+        An available preferred provider is chosen ahead of the routing policy.
+        """
         
         # Determine provider with quota management
         if provider:
@@ -559,12 +1248,17 @@ class LLMManager:
         else:
             target_providers = self.get_available_providers()
         
-        # Get best available provider considering quotas
-        best_provider = quota_manager.get_best_provider(target_providers)
+        # Get best available provider considering quotas, reserving it (and any
+        # half-open probe slot) before the caller awaits anything
+        best_provider = None
+        if preferred in target_providers:
+            best_provider = self.quota_manager.get_best_provider([preferred], reserve=True)
+        if not best_provider:
+            best_provider = self.quota_manager.get_best_provider(target_providers, reserve=True)
         
         if not best_provider:
             # Check if any providers are in cooldown
-            status = quota_manager.get_status_summary()
+            status = self.quota_manager.get_status_summary()
             cooldown_info = {p: s for p, s in status.items() if s.get('cooldown_remaining', 0) > 0}
             
             if cooldown_info:
@@ -573,65 +1267,214 @@ class LLMManager:
             else:
                 raise ValueError(f"No valid provider available. Available: {target_providers}")
         
-        # Try the selected provider
+        return target_providers, best_provider
+    
+    async def _stream_with_fallback(self, open_stream: Callable[[BaseLLMClient], AsyncIterator[str]],
+                                    estimated_tokens: int = 0, provider: Optional[str] = None,
+                                    preferred: Optional[str] = None) -> AsyncIterator[str]:
+        """Run a client stream, falling back on retryable errors raised before the first chunk"""
+        
+        target_providers, best_provider = self._select_provider(provider, preferred)
+        
+        started = False
         try:
-            client = self.clients[best_provider]
-            response = await client.generate(prompt, system_prompt, **kwargs)
-            
-            # Record success
-            quota_manager.record_success(best_provider)
-            return response
-            
-        except Exception as e:
-            # Record quota error
-            quota_manager.record_quota_error(best_provider, str(e))
-            
-            # Try fallback provider if quota error
-            if "quota" in str(e).lower() or "429" in str(e):
+            try:
+                async for chunk in self._stream_provider(best_provider, open_stream, estimated_tokens):
+                    started = True
+                    yield chunk
+                return
+                
+            except Exception as e:
+                # Chunks already reached the caller, so a retry would duplicate output
+                if started or not is_retryable_error(e):
+                    raise
+                
                 remaining_providers = [p for p in target_providers if p != best_provider]
-                fallback_provider = quota_manager.get_best_provider(remaining_providers)
+                fallback_provider = self.quota_manager.get_best_provider(remaining_providers, reserve=True)
                 
-                if fallback_provider:
-                    self.logger.warning(f"🔄 Falling back to {fallback_provider} due to quota")
-                    try:
-                        client = self.clients[fallback_provider]
-                        response = await client.generate(prompt, system_prompt, **kwargs)
-                        quota_manager.record_success(fallback_provider)
-                        return response
-                    except Exception as fallback_error:
-                        quota_manager.record_quota_error(fallback_provider, str(fallback_error))
-                        raise fallback_error
-            
-            raise e
+                if not fallback_provider:
+                    raise
+                
+                self.logger.warning(f"🔄 Falling back to {fallback_provider} after {best_provider} failed: {e}")
+        
+        finally:
+            self.quota_manager.end_request(best_provider)
+        
+        try:
+            async for chunk in self._stream_provider(fallback_provider, open_stream, estimated_tokens):
+                yield chunk
+        finally:
+            self.quota_manager.end_request(fallback_provider)
     
-    async def chat(self, messages: List[Dict[str, str]], 
-                  provider: Optional[str] = None, **kwargs) -> LLMResponse:
-        """Chat using current or specified provider"""
+    async def _stream_provider(self, provider_name: str,
+                               open_stream: Callable[[BaseLLMClient], AsyncIterator[str]],
+                               estimated_tokens: int = 0) -> AsyncIterator[str]:
+        """Stream from one provider and record the outcome like _call_provider
         
-        provider_name = provider or self.current_provider
+        Streams carry no usage data, so a completed stream is recorded with the
+        prompt estimate plus an estimate of the streamed text.
+        """
         
-        if not provider_name or provider_name not in self.clients:
-            raise ValueError(f"No valid provider available. Current: {provider_name}")
+        await self.quota_manager.acquire_rate_limit(provider_name, estimated_tokens)
         
         client = self.clients[provider_name]
-        return await client.chat(messages, **kwargs)
+        generation = self.quota_manager.breaker_generation(provider_name)
+        chunks = []
+        start_time = time.monotonic()
+        try:
+            async for chunk in open_stream(client):
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            self.quota_manager.record_quota_error(provider_name, e, generation=generation)
+            self._record_metrics(provider_name, client.config.model, time.monotonic() - start_time, error=e)
+            raise
+        
+        latency = time.monotonic() - start_time
+        tokens_used = estimated_tokens + estimate_tokens("".join(chunks))
+        self.quota_manager.record_token_usage(provider_name, estimated_tokens, tokens_used)
+        self.quota_manager.record_success(provider_name, latency=latency, tokens_used=tokens_used,
+                                          generation=generation)
+        self._record_metrics(provider_name, client.config.model, latency, tokens_used)
+    
+    async def chat(self, messages: List[Dict[str, str]], 
+                  provider: Optional[str] = None, use_cache: bool = True,
+                  cache_ttl: Optional[float] = None, coalesce: bool = True,
+                  hedge: Optional[bool] = None, **kwargs) -> LLMResponse:
+        """Chat using current or specified provider with quota management
+        
+        Goes through the same routing, fallback, cache and metrics pipeline
+        as generate(), trying a provider chosen with switch_provider() first.
+        """
+        
+        async def call(client: BaseLLMClient) -> LLMResponse:
+            fitted, fitted_kwargs, saved = self._fit_messages(client, messages, kwargs)
+            response = await client.chat(fitted, **fitted_kwargs)
+            return _copy_response(response, context_tokens_saved=saved) if saved else response
+        
+        return await self._dispatch(
+            call, self._estimate_tokens(*(m.get("content") for m in messages)),
+            messages, kwargs, provider, hedge, use_cache, cache_ttl, coalesce,
+            preferred=self.switched_provider
+        )
+    
+    async def _cached_dispatch(self, provider_name: str, messages: List[Dict[str, str]],
+                               kwargs: Dict[str, Any], call: Callable[[], Any],
+                               use_cache: bool, cache_ttl: Optional[float],
+                               coalesce: bool, pinned: bool = False) -> LLMResponse:
+        """Serve a request from the response cache or a shared in-flight call
+        
+        Unless the caller pinned a provider, any provider may answer, so the
+        lookup and single-flight key is the request content rather than the
+        provider routing happened to pick for this call.
+        """
+        
+        if not (use_cache or coalesce):
+            return await call()
+        
+        key = self._cache_key(provider_name, messages, kwargs) if pinned else self._request_key(messages, kwargs)
+        
+        if use_cache:
+            cached = await self.response_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        async def call_and_store():
+            response = await call()
+            if use_cache:
+                # Also store under the provider that actually answered (a fallback or winning hedge)
+                metadata = response.metadata or {}
+                served_by = metadata.get("hedge_winner") or metadata.get("fallback_provider") or provider_name
+                for store_key in {self._request_key(messages, kwargs), self._cache_key(served_by, messages, kwargs)}:
+                    await self.response_cache.set(store_key, response, cache_ttl)
+            return response
+        
+        if not coalesce:
+            return await call_and_store()
+        
+        return await self._single_flight(key, call_and_store)
+    
+    async def _single_flight(self, key: str, call: Callable[[], Any]) -> LLMResponse:
+        """Run call once for all concurrent callers with the same key"""
+        
+        task = self._in_flight.get(key)
+        
+        # Calls made from another event loop (e.g. a separate worker thread) cannot be shared
+        if task is not None and task.get_loop() is not asyncio.get_running_loop():
+            return await call()
+        
+        if task is None:
+            self.single_flight_stats["leaders"] += 1
+            task = asyncio.ensure_future(call())
+            self._in_flight[key] = task
+            
+            def _done(finished: asyncio.Task):
+                if self._in_flight.get(key) is finished:
+                    del self._in_flight[key]
+                # Mark the exception retrieved in case every caller was cancelled
+                if not finished.cancelled():
+                    finished.exception()
+            
+            task.add_done_callback(_done)
+            metadata = {}
+        else:
+            self.single_flight_stats["coalesced"] += 1
+            metadata = {"coalesced": True}
+        
+        # Shield so one cancelled caller does not cancel the call for the others
+        response = await asyncio.shield(task)
+        return _copy_response(response, **metadata)
+    
+    def _request_key(self, messages: List[Dict[str, str]], kwargs: Dict[str, Any]) -> str:
+        """Build the cache key for a request any provider may answer"""
+        extra = {k: v for k, v in kwargs.items() if k not in ("temperature", "max_tokens")}
+        
+        return self.response_cache.make_key(
+            "any", "any", messages, kwargs.get("temperature"), kwargs.get("max_tokens"), **extra
+        )
+    
+    def _cache_key(self, provider_name: str, messages: List[Dict[str, str]],
+                   kwargs: Dict[str, Any]) -> str:
+        """Build the response cache key for a request pinned to provider_name"""
+        config = self.clients[provider_name].config
+        extra = {k: v for k, v in kwargs.items() if k not in ("temperature", "max_tokens")}
+        
+        return self.response_cache.make_key(
+            provider_name,
+            config.model,
+            messages,
+            kwargs.get("temperature", config.temperature),
+            kwargs.get("max_tokens", config.max_tokens),
+            **extra
+        )
     
     def get_status(self) -> Dict[str, Any]:
         """Get LLM manager status"""
         return {
             "current_provider": self.current_provider,
             "available_providers": self.get_available_providers(),
-            "total_clients": len(self.clients)
+            "total_clients": len(self.clients),
+            "connection_pool": self.pool.get_status(),
+            "response_cache": self.response_cache.get_stats(),
+            "single_flight": {**self.single_flight_stats, "in_flight": len(self._in_flight)},
+            "hedging": {"enabled": self.hedge_config.enabled, **self.hedge_stats},
+            "context_budget": {"enabled": self.context_budget_enabled, **self.budget_stats},
+            "prompt_cache": dict(self.prompt_cache_stats)
         }
     
     async def cleanup(self):
-        """Clean up all client sessions"""
+        """Clean up all client sessions and the shared connection pool"""
         for client in self.clients.values():
             if hasattr(client, 'close'):
                 try:
                     await client.close()
                 except:
                     pass
+        
+        try:
+            await self.pool.close()
+        except Exception as e:
+            self.logger.warning(f"Error closing connection pool: {e}")
 
-# Global LLM manager instance
-llm_manager = LLMManager()
+# Global LLM manager instance (built on first use)
+llm_manager = services.lazy("llm_manager", LLMManager)
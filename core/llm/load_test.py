@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+LLM Load Test - Drive LLMManager with simulated users against stand-in providers
+"""
+
+import asyncio
+import contextvars
+import json
+import math
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, field, asdict
+
+from core.llm.llm_manager import LLMManager, LLMConfig, LLMProvider
+from core.llm.quota_manager import QuotaManager
+from core.llm.cassette_client import CassetteClient, CassetteEntry
+from core.llm.rate_limiter import RateLimitConfig, RateLimitExceeded
+from core.llm.circuit_breaker import classify_error
+
+@dataclass
+class StandInProvider:
+    """Simulated provider replayed from a cassette"""
+    name: str
+    mean_latency: float = 0.1
+    stddev: float = 0.03
+    rate_limit_errors: float = 0.0
+    server_errors: float = 0.0
+    max_concurrency: Optional[int] = None
+    requests_per_minute: Optional[int] = None
+
+    @classmethod
+    def parse(cls, spec: str) -> "StandInProvider":
+        """Parse name[:mean_latency[:error_rate[:max_concurrency[:rpm]]]]"""
+        parts = spec.split(":")
+        provider = cls(parts[0])
+        if len(parts) > 1 and parts[1]:
+            provider.mean_latency = float(parts[1])
+            provider.stddev = provider.mean_latency * 0.3
+        if len(parts) > 2 and parts[2]:
+            # Split the error budget between 429s and 5xx
+            provider.rate_limit_errors = provider.server_errors = float(parts[2]) / 2
+        if len(parts) > 3 and parts[3]:
+            provider.max_concurrency = int(parts[3])
+        if len(parts) > 4 and parts[4]:
+            provider.requests_per_minute = int(parts[4])
+        return provider
+
+@dataclass
+class LoadTestConfig:
+    """Load test shape"""
+    users: int = 10
+    requests_per_user: int = 20
+    arrival_rate: float = 0.0            # Requests/second per user (Poisson); 0 = back to back
+    prompt_mix: Dict[str, float] = field(default_factory=lambda: {"short": 0.6, "medium": 0.3, "long": 0.1})
+    file_generation_ratio: float = 0.2   # Prompts routed through SmartLLMWrapper filtering
+    repeat_ratio: float = 0.2            # Prompts repeated from earlier ones (cacheable)
+    use_smart_wrapper: bool = True
+    use_cache: bool = True
+    cassette_path: Optional[str] = None  # Recorded cassette; synthetic responses if None
+    providers: List[StandInProvider] = field(default_factory=lambda: [
+        StandInProvider("bench_fast", mean_latency=0.05, stddev=0.015, rate_limit_errors=0.02),
+        StandInProvider("bench_slow", mean_latency=0.15, stddev=0.05, server_errors=0.05),
+    ])
+    seed: int = 42
+
+@dataclass
+class RequestSample:
+    """Outcome of one simulated request"""
+    latency: float
+    ok: bool
+    size: str
+    provider: Optional[str] = None
+    attempts: int = 1
+    cache_hit: bool = False
+    coalesced: bool = False
+    filtered: bool = False
+    error_kind: Optional[str] = None
+
+PROMPT_SIZES = {"short": 12, "medium": 250, "long": 2000}     # Approximate words
+
+FILE_GENERATION_PROMPTS = [
+    "Create a landing page website and save it as index.html",
+    "Write a python script that renames files, save to rename.py",
+    "Generate a JSON config file for the deployment",
+]
+
+FILLER = ("The assistant should consider the context carefully before answering the question "
+          "and keep the response focused on the task. ").split()
+
+SYNTHETIC_RESPONSES = [
+    "Here is a concise answer to your question with the key points summarized.",
+    "Sure! Here's the file:\n```html\n<!DOCTYPE html>\n<html><body><h1>Hello</h1></body></html>\n```\nLet me know if you need changes.",
+    "Here's the script:\n```python\nimport os\n\nfor name in os.listdir('.'):\n    print(name)\n```\nRun it from the target directory.",
+    "```json\n{\"replicas\": 3, \"image\": \"jarvis:latest\"}\n```",
+]
+
+# Provider calls made on behalf of the current simulated request
+_attempts: contextvars.ContextVar = contextvars.ContextVar("load_test_attempts")
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+class StandInClient(CassetteClient):
+    """Cassette replay that notes each call against the current simulated request"""
+
+    def __init__(self, name: str, config: LLMConfig):
+        super().__init__(config)
+        self.name = name
+
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs):
+        self._count_attempt()
+        return await super().generate(prompt, system_prompt, **kwargs)
+
+    async def chat(self, messages: List[Dict[str, str]], **kwargs):
+        self._count_attempt()
+        return await super().chat(messages, **kwargs)
+
+    def _count_attempt(self):
+        attempts = _attempts.get(None)
+        if attempts is not None:
+            attempts.append(self.name)
+
+def write_synthetic_cassette(path: str):
+    """Cassette of canned responses (plain answers and fenced code) for replay"""
+    with open(path, "w", encoding="utf-8") as f:
+        for index, content in enumerate(SYNTHETIC_RESPONSES):
+            entry = CassetteEntry(f"synthetic-{index}", content, "synthetic", "synthetic",
+                                  latency=0.1, tokens_used=len(content) // 4)
+            f.write(json.dumps(asdict(entry)) + "\n")
+
+class LoadTest:
+    """Runs simulated users through LLMManager (and optionally SmartLLMWrapper)
+
+    Provider attempts (and so fallbacks) are only counted for StandInClient
+    providers, which build_manager() injects through LLMManager(clients=).
+    """
+
+    def __init__(self, config: LoadTestConfig, manager: Optional[LLMManager] = None):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.manager = manager
+        self.quota_manager = QuotaManager()   # Stand-in limits and breaker state stay out of the global one
+        self.samples: List[RequestSample] = []
+        self._issued_prompts: List[str] = []
+        self._tmp_dir: Optional[tempfile.TemporaryDirectory] = None
+        self._wrapper = None
+
+    def build_manager(self) -> LLMManager:
+        """LLMManager whose only clients are the stand-in providers"""
+        cassette_path = self.config.cassette_path
+        if not cassette_path:
+            self._tmp_dir = tempfile.TemporaryDirectory()
+            cassette_path = os.path.join(self._tmp_dir.name, "synthetic.jsonl")
+            write_synthetic_cassette(cassette_path)
+
+        clients = {}
+        for index, provider in enumerate(self.config.providers):
+            client = StandInClient(provider.name, LLMConfig(
+                provider=LLMProvider.CASSETTE,
+                model=f"stand-in-{provider.name}",
+                extra_params={"cassette": {
+                    "path": cassette_path,
+                    "on_miss": "cycle",
+                    "seed": self.config.seed + index,
+                    "latency": {"kind": "lognormal", "mean": provider.mean_latency, "stddev": provider.stddev},
+                    "errors": {"rate_limit": provider.rate_limit_errors, "server_error": provider.server_errors},
+                    "max_concurrency": provider.max_concurrency,
+                    "on_overload": "reject"
+                }}
+            ))
+            if not client.validate_config():
+                continue
+            clients[provider.name] = client
+            if provider.requests_per_minute:
+                self.quota_manager.configure_rate_limit(
+                    provider.name, RateLimitConfig(requests_per_minute=provider.requests_per_minute, max_queue_wait=1.0)
+                )
+
+        if not clients:
+            raise ValueError("No stand-in providers could be registered")
+
+        manager = LLMManager(quota_manager=self.quota_manager, clients=clients)
+        manager.response_cache.enabled = self.config.use_cache
+        return manager
+
+    def _make_prompt(self) -> Tuple[str, str]:
+        """Pick a prompt: repeated, file generation, or a sized filler prompt"""
+        if self._issued_prompts and self.rng.random() < self.config.repeat_ratio:
+            prompt = self.rng.choice(self._issued_prompts)
+            return prompt, "repeat"
+
+        if self.rng.random() < self.config.file_generation_ratio:
+            prompt = f"{self.rng.choice(FILE_GENERATION_PROMPTS)} (variant {self.rng.randrange(10**6)})"
+            size = "file"
+        else:
+            sizes = list(self.config.prompt_mix)
+            size = self.rng.choices(sizes, weights=[self.config.prompt_mix[s] for s in sizes])[0]
+            words = [self.rng.choice(FILLER) for _ in range(PROMPT_SIZES[size])]
+            prompt = f"Question {self.rng.randrange(10**6)}: " + " ".join(words)
+
+        self._issued_prompts.append(prompt)
+        return prompt, size
+
+    async def _request(self, prompt: str, size: str):
+        attempts: List[str] = []
+        token = _attempts.set(attempts)
+        start = time.monotonic()
+        try:
+            if self.config.use_smart_wrapper:
+                response = await self._wrapper.generate(prompt, use_cache=self.config.use_cache)
+            else:
+                response = await self.manager.generate(prompt, use_cache=self.config.use_cache)
+
+            metadata = response.metadata or {}
+            served_by = attempts[-1] if attempts else "cache"
+            self.samples.append(RequestSample(
+                latency=time.monotonic() - start, ok=True, size=size,
+                provider=served_by, attempts=len(attempts),
+                cache_hit=bool(metadata.get("cache_hit")),
+                coalesced=bool(metadata.get("coalesced")),
+                filtered=bool(metadata.get("content_filtered"))
+            ))
+        except Exception as e:
+            if isinstance(e, RateLimitExceeded):
+                kind = "quota_rejected"
+            elif "cooldown" in str(e) or "No valid provider" in str(e):
+                kind = "no_provider"
+            else:
+                kind = classify_error(e).value
+            self.samples.append(RequestSample(
+                latency=time.monotonic() - start, ok=False, size=size,
+                attempts=len(attempts), error_kind=kind
+            ))
+        finally:
+            _attempts.reset(token)
+
+    async def _user(self):
+        for _ in range(self.config.requests_per_user):
+            if self.config.arrival_rate > 0:
+                await asyncio.sleep(self.rng.expovariate(self.config.arrival_rate))
+            prompt, size = self._make_prompt()
+            await self._request(prompt, size)
+
+    async def run(self) -> Dict[str, Any]:
+        """Run all users to completion and return the report"""
+        if self.manager is None:
+            self.manager = self.build_manager()
+        if self.config.use_smart_wrapper:
+            from core.llm.smart_llm_wrapper import SmartLLMWrapper
+            self._wrapper = SmartLLMWrapper(self.manager)
+
+        start = time.monotonic()
+        try:
+            await asyncio.gather(*(self._user() for _ in range(self.config.users)))
+        finally:
+            elapsed = time.monotonic() - start
+            if self._tmp_dir:
+                self._tmp_dir.cleanup()
+
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        """Summarize samples"""
+        ok = [s for s in self.samples if s.ok]
+        latencies = [s.latency for s in ok]
+        errors: Dict[str, int] = {}
+        for sample in self.samples:
+            if not sample.ok:
+                errors[sample.error_kind] = errors.get(sample.error_kind, 0) + 1
+
+        by_provider: Dict[str, int] = {}
+        for sample in ok:
+            by_provider[sample.provider] = by_provider.get(sample.provider, 0) + 1
+
+        limiter_rejections = sum(
+            (status.get("rate_limit") or {}).get("rejected_requests", 0)
+            for provider, status in self.manager.quota_manager.get_status_summary().items()
+            if provider in self.manager.clients
+        )
+
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "requests": len(self.samples),
+            "succeeded": len(ok),
+            "failed": len(self.samples) - len(ok),
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_rps": round(len(ok) / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": {
+                "p50": ms(percentile(latencies, 50)),
+                "p95": ms(percentile(latencies, 95)),
+                "p99": ms(percentile(latencies, 99)),
+                "max": ms(max(latencies) if latencies else None)
+            },
+            "fallbacks": sum(1 for s in self.samples if s.attempts > 1),
+            "cache_hits": sum(1 for s in ok if s.cache_hit),
+            "cache_hit_rate": round(sum(1 for s in ok if s.cache_hit or s.coalesced) / len(ok), 3) if ok else 0.0,
+            "filtered_responses": sum(1 for s in ok if s.filtered),
+            "quota_rejections": errors.get("quota_rejected", 0) + errors.get("rate_limit", 0),
+            "rate_limiter_rejections": limiter_rejections,
+            "errors": errors,
+            "by_provider": by_provider
+        }
+
+def format_table(report: Dict[str, Any]) -> str:
+    """Render a report as an aligned two-column table"""
+    rows = [
+        ("Requests", report["requests"]),
+        ("Succeeded", report["succeeded"]),
+        ("Failed", report["failed"]),
+        ("Elapsed (s)", report["elapsed_seconds"]),
+        ("Throughput (req/s)", report["throughput_rps"]),
+        ("Latency p50 (ms)", report["latency_ms"]["p50"]),
+        ("Latency p95 (ms)", report["latency_ms"]["p95"]),
+        ("Latency p99 (ms)", report["latency_ms"]["p99"]),
+        ("Fallbacks", report["fallbacks"]),
+        ("Cache hit rate", f"{report['cache_hit_rate']:.1%}"),
+        ("Filtered responses", report["filtered_responses"]),
+        ("Quota rejections", report["quota_rejections"]),
+    ]
+    rows += [(f"Served by {provider}", count) for provider, count in sorted(report["by_provider"].items())]
+    rows += [(f"Error: {kind}", count) for kind, count in sorted(report["errors"].items())]
+
+    width = max(len(label) for label, _ in rows)
+    lines = [f"{'Metric'.ljust(width)} | Value", f"{'-' * width}-+-{'-' * 12}"]
+    lines += [f"{label.ljust(width)} | {value}" for label, value in rows]
+    return "\n".join(lines)
@@ -7,12 +7,13 @@ import asyncio
 import random
 from typing import Dict, List, Optional
 from core.llm.llm_manager import BaseLLMClient, LLMConfig, LLMResponse, LLMProvider
+from core.llm.connection_pool import ConnectionPool
 
 class MockLLMClient(BaseLLMClient):
     """Mock LLM client for testing and development"""
     
-    def __init__(self, config: LLMConfig):
-        super().__init__(config)
+    def __init__(self, config: LLMConfig, pool: Optional[ConnectionPool] = None):
+        super().__init__(config, pool)
         
         # Predefined responses for different types of prompts
         self.responses = {
@@ -0,0 +1,90 @@
+"""
+Prompt Cache - Provider-side prompt prefix caching (Anthropic cache_control, OpenAI-style prefixes)
+"""
+
+from typing import Dict, Any, Optional, List, Tuple, Union
+from dataclasses import dataclass
+
+from .tokenizer import count_tokens
+
+@dataclass
+class PromptCacheConfig:
+    """Provider prompt caching settings"""
+    enabled: bool = True
+    min_prefix_tokens: int = 1024     # Providers ignore cache breakpoints on shorter prefixes
+    cache_history: bool = True        # Also cache the conversation so far on multi-turn chats
+
+def stable_text(text: Optional[str]) -> str:
+    """Normalize the line endings of text that should form a byte-identical prefix across calls
+
+    Only line endings change; whitespace is part of the prompt's content
+    (Markdown hard line breaks, indented examples) and is left alone.
+    """
+    if not text:
+        return ""
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+def split_system_messages(messages: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
+    """Merge system messages (in order) into one system prompt and return the rest"""
+    system_parts = []
+    chat_messages = []
+
+    for msg in messages:
+        if msg["role"] == "system":
+            if msg["content"]:
+                system_parts.append(msg["content"])
+        else:
+            chat_messages.append(msg)
+
+    return "\n\n".join(system_parts), chat_messages
+
+def stable_prefix(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Normalize system messages so providers with automatic prefix caching see identical bytes"""
+    return [
+        {**msg, "content": stable_text(msg["content"])} if msg["role"] == "system" else msg
+        for msg in messages
+    ]
+
+def _cacheable_block(text: str) -> Dict[str, Any]:
+    return {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+
+def anthropic_system(system_prompt: str, config: PromptCacheConfig) -> Union[str, List[Dict[str, Any]]]:
+    """System parameter for the Messages API, marked cacheable (and normalized) when long enough"""
+    if not (config.enabled and system_prompt) or count_tokens(system_prompt) < config.min_prefix_tokens:
+        return system_prompt or ""
+    return [_cacheable_block(stable_text(system_prompt))]
+
+def anthropic_messages(messages: List[Dict[str, Any]], system_prompt: str,
+                       config: PromptCacheConfig) -> List[Dict[str, Any]]:
+    """Mark the end of the conversation so the next turn can reuse it as a cached prefix"""
+    if not (config.enabled and config.cache_history) or len(messages) < 2:
+        return messages
+
+    prefix_tokens = count_tokens(system_prompt) + sum(
+        count_tokens(m["content"]) for m in messages if isinstance(m.get("content"), str)
+    )
+    last = messages[-1]
+    if prefix_tokens < config.min_prefix_tokens or not isinstance(last.get("content"), str):
+        return messages
+
+    return messages[:-1] + [{**last, "content": [_cacheable_block(last["content"])]}]
+
+def _field(obj: Any, name: str) -> Any:
+    """Read a usage field from an SDK object or a plain dict"""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+def anthropic_cache_usage(usage: Any) -> Dict[str, int]:
+    """Cache read/write token counts from an Anthropic usage block"""
+    return {
+        "cache_read_tokens": _field(usage, "cache_read_input_tokens") or 0,
+        "cache_write_tokens": _field(usage, "cache_creation_input_tokens") or 0
+    }
+
+def openai_cache_usage(usage: Any) -> Dict[str, int]:
+    """Cached prompt token count from an OpenAI-compatible usage block"""
+    details = _field(usage, "prompt_tokens_details")
+    return {"cache_read_tokens": _field(details, "cached_tokens") or 0}
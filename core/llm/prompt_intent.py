@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Prompt Intent - Classify a prompt as file generation and guess the file type in one pass
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List
+
+# A rule is ("any", keywords), ("word", keywords) for whole-word matches, or
+# ("seq", (keywords, keywords, ...)): one of each, in order, on the same line.
+
+# Requests for a file or program (any rule matching is enough)
+FILE_REQUEST_RULES = [
+    # Direct file creation requests
+    ("seq", (("create",), ("file", "website", "page", "script", "app"))),
+    ("seq", (("generate",), ("file", "website", "page", "script", "app", "code"))),
+    ("seq", (("build",), ("website", "page", "app", "application"))),
+    ("seq", (("write",), ("file", "script", "code", "program"))),
+    ("seq", (("make",), ("website", "page", "app", "file"))),
+
+    # File type mentions
+    ("seq", (("html", "css", "javascript", "python", "json", "xml", "yaml"), ("file", "code", "script"))),
+    ("any", (".html", ".css", ".js", ".py", ".json", ".xml", ".yaml")),
+
+    # Web development
+    ("any", ("landing page", "website", "web app", "portfolio", "dashboard")),
+    ("any", ("frontend", "backend", "full stack")),
+
+    # Programming requests
+    ("any", ("function", "class", "module", "component", "api")),
+    ("any", ("algorithm", "script", "program", "application")),
+
+    # Save/output requests
+    ("seq", (("save",), ("as", "to", "in"), (".html", ".css", ".js", ".py", ".json"))),
+    ("seq", (("output",), ("file", "code"))),
+]
+
+# File type guesses, highest priority first
+FILE_TYPE_RULES = [
+    # File extensions
+    ("html", ("any", (".html", ".htm"))),
+    ("python", ("any", (".py",))),
+    ("javascript", ("any", (".js",))),
+    ("css", ("any", (".css",))),
+    ("json", ("any", (".json",))),
+    ("xml", ("any", (".xml",))),
+    ("yaml", ("any", (".yaml", ".yml"))),
+
+    # Specific language/technology mentions
+    ("javascript", ("word", ("javascript", "js"))),
+    ("json", ("word", ("json",))),
+    ("python", ("word", ("python", "py"))),
+    ("css", ("word", ("css",))),
+    ("html", ("word", ("html",))),
+
+    # Content-based detection
+    ("html", ("any", ("website", "web", "page", "landing"))),
+    ("javascript", ("seq", (("function",), ("javascript",)))),
+    ("javascript", ("seq", (("javascript",), ("function",)))),
+    ("python", ("seq", (("script",), ("python",)))),
+    ("python", ("seq", (("python",), ("script",)))),
+    ("json", ("seq", (("config",), ("json",)))),
+    ("json", ("seq", (("json",), ("config",)))),
+    ("css", ("any", ("style", "styling", "styles"))),
+
+    # General patterns
+    ("javascript", ("any", ("function", "const", "let", "var"))),
+    ("python", ("any", ("def", "class", "import"))),
+    ("json", ("any", ("api", "data", "config"))),
+]
+
+# Keywords that are patterns rather than literals
+_PATTERN_KEYWORDS = {"full stack": r"full.?stack"}
+
+def _rule_keywords(rule) -> List[str]:
+    kind, data = rule
+    return [keyword for group in data for keyword in group] if kind == "seq" else list(data)
+
+def _trie_pattern(words: List[str]) -> str:
+    """Regex source matching the longest of words, factored on shared prefixes"""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        source = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + source + ")?" if "" in node else source
+
+    return emit(trie)
+
+def _build_scanner():
+    keywords = set()
+    for rule in FILE_REQUEST_RULES:
+        keywords.update(_rule_keywords(rule))
+    for _, rule in FILE_TYPE_RULES:
+        keywords.update(_rule_keywords(rule))
+
+    literals = sorted(k for k in keywords if k not in _PATTERN_KEYWORDS)
+    patterns = [_PATTERN_KEYWORDS[k] for k in sorted(keywords) if k in _PATTERN_KEYWORDS]
+
+    # The scanner reports the longest keyword at each position; shorter
+    # keywords that are prefixes of it start there too
+    prefixes = {k: [shorter for shorter in literals if shorter != k and k.startswith(shorter)] for k in literals}
+    first_chars = "".join(sorted({k[0] for k in keywords}))
+    scanner = re.compile("(?=[" + re.escape(first_chars) + "])(?=(" + "|".join([_trie_pattern(literals)] + patterns) + "))")
+    return scanner, prefixes
+
+_SCANNER, _PREFIXES = _build_scanner()
+
+def _index_rules(rules) -> Dict[str, List[int]]:
+    """Rule indices by keyword, so only rules a prompt can satisfy are checked"""
+    index: Dict[str, List[int]] = {}
+    for i, rule in enumerate(rules):
+        for keyword in set(_rule_keywords(rule)):
+            index.setdefault(keyword, []).append(i)
+    return index
+
+_REQUEST_RULE_INDEX = _index_rules(FILE_REQUEST_RULES)
+_TYPE_RULE_INDEX = _index_rules([rule for _, rule in FILE_TYPE_RULES])
+
+@dataclass(frozen=True)
+class PromptIntent:
+    """What a prompt asks for"""
+    is_file_generation: bool
+    file_type: str
+
+def _keyword_positions(text: str) -> Dict[str, List[int]]:
+    """Start offsets of every keyword, overlapping ones included, in one scan"""
+    positions: Dict[str, List[int]] = {}
+    for match in _SCANNER.finditer(text):
+        keyword = match.group(1)
+        start = match.start()
+        if keyword not in _PREFIXES:
+            keyword = next(k for k, source in _PATTERN_KEYWORDS.items() if re.match(source, keyword))
+        positions.setdefault(keyword, []).append(start)
+        for shorter in _PREFIXES.get(keyword, ()):
+            positions.setdefault(shorter, []).append(start)
+    return positions
+
+def _is_word(text: str, start: int, end: int) -> bool:
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    return not (before.isalnum() or before == "_") and not (after.isalnum() or after == "_")
+
+def _sequence_from(text: str, positions: Dict[str, List[int]], groups, index: int, after: int) -> bool:
+    """One keyword of groups[index:], in order, each starting after the last and on its line"""
+    if index == len(groups):
+        return True
+    for keyword in groups[index]:
+        for start in positions.get(keyword, ()):
+            if start >= after and text.find("\n", after, start) == -1:
+                if _sequence_from(text, positions, groups, index + 1, start + len(keyword)):
+                    return True
+    return False
+
+def _matches(rule, text: str, positions: Dict[str, List[int]]) -> bool:
+    kind, data = rule
+    if kind == "any":
+        return not positions.keys().isdisjoint(data)
+    if kind == "word":
+        return any(_is_word(text, start, start + len(keyword))
+                   for keyword in data for start in positions.get(keyword, ()))
+
+    # Most prompts lack some keyword group entirely; skip those without searching
+    if any(positions.keys().isdisjoint(group) for group in data):
+        return False
+
+    # The first keyword may start anywhere; the rest stay on its line
+    return any(_sequence_from(text, positions, data, 1, start + len(first))
+               for first in data[0] for start in positions.get(first, ()))
+
+@lru_cache(maxsize=1024)
+def classify_prompt(prompt: str) -> PromptIntent:
+    """Whether a prompt requests file generation, and the likely file type"""
+    text = prompt.lower()
+    positions = _keyword_positions(text)
+
+    request_rules = sorted({i for keyword in positions for i in _REQUEST_RULE_INDEX.get(keyword, ())})
+    is_file_generation = any(_matches(FILE_REQUEST_RULES[i], text, positions) for i in request_rules)
+
+    for i in sorted({i for keyword in positions for i in _TYPE_RULE_INDEX.get(keyword, ())}):
+        file_type, rule = FILE_TYPE_RULES[i]
+        if _matches(rule, text, positions):
+            return PromptIntent(is_file_generation, file_type)
+    return PromptIntent(is_file_generation, "generic")
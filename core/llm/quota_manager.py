@@ -4,10 +4,15 @@ Quota Management System for LLM providers
 
 import time
 import logging
-from typing import Dict, Optional, Any
-from dataclasses import dataclass
+from collections import deque
+from typing import Dict, Optional, Any, Deque, Union
+from dataclasses import dataclass, field
 from enum import Enum
 
+from .routing_policy import RoutingPolicy, ROUTING_POLICIES
+from .rate_limiter import ProviderRateLimiter, RateLimitConfig
+from .circuit_breaker import CircuitBreaker, BreakerConfig, CircuitState, FailureKind, classify_error
+
 class QuotaStatus(Enum):
     AVAILABLE = "available"
     LIMITED = "limited"
@@ -23,72 +28,196 @@ class QuotaInfo:
     last_error_time: Optional[float] = None
     cooldown_until: Optional[float] = None
     error_count: int = 0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=200))
+    ewma_latency: Optional[float] = None
+    error_rate: float = 0.0
+    tokens_per_second: Optional[float] = None
+    in_flight: int = 0
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
 
 class QuotaManager:
     """Manages API quotas and provider fallbacks"""
     
-    def __init__(self):
+    def __init__(self, rate_limits: Optional[Dict[str, RateLimitConfig]] = None,
+                 breaker_config: Optional[BreakerConfig] = None):
         self.logger = logging.getLogger("quota_manager")
         self.quotas: Dict[str, QuotaInfo] = {}
         self.provider_priority = ["qwen", "gemini", "ollama"]
+        self.breaker_config = breaker_config or BreakerConfig()
+        
+        # Smoothing factor for latency / error-rate / throughput averages
+        self.ewma_alpha = 0.3
+        
+        # Cost per 1K tokens used by the "cheapest" routing policy
+        self.provider_costs: Dict[str, float] = {"ollama": 0.0, "llama_local": 0.0}
+        
+        # provider_priority order unless config opts into another policy
+        self.routing_policy: RoutingPolicy = ROUTING_POLICIES["priority"]()
+        
+        # Proactive pacing so providers are not pushed into 429s
+        self.rate_limiters: Dict[str, ProviderRateLimiter] = {}
+        for provider, config in (rate_limits or {}).items():
+            self.configure_rate_limit(provider, config)
         
     def get_quota_info(self, provider: str) -> QuotaInfo:
         """Get quota information for provider"""
         if provider not in self.quotas:
-            self.quotas[provider] = QuotaInfo(provider, QuotaStatus.AVAILABLE)
+            self.quotas[provider] = QuotaInfo(
+                provider, QuotaStatus.AVAILABLE, breaker=CircuitBreaker(self.breaker_config)
+            )
         return self.quotas[provider]
     
-    def record_success(self, provider: str):
-        """Record successful API call"""
+    def set_routing_policy(self, policy: Union[str, RoutingPolicy]):
+        """Set routing policy by name (priority, fastest, cheapest, least_loaded, weighted_random) or instance"""
+        if isinstance(policy, str):
+            if policy not in ROUTING_POLICIES:
+                raise ValueError(f"Unknown routing policy: {policy}. Available: {list(ROUTING_POLICIES)}")
+            policy = ROUTING_POLICIES[policy]()
+        
+        self.routing_policy = policy
+        self.logger.info(f"Routing policy set to {policy.name}")
+    
+    def configure_rate_limit(self, provider: str, config: Optional[RateLimitConfig] = None, **limits):
+        """Set requests/tokens per minute for provider (config or keyword limits)"""
+        config = config or RateLimitConfig(**limits)
+        self.rate_limiters[provider] = ProviderRateLimiter(config)
+        self.get_quota_info(provider)
+        self.logger.info(f"Rate limit for {provider}: {config.requests_per_minute} req/min, {config.tokens_per_minute} tokens/min")
+    
+    async def acquire_rate_limit(self, provider: str, estimated_tokens: int = 0):
+        """Queue until provider's rate limit admits the request"""
+        limiter = self.rate_limiters.get(provider)
+        if limiter:
+            await limiter.acquire(estimated_tokens)
+    
+    def record_token_usage(self, provider: str, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Correct the token bucket once actual usage is known"""
+        limiter = self.rate_limiters.get(provider)
+        if limiter:
+            limiter.record_usage(estimated_tokens, actual_tokens)
+    
+    def limits_tokens(self) -> bool:
+        """Check if any provider has a tokens-per-minute limit (requests then need a token estimate)"""
+        return any(limiter.tokens for limiter in self.rate_limiters.values())
+    
+    def has_rate_capacity(self, provider: str, estimated_tokens: int = 0) -> bool:
+        """Check if provider can take a request now without queueing"""
+        limiter = self.rate_limiters.get(provider)
+        return limiter is None or limiter.can_acquire(estimated_tokens)
+    
+    def begin_request(self, provider: str):
+        """Record a request sent to provider"""
+        quota = self.get_quota_info(provider)
+        quota.in_flight += 1
+        quota.breaker.on_request_start()
+    
+    def breaker_generation(self, provider: str) -> int:
+        """Circuit generation to tag a request with when it is sent"""
+        return self.get_quota_info(provider).breaker.generation
+    
+    def end_request(self, provider: str):
+        """Record a request to provider finished (success, error or cancellation)"""
+        quota = self.get_quota_info(provider)
+        quota.in_flight = max(0, quota.in_flight - 1)
+        quota.breaker.on_request_end()
+    
+    def _ewma(self, current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        return self.ewma_alpha * sample + (1 - self.ewma_alpha) * current
+    
+    def record_success(self, provider: str, latency: Optional[float] = None,
+                       tokens_used: Optional[int] = None, generation: Optional[int] = None):
+        """Record successful API call
+        
+        generation is the breaker_generation() the request was sent under; a
+        success from before the circuit last opened does not close it.
+        """
         quota = self.get_quota_info(provider)
         quota.requests_made += 1
+        quota.error_rate = self._ewma(quota.error_rate, 0.0)
+        
+        if latency is not None:
+            quota.latencies.append(latency)
+            quota.ewma_latency = self._ewma(quota.ewma_latency, latency)
+            if tokens_used and latency > 0:
+                quota.tokens_per_second = self._ewma(quota.tokens_per_second, tokens_used / latency)
+        
+        was_closed = quota.breaker.state == CircuitState.CLOSED
+        if not quota.breaker.record_success(generation):
+            return
+        if not was_closed:
+            self.logger.info(f"✅ {provider} recovered, circuit closed")
         quota.status = QuotaStatus.AVAILABLE
         quota.error_count = 0
         quota.last_error_time = None
         quota.cooldown_until = None
     
-    def record_quota_error(self, provider: str, error_message: str):
-        """Record quota exceeded error"""
+    def record_quota_error(self, provider: str, error: Union[str, BaseException],
+                           generation: Optional[int] = None):
+        """Record a failed call (429, timeout, 5xx or other) with the provider's circuit breaker"""
         quota = self.get_quota_info(provider)
         quota.error_count += 1
         quota.last_error_time = time.time()
+        quota.error_rate = self._ewma(quota.error_rate, 1.0)
+        
+        kind = classify_error(error)
+        was_open = quota.breaker.state == CircuitState.OPEN
+        if not quota.breaker.record_failure(kind, generation):
+            # Sent before the circuit last opened; that trip already counted it
+            return
         
-        if "quota" in error_message.lower() or "429" in error_message:
+        if quota.breaker.state == CircuitState.OPEN:
             quota.status = QuotaStatus.EXCEEDED
-            # Set cooldown for 5 minutes
-            quota.cooldown_until = time.time() + 300
-            self.logger.warning(f"⚠️ {provider} quota exceeded, cooldown until {time.ctime(quota.cooldown_until)}")
+            quota.cooldown_until = quota.breaker.open_until
+            if not was_open:
+                self.logger.warning(
+                    f"⚠️ {provider} circuit open after {kind.value}, "
+                    f"cooldown {quota.breaker.cooldown_remaining:.0f}s until {time.ctime(quota.cooldown_until)}"
+                )
         else:
             quota.status = QuotaStatus.LIMITED
     
+    def get_latency_percentile(self, provider: str, percentile: float, min_samples: int = 5) -> Optional[float]:
+        """Get a latency percentile (0-100) over recent successful calls"""
+        samples = sorted(self.get_quota_info(provider).latencies)
+        if len(samples) < min_samples:
+            return None
+        
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+    
     def is_provider_available(self, provider: str) -> bool:
         """Check if provider is available for use"""
         quota = self.get_quota_info(provider)
         
-        # Check cooldown
-        if quota.cooldown_until and time.time() < quota.cooldown_until:
-            return False
+        # Open circuits move to half-open (limited probes) once the cooldown ends
+        allowed = quota.breaker.allow_request()
         
-        # Reset status if cooldown expired
-        if quota.cooldown_until and time.time() >= quota.cooldown_until:
-            quota.status = QuotaStatus.AVAILABLE
+        if quota.breaker.state == CircuitState.HALF_OPEN:
+            quota.status = QuotaStatus.LIMITED
             quota.cooldown_until = None
-            quota.error_count = 0
         
-        return quota.status in [QuotaStatus.AVAILABLE, QuotaStatus.LIMITED]
+        return allowed
     
-    def get_best_provider(self, available_providers: list) -> Optional[str]:
-        """Get the best available provider"""
-        for provider in self.provider_priority:
-            if provider in available_providers and self.is_provider_available(provider):
-                return provider
+    def get_best_provider(self, available_providers: list, reserve: bool = False) -> Optional[str]:
+        """Get the best available provider according to the routing policy
+        
+        With reserve=True the chosen provider's request (and, when its circuit
+        is half-open, its probe slot) is taken in the same step, so concurrent
+        callers cannot all pass one probe check. Release it with end_request().
+        """
+        candidates = [p for p in available_providers if self.is_provider_available(p)]
+        if not candidates:
+            return None
         
-        # If no priority provider available, try any available
-        for provider in available_providers:
-            if self.is_provider_available(provider):
-                return provider
+        # Reroute away from rate-limited providers while any other has capacity
+        unthrottled = [p for p in candidates if self.has_rate_capacity(p)]
         
-        return None
+        best_provider = self.routing_policy.order(unthrottled or candidates, self)[0]
+        if reserve:
+            self.begin_request(best_provider)
+        return best_provider
     
     def get_status_summary(self) -> Dict[str, Any]:
         """Get quota status summary"""
@@ -98,7 +227,14 @@ class QuotaManager:
                 "status": quota.status.value,
                 "requests_made": quota.requests_made,
                 "error_count": quota.error_count,
-                "cooldown_remaining": max(0, quota.cooldown_until - time.time()) if quota.cooldown_until else 0
+                "cooldown_remaining": max(0, quota.cooldown_until - time.time()) if quota.cooldown_until else 0,
+                "ewma_latency": quota.ewma_latency,
+                "p95_latency": self.get_latency_percentile(provider, 95),
+                "error_rate": round(quota.error_rate, 4),
+                "tokens_per_second": quota.tokens_per_second,
+                "in_flight": quota.in_flight,
+                "circuit": quota.breaker.get_status(),
+                "rate_limit": self.rate_limiters[provider].get_status() if provider in self.rate_limiters else None
             }
         return summary
 
@@ -3,13 +3,27 @@ Qwen OAuth Authentication Manager
 Professional implementation for Qwen cloud API with token management
 """
 
+import os
 import json
+import stat
 import time
+import asyncio
 import logging
+import urllib.error
+import urllib.parse
+import urllib.request
 from pathlib import Path
 from typing import Optional, Dict, Any
 from dataclasses import dataclass
 
+# Qwen Code OAuth endpoint and public client id
+QWEN_TOKEN_ENDPOINT = "https://chat.qwen.ai/api/v1/oauth2/token"
+QWEN_CLIENT_ID = "f0304373b74a44d2b584a3fb70ca9e56"
+
+class QwenAuthError(Exception):
+    """Raised when the token endpoint rejects a refresh"""
+    pass
+
 @dataclass
 class QwenOAuthToken:
     """Qwen OAuth token data"""
@@ -26,6 +40,15 @@ class QwenOAuthToken:
         buffer_time = 5 * 60 * 1000  # 5 minutes in milliseconds
         return current_time >= (self.expiry_date - buffer_time)
     
+    @property
+    def is_hard_expired(self) -> bool:
+        """Check if the token can no longer be used at all"""
+        return int(time.time() * 1000) >= self.expiry_date
+    
+    def seconds_until(self, margin: float = 0) -> float:
+        """Seconds until expiry minus margin (negative once passed)"""
+        return (self.expiry_date / 1000 - margin) - time.time()
+    
     @property
     def authorization_header(self) -> str:
         """Get authorization header value"""
@@ -34,11 +57,27 @@ class QwenOAuthToken:
 class QwenAuthManager:
     """Manages Qwen OAuth authentication and token refresh"""
     
-    def __init__(self, creds_path: str = "/home/krawin/.qwen/oauth_creds.json"):
+    def __init__(self, creds_path: str = "/home/krawin/.qwen/oauth_creds.json",
+                 token_endpoint: str = QWEN_TOKEN_ENDPOINT, client_id: str = QWEN_CLIENT_ID,
+                 refresh_margin: float = 600, poll_interval: float = 30, request_timeout: float = 15):
         self.creds_path = creds_path  # Use string instead of Path for Temporal compatibility
         self.logger = logging.getLogger("qwen_auth")
         self._token: Optional[QwenOAuthToken] = None
         
+        # Background refresh: renew refresh_margin seconds before expiry and
+        # poll the credentials file for updates written by other tools
+        self.token_endpoint = token_endpoint
+        self.client_id = client_id
+        self.refresh_margin = refresh_margin
+        self.poll_interval = poll_interval
+        self.request_timeout = request_timeout
+        
+        self._file_mtime: Optional[float] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.refresh_stats = {"refreshes": 0, "failures": 0, "file_reloads": 0}
+        
     def load_token(self) -> Optional[QwenOAuthToken]:
         """Load OAuth token from credentials file"""
         try:
@@ -51,6 +90,7 @@ class QwenAuthManager:
                 self.logger.error(f"Qwen credentials file not found: {creds_path_str}")
                 return None
             
+            mtime = os.path.getmtime(creds_path_str)
             with open(creds_path_str, 'r') as f:
                 creds_data = json.load(f)
             
@@ -63,6 +103,7 @@ class QwenAuthManager:
             )
             
             self._token = token
+            self._file_mtime = mtime
             self.logger.info("✅ Qwen OAuth token loaded successfully")
             
             if token.is_expired:
@@ -75,7 +116,12 @@ class QwenAuthManager:
             return None
     
     def get_valid_token(self) -> Optional[QwenOAuthToken]:
-        """Get a valid (non-expired) token"""
+        """Get the current token without blocking on a refresh
+        
+        Only the first call reads the credentials file. An expiring token
+        is renewed by the background refresh task; it is still returned
+        here so live requests never wait on auth.
+        """
         if not self._token:
             self._token = self.load_token()
         
@@ -83,13 +129,198 @@ class QwenAuthManager:
             return None
         
         if self._token.is_expired:
-            self.logger.warning("Token expired, attempting refresh...")
-            # TODO: Implement token refresh logic
-            # For now, reload from file (assuming external refresh)
-            self._token = self.load_token()
+            self.ensure_background_refresh()
         
         return self._token
     
+    async def get_valid_token_async(self) -> Optional[QwenOAuthToken]:
+        """Get a usable token, refreshing inline only if it has fully expired"""
+        token = self.get_valid_token()
+        
+        if token and token.is_hard_expired:
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.logger.error(f"Qwen token refresh failed: {e}")
+            token = self._token
+        
+        return token
+    
+    async def get_auth_headers_async(self) -> Dict[str, str]:
+        """Async variant of get_auth_headers that also keeps refresh running"""
+        self.ensure_background_refresh()
+        token = await self.get_valid_token_async()
+        if not token:
+            raise ValueError("No valid Qwen authentication token available")
+        
+        return {
+            "Authorization": token.authorization_header,
+            "Content-Type": "application/json"
+        }
+    
+    def _credentials_changed(self) -> bool:
+        """Whether the credentials file was modified since we last read it"""
+        try:
+            return os.path.getmtime(str(self.creds_path)) != self._file_mtime
+        except OSError:
+            return False
+    
+    def _get_lock(self) -> asyncio.Lock:
+        # asyncio.Lock binds to the loop it is first used on
+        loop = asyncio.get_running_loop()
+        if self._refresh_lock is None or self._lock_loop is not loop:
+            self._refresh_lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._refresh_lock
+    
+    async def refresh(self, force: bool = False) -> Optional[QwenOAuthToken]:
+        """Renew the token (or pick up a newer one from disk); concurrent calls share one refresh"""
+        async with self._get_lock():
+            # Another tool (e.g. the qwen CLI) may have refreshed the file already
+            if self._credentials_changed():
+                self._reload_from_file()
+            
+            token = self._token
+            if token and not force and token.seconds_until(self.refresh_margin) > 0:
+                return token
+            
+            if not token or not token.refresh_token:
+                raise QwenAuthError("No refresh token available")
+            
+            try:
+                data = await asyncio.to_thread(self._request_refresh, token.refresh_token)
+            except Exception:
+                self.refresh_stats["failures"] += 1
+                raise
+            
+            self._token = QwenOAuthToken(
+                access_token=data["access_token"],
+                token_type=data.get("token_type", token.token_type),
+                refresh_token=data.get("refresh_token") or token.refresh_token,
+                resource_url=data.get("resource_url", token.resource_url),
+                expiry_date=int((time.time() + data["expires_in"]) * 1000)
+            )
+            await asyncio.to_thread(self._save_token, self._token)
+            
+            self.refresh_stats["refreshes"] += 1
+            self.logger.info("🔄 Qwen OAuth token refreshed")
+            return self._token
+    
+    def _request_refresh(self, refresh_token: str) -> Dict[str, Any]:
+        """POST the refresh grant to the token endpoint (runs in a worker thread)"""
+        body = urllib.parse.urlencode({
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+            "client_id": self.client_id
+        }).encode()
+        
+        request = urllib.request.Request(self.token_endpoint, data=body, headers={
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Accept": "application/json"
+        })
+        
+        try:
+            with urllib.request.urlopen(request, timeout=self.request_timeout) as response:
+                data = json.loads(response.read().decode())
+        except urllib.error.HTTPError as e:
+            raise QwenAuthError(f"Token endpoint error {e.code}: {e.read().decode(errors='replace')}")
+        
+        if "access_token" not in data or "expires_in" not in data:
+            raise QwenAuthError(f"Unexpected token response: {data.get('error', data)}")
+        
+        return data
+    
+    def _save_token(self, token: QwenOAuthToken):
+        """Write the token back atomically, keeping any other fields in the file"""
+        path = str(self.creds_path)
+        
+        try:
+            with open(path, 'r') as f:
+                creds_data = json.load(f)
+        except (OSError, ValueError):
+            creds_data = {}
+        
+        creds_data.update({
+            "access_token": token.access_token,
+            "token_type": token.token_type,
+            "refresh_token": token.refresh_token,
+            "resource_url": token.resource_url,
+            "expiry_date": token.expiry_date
+        })
+        
+        # The replacement keeps the credentials file's mode (owner-only for a new file)
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except OSError:
+            mode = 0o600
+        
+        tmp_path = f"{path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            os.chmod(tmp_path, mode)
+            json.dump(creds_data, f, indent=2)
+        os.replace(tmp_path, path)
+        
+        self._file_mtime = os.path.getmtime(path)
+    
+    def _reload_from_file(self):
+        previous = self._token
+        if self.load_token() is None:
+            # Keep the token we had if the file is mid-write or broken
+            self._token = previous
+        else:
+            self.refresh_stats["file_reloads"] += 1
+    
+    def ensure_background_refresh(self):
+        """Start the refresh task on the running loop (no-op outside a loop)"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        
+        task = self._refresh_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._refresh_task = loop.create_task(self._refresh_loop())
+    
+    async def stop_background_refresh(self):
+        """Cancel the refresh task"""
+        task, self._refresh_task = self._refresh_task, None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    
+    async def _refresh_loop(self):
+        """Renew ahead of expiry and pick up external credential updates"""
+        backoff = 1.0
+        
+        while True:
+            try:
+                if self._credentials_changed():
+                    async with self._get_lock():
+                        self._reload_from_file()
+                
+                token = self._token
+                if token and token.refresh_token and token.seconds_until(self.refresh_margin) <= 0:
+                    await self.refresh()
+                
+                backoff = 1.0
+                wait = self.poll_interval
+                until_refresh = self._token.seconds_until(self.refresh_margin) if self._token else 0
+                if until_refresh > 0:
+                    wait = min(wait, until_refresh)
+                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"Background Qwen token refresh failed: {e}")
+                wait = min(backoff, self.poll_interval)
+                backoff = min(backoff * 2, 300)
+            
+            await asyncio.sleep(wait)
+    
     def get_auth_headers(self) -> Dict[str, str]:
         """Get authentication headers for API requests"""
         token = self.get_valid_token()
@@ -102,9 +333,9 @@ class QwenAuthManager:
         }
     
     def is_authenticated(self) -> bool:
-        """Check if we have valid authentication"""
+        """Check if we have valid authentication (or can refresh it)"""
         token = self.get_valid_token()
-        return token is not None and not token.is_expired
+        return token is not None and (not token.is_expired or bool(token.refresh_token))
     
     def get_base_url(self) -> str:
         """Get the base URL for API requests"""
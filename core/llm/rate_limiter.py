@@ -0,0 +1,170 @@
+"""
+Rate Limiter - Per-provider token buckets for requests and tokens per minute
+"""
+
+import os
+import time
+import asyncio
+import threading
+import weakref
+from typing import Dict, Any, Optional
+from dataclasses import dataclass
+from .tokenizer import count_tokens
+
+class RateLimitExceeded(Exception):
+    """Raised when a request would wait longer than the allowed queue time"""
+    pass
+
+@dataclass
+class RateLimitConfig:
+    """Provider rate limits (None disables a bucket)"""
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+    max_queue_wait: float = 30.0      # Seconds a request may queue before giving up
+
+    @classmethod
+    def from_settings(cls, provider: str, settings: Optional[Dict[str, Any]] = None) -> Optional["RateLimitConfig"]:
+        """Limits from a provider's config block, overridden by <PROVIDER>_RPM / <PROVIDER>_TPM
+
+        Returns None when neither sets a limit.
+        """
+        settings = settings or {}
+        prefix = provider.upper()
+        rpm = os.getenv(f"{prefix}_RPM") or settings.get("requests_per_minute")
+        tpm = os.getenv(f"{prefix}_TPM") or settings.get("tokens_per_minute")
+        if not (rpm or tpm):
+            return None
+
+        config = cls(int(rpm) if rpm else None, int(tpm) if tpm else None)
+        config.max_queue_wait = float(settings.get("max_queue_wait", config.max_queue_wait))
+        return config
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at rate per second"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.level = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (0 if available now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_per_second
+
+    def take(self, amount: float):
+        """Take amount from the bucket (level may go negative to record debt)"""
+        self._refill()
+        self.level -= amount
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self.level
+
+class ProviderRateLimiter:
+    """Paces one provider's requests and tokens, queueing callers FIFO"""
+
+    def __init__(self, config: RateLimitConfig):
+        self.config = config
+        self.requests = (TokenBucket(config.requests_per_minute, config.requests_per_minute / 60)
+                         if config.requests_per_minute else None)
+        self.tokens = (TokenBucket(config.tokens_per_minute, config.tokens_per_minute / 60)
+                       if config.tokens_per_minute else None)
+
+        # Callers queue FIFO per event loop; bucket updates are atomic across threads
+        self._queues: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+        self._state_lock = threading.Lock()
+        self.queue_depth = 0
+        self.queued_requests = 0
+        self.rejected_requests = 0
+        self.total_wait = 0.0
+
+    def wait_time(self, tokens: int = 0) -> float:
+        """Seconds until a request of this size would be admitted"""
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.wait_time(1))
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.wait_time(tokens))
+        return wait
+
+    def can_acquire(self, tokens: int = 0) -> bool:
+        """Whether a request would be admitted without queueing"""
+        return self.queue_depth == 0 and self.wait_time(tokens) <= 0
+
+    def _try_take(self, tokens: int) -> float:
+        """Consume one request and tokens if available now, else return the wait"""
+        with self._state_lock:
+            wait = self.wait_time(tokens)
+            if wait <= 0:
+                if self.requests:
+                    self.requests.take(1)
+                if self.tokens and tokens:
+                    self.tokens.take(min(tokens, self.tokens.capacity))
+            return wait
+
+    async def acquire(self, tokens: int = 0):
+        """Wait for capacity, then consume one request and tokens"""
+        loop = asyncio.get_running_loop()
+        queue = self._queues.get(loop)
+        if queue is None:
+            queue = self._queues[loop] = asyncio.Lock()
+
+        start = time.monotonic()
+        with self._state_lock:
+            self.queue_depth += 1
+        try:
+            async with queue:
+                while True:
+                    wait = self._try_take(tokens)
+                    if wait <= 0:
+                        break
+
+                    if time.monotonic() - start + wait > self.config.max_queue_wait:
+                        self.rejected_requests += 1
+                        raise RateLimitExceeded(
+                            f"Rate limit queue wait {wait:.1f}s exceeds {self.config.max_queue_wait}s"
+                        )
+
+                    await asyncio.sleep(wait)
+        finally:
+            with self._state_lock:
+                self.queue_depth -= 1
+            waited = time.monotonic() - start
+            if waited > 0.001:
+                self.queued_requests += 1
+                self.total_wait += waited
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Reconcile the token estimate taken at acquire time with actual usage"""
+        if self.tokens and actual_tokens is not None:
+            with self._state_lock:
+                self.tokens.take(actual_tokens - min(estimated_tokens, self.tokens.capacity))
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get limiter status"""
+        return {
+            "requests_per_minute": self.config.requests_per_minute,
+            "tokens_per_minute": self.config.tokens_per_minute,
+            "available_requests": int(self.requests.available) if self.requests else None,
+            "available_tokens": int(self.tokens.available) if self.tokens else None,
+            "queue_depth": self.queue_depth,
+            "queued_requests": self.queued_requests,
+            "rejected_requests": self.rejected_requests,
+            "total_wait_seconds": round(self.total_wait, 3),
+            "avg_wait_seconds": round(self.total_wait / self.queued_requests, 3) if self.queued_requests else 0.0
+        }
+
+def estimate_tokens(*texts: Optional[str]) -> int:
+    """Fast token estimate used for rate-limit admission"""
+    return sum(count_tokens(text) for text in texts if text)
@@ -0,0 +1,119 @@
+"""
+LLM Response Cache - LRU memory tier with optional Redis tier
+"""
+
+import copy
+import json
+import time
+import hashlib
+import logging
+from typing import Dict, Any, Optional, List
+
+from core.optimization.performance import SimpleCache
+
+def _response_size(response) -> int:
+    """Approximate bytes held by a cached response"""
+    return len(response.content.encode("utf-8")) + 256
+
+class LLMResponseCache:
+    """Caches LLM responses keyed on provider, model, messages and sampling params"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, default_ttl: float = 300,
+                 enabled: bool = True):
+        self.logger = logging.getLogger("llm_response_cache")
+        self.enabled = enabled
+        self.default_ttl = default_ttl
+        self.memory = SimpleCache(default_ttl, max_bytes=max_bytes, sizeof=_response_size)
+        self.db = None
+        self.stats = {"redis_hits": 0, "redis_misses": 0}
+
+    def attach_redis(self, db):
+        """Enable the Redis tier through a DatabaseManager"""
+        self.db = db
+
+    def make_key(self, provider: str, model: str, messages: List[Dict[str, str]],
+                 temperature: float, max_tokens: int, **extra) -> str:
+        """Build a stable cache key for a request"""
+        payload = {
+            "provider": provider,
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "extra": extra
+        }
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+        # Same layout as MemoryIntegration.cache_llm_response
+        return f"llm_cache:{model}:{digest}"
+
+    async def get(self, key: str):
+        """Get a copy of the cached response, or None"""
+        if not self.enabled:
+            return None
+
+        response = self.memory.get(key)
+        if response is None and self.db is not None:
+            data = await self.db.cache_get(key)
+            if isinstance(data, dict) and "response" in data:
+                self.stats["redis_hits"] += 1
+                response = self._from_payload(data)
+                self.memory.set(key, response)
+            else:
+                self.stats["redis_misses"] += 1
+
+        if response is None:
+            return None
+
+        return self._copy(response, cache_hit=True)
+
+    async def set(self, key: str, response, ttl: Optional[float] = None):
+        """Store a copy of response in every tier"""
+        if not self.enabled:
+            return
+
+        ttl = ttl or self.default_ttl
+        stored = self._copy(response)
+        self.memory.set(key, stored, ttl)
+
+        if self.db is not None:
+            await self.db.cache_set(key, self._to_payload(stored), expire=max(1, int(ttl)))
+
+    def clear(self):
+        """Clear the memory tier"""
+        self.memory.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            "enabled": self.enabled,
+            "memory": self.memory.get_stats(),
+            "redis_attached": self.db is not None,
+            **self.stats
+        }
+
+    def _copy(self, response, cache_hit: bool = False):
+        result = copy.copy(response)
+        result.metadata = dict(response.metadata or {})
+        if cache_hit:
+            result.metadata["cache_hit"] = True
+        return result
+
+    def _to_payload(self, response) -> Dict[str, Any]:
+        return {
+            "response": response.content,
+            "model": response.model,
+            "provider": response.provider,
+            "tokens_used": response.tokens_used,
+            "cached_at": time.time()
+        }
+
+    def _from_payload(self, data: Dict[str, Any]):
+        from .llm_manager import LLMResponse
+
+        return LLMResponse(
+            content=data["response"],
+            model=data.get("model", ""),
+            provider=data.get("provider", ""),
+            tokens_used=data.get("tokens_used")
+        )
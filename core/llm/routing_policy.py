@@ -0,0 +1,117 @@
+"""
+Routing Policies - Decide which available LLM provider serves a request
+"""
+
+import random
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+class RoutingPolicy(ABC):
+    """Orders available providers from most to least preferred"""
+
+    name = "base"
+
+    @abstractmethod
+    def order(self, providers: List[str], quota_manager) -> List[str]:
+        """Return providers in preference order"""
+        pass
+
+    def _priority_index(self, provider: str, quota_manager) -> int:
+        priority = quota_manager.provider_priority
+        return priority.index(provider) if provider in priority else len(priority)
+
+class PriorityPolicy(RoutingPolicy):
+    """Static priority list (QuotaManager.provider_priority), then any other provider"""
+
+    name = "priority"
+
+    def order(self, providers: List[str], quota_manager) -> List[str]:
+        return sorted(providers, key=lambda p: self._priority_index(p, quota_manager))
+
+class FastestPolicy(RoutingPolicy):
+    """Lowest EWMA latency, penalised by recent error rate
+
+    A provider with no latency yet is assumed to be as fast as the fastest
+    measured one and wins that tie, so it gets traffic until measured
+    (or until errors push it back) instead of never being tried.
+    """
+
+    name = "fastest"
+
+    def order(self, providers: List[str], quota_manager) -> List[str]:
+        measured = [
+            quota_manager.get_quota_info(p).ewma_latency for p in providers
+            if quota_manager.get_quota_info(p).ewma_latency is not None
+        ]
+        prior = min(measured) if measured else 0.0
+
+        def key(provider: str):
+            stats = quota_manager.get_quota_info(provider)
+            unmeasured = stats.ewma_latency is None
+            latency = prior if unmeasured else stats.ewma_latency
+            return (latency / max(0.05, 1.0 - stats.error_rate), not unmeasured,
+                    self._priority_index(provider, quota_manager))
+
+        return sorted(providers, key=key)
+
+class CheapestPolicy(RoutingPolicy):
+    """Lowest configured cost per 1K tokens (unknown costs rank last)"""
+
+    name = "cheapest"
+
+    def order(self, providers: List[str], quota_manager) -> List[str]:
+        def key(provider: str):
+            cost = quota_manager.provider_costs.get(provider)
+            return (cost is None, cost or 0.0, self._priority_index(provider, quota_manager))
+
+        return sorted(providers, key=key)
+
+class LeastLoadedPolicy(RoutingPolicy):
+    """Fewest requests currently in flight"""
+
+    name = "least_loaded"
+
+    def order(self, providers: List[str], quota_manager) -> List[str]:
+        return sorted(providers, key=lambda p: (
+            quota_manager.get_quota_info(p).in_flight,
+            self._priority_index(p, quota_manager)
+        ))
+
+class WeightedRandomPolicy(RoutingPolicy):
+    """Random order weighted by throughput (inverse latency and success rate)"""
+
+    name = "weighted_random"
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, rng: Optional[random.Random] = None):
+        self.weights = weights or {}
+        self.rng = rng or random.Random()
+
+    def _weight(self, provider: str, quota_manager) -> float:
+        if provider in self.weights:
+            return self.weights[provider]
+
+        stats = quota_manager.get_quota_info(provider)
+        latency = stats.ewma_latency or 1.0
+        return max(0.01, 1.0 - stats.error_rate) / max(0.01, latency)
+
+    def order(self, providers: List[str], quota_manager) -> List[str]:
+        remaining = list(providers)
+        ordered = []
+
+        while remaining:
+            weights = [self._weight(p, quota_manager) for p in remaining]
+            if sum(weights) <= 0:
+                # Zero-weight providers are only used as a last resort
+                ordered.extend(sorted(remaining, key=lambda p: self._priority_index(p, quota_manager)))
+                break
+
+            choice = self.rng.choices(remaining, weights=weights)[0]
+            ordered.append(choice)
+            remaining.remove(choice)
+
+        return ordered
+
+ROUTING_POLICIES = {
+    policy.name: policy
+    for policy in (PriorityPolicy, FastestPolicy, CheapestPolicy, LeastLoadedPolicy, WeightedRandomPolicy)
+}
@@ -2,34 +2,35 @@
 Smart LLM Wrapper - Automatically applies content filtering for file generation
 """
 
-import re
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator
 from core.llm.llm_manager import llm_manager
 from core.llm.content_filter import content_filter
+from core.llm.prompt_intent import classify_prompt
 
 class SmartLLMWrapper:
     """Intelligent wrapper that applies content filtering when appropriate"""
     
-    def __init__(self):
+    def __init__(self, manager=None):
         self.logger = logging.getLogger("smart_llm_wrapper")
+        self.manager = manager or llm_manager
     
     async def generate(self, prompt: str, system_prompt: str = None, **kwargs) -> Any:
         """Generate response with automatic content filtering for file generation"""
         
         # Get response from LLM
-        response = await llm_manager.generate(prompt, system_prompt, **kwargs)
+        response = await self.manager.generate(prompt, system_prompt, **kwargs)
         
-        # Check if this is a file generation request
-        if self._is_file_generation_request(prompt):
+        # Check if this is a file generation request (and for which file type)
+        intent = classify_prompt(prompt)
+        if intent.is_file_generation:
             self.logger.info("🔍 Detected file generation request - applying content filter")
             
-            # Detect file type from prompt
-            file_type = self._detect_file_type_from_prompt(prompt)
+            file_type = intent.file_type
             
             # Apply content filter
             original_content = response.content
-            filtered_content = content_filter.extract_code(original_content, file_type)
+            filtered_content = await content_filter.extract_code_async(original_content, file_type)
             
             # Update response with filtered content
             response.content = filtered_content
@@ -50,96 +51,34 @@ class SmartLLMWrapper:
         
         return response
     
-    def _is_file_generation_request(self, prompt: str) -> bool:
-        """Detect if the prompt is requesting file generation"""
+    async def generate_stream(self, prompt: str, system_prompt: str = None, **kwargs) -> AsyncIterator[str]:
+        """Stream a response, yielding only code as it arrives for file generation requests"""
         
-        file_generation_indicators = [
-            # Direct file creation requests
-            r'create.*?(?:file|website|page|script|app)',
-            r'generate.*?(?:file|website|page|script|app|code)',
-            r'build.*?(?:website|page|app|application)',
-            r'write.*?(?:file|script|code|program)',
-            r'make.*?(?:website|page|app|file)',
-            
-            # File type mentions
-            r'(?:html|css|javascript|python|json|xml|yaml).*?(?:file|code|script)',
-            r'(?:\.html|\.css|\.js|\.py|\.json|\.xml|\.yaml)',
-            
-            # Web development
-            r'(?:landing page|website|web app|portfolio|dashboard)',
-            r'(?:frontend|backend|full.?stack)',
-            
-            # Programming requests
-            r'(?:function|class|module|component|api)',
-            r'(?:algorithm|script|program|application)',
-            
-            # Save/output requests
-            r'save.*?(?:as|to|in).*?\.(?:html|css|js|py|json)',
-            r'output.*?(?:file|code)',
-        ]
+        chunks = self.manager.generate_stream(prompt, system_prompt, **kwargs)
         
-        prompt_lower = prompt.lower()
+        intent = classify_prompt(prompt)
+        if not intent.is_file_generation:
+            async for chunk in chunks:
+                yield chunk
+            return
         
-        return any(re.search(pattern, prompt_lower) for pattern in file_generation_indicators)
+        file_type = intent.file_type
+        self.logger.info(f"🔍 Detected file generation request - streaming {file_type} code only")
+        
+        async for code in content_filter.extract_code_stream(chunks, file_type):
+            yield code
+    
+    def _is_file_generation_request(self, prompt: str) -> bool:
+        """Detect if the prompt is requesting file generation"""
+        return classify_prompt(prompt).is_file_generation
     
     def _detect_file_type_from_prompt(self, prompt: str) -> str:
         """Detect the intended file type from the prompt"""
-        
-        prompt_lower = prompt.lower()
-        
-        # File extension patterns (highest priority)
-        if re.search(r'\.html|\.htm', prompt_lower):
-            return 'html'
-        elif re.search(r'\.py', prompt_lower):
-            return 'python'
-        elif re.search(r'\.js', prompt_lower):
-            return 'javascript'
-        elif re.search(r'\.css', prompt_lower):
-            return 'css'
-        elif re.search(r'\.json', prompt_lower):
-            return 'json'
-        elif re.search(r'\.xml', prompt_lower):
-            return 'xml'
-        elif re.search(r'\.yaml|\.yml', prompt_lower):
-            return 'yaml'
-        
-        # Specific language/technology mentions (high priority)
-        if re.search(r'\bjavascript\b|\bjs\b(?!\w)', prompt_lower):
-            return 'javascript'
-        elif re.search(r'\bjson\b', prompt_lower):
-            return 'json'
-        elif re.search(r'\bpython\b|\bpy\b(?!\w)', prompt_lower):
-            return 'python'
-        elif re.search(r'\bcss\b', prompt_lower):
-            return 'css'
-        elif re.search(r'\bhtml\b', prompt_lower):
-            return 'html'
-        
-        # Content-based detection (medium priority)
-        if re.search(r'website|web|page|landing', prompt_lower):
-            return 'html'
-        elif re.search(r'function.*javascript|javascript.*function', prompt_lower):
-            return 'javascript'
-        elif re.search(r'script.*python|python.*script', prompt_lower):
-            return 'python'
-        elif re.search(r'config.*json|json.*config', prompt_lower):
-            return 'json'
-        elif re.search(r'style|styling|styles', prompt_lower):
-            return 'css'
-        
-        # General patterns (low priority)
-        if re.search(r'function|const|let|var', prompt_lower):
-            return 'javascript'
-        elif re.search(r'def|class|import', prompt_lower):
-            return 'python'
-        elif re.search(r'api|data|config', prompt_lower):
-            return 'json'
-        
-        return 'generic'
+        return classify_prompt(prompt).file_type
     
     async def cleanup(self):
         """Cleanup resources"""
-        await llm_manager.cleanup()
+        await self.manager.cleanup()
 
 # Global smart wrapper instance
 smart_llm = SmartLLMWrapper()
@@ -0,0 +1,282 @@
+"""
+Tokenizer - Pluggable token counting and context-window budgeting for prompts
+"""
+
+import os
+import re
+import hashlib
+import logging
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, List, Callable
+from dataclasses import dataclass
+
+# Context windows (tokens) by model name prefix; longest matching prefix wins
+MODEL_CONTEXT_WINDOWS: Dict[str, int] = {
+    "claude": 200000,
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "gemini-1.5": 1000000,
+    "gemini-2": 1048576,
+    "gemini": 32768,
+    "qwen3-coder-plus": 1000000,
+    "qwen3-coder": 262144,
+    "qwen-turbo": 1000000,
+    "qwen-plus": 131072,
+    "qwen-max": 32768,
+    "qwen2.5": 32768,
+    "qwen": 131072,
+    "llama3.1": 131072,
+    "llama3.2": 131072,
+    "llama3": 8192,
+    "llama": 4096,
+    "mistral": 32768,
+}
+# Unknown models are trimmed only when clearly oversized rather than cut to a small window
+DEFAULT_CONTEXT_WINDOW = 131072
+
+# Per-message framing (role markers, separators) added by chat templates
+MESSAGE_OVERHEAD_TOKENS = 4
+
+TRUNCATION_MARKER = "\n[...]\n"
+
+def get_context_window(model: str) -> int:
+    """Context window for a model, by longest known name prefix"""
+    model = (model or "").lower()
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if model.startswith(prefix)]
+    if not matches:
+        return DEFAULT_CONTEXT_WINDOW
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)]
+
+class Tokenizer(ABC):
+    """Counts tokens in text"""
+
+    name = "base"
+    exact = False
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """Number of tokens in text"""
+        pass
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        """Tokens in a chat message list, including per-message framing"""
+        return sum(self.count(m.get("content") or "") + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+class HeuristicTokenizer(Tokenizer):
+    """Fast approximation: words, punctuation and long-word pieces"""
+
+    name = "heuristic"
+
+    # Word runs, single punctuation marks; BPE splits long words into ~4 char pieces
+    _PIECE_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self._PIECE_PATTERN.findall(text))
+
+# Where tiktoken downloads each encoding from; its cache file is named by the URL's SHA-1
+TIKTOKEN_ENCODING_URLS: Dict[str, str] = {
+    "cl100k_base": "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken",
+    "o200k_base": "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken",
+}
+
+def tiktoken_cache_dir() -> Optional[str]:
+    """tiktoken's download cache directory (None when caching is disabled)"""
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+    elif "DATA_GYM_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+    else:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    return cache_dir or None
+
+def tiktoken_encoding_is_local(name: str) -> bool:
+    """Whether tiktoken can load an encoding without downloading it"""
+    from tiktoken import registry
+    if name in registry.ENCODINGS:
+        return True
+
+    url = TIKTOKEN_ENCODING_URLS.get(name)
+    cache_dir = tiktoken_cache_dir()
+    if not url or not cache_dir:
+        return False
+    return os.path.exists(os.path.join(cache_dir, hashlib.sha1(url.encode()).hexdigest()))
+
+class TiktokenTokenizer(Tokenizer):
+    """Exact BPE counts via tiktoken for OpenAI models
+
+    Declines other models and encodings that are not cached locally, so
+    counting never triggers a download; those use the heuristic instead.
+    """
+
+    name = "tiktoken"
+    exact = True
+
+    def __init__(self, model: str):
+        import tiktoken
+        from tiktoken.model import encoding_name_for_model
+        # Raises KeyError for models tiktoken does not know (non-OpenAI)
+        encoding_name = encoding_name_for_model(model)
+        if not tiktoken_encoding_is_local(encoding_name):
+            raise LookupError(f"tiktoken encoding {encoding_name} is not cached locally")
+        self.encoding = tiktoken.get_encoding(encoding_name)
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+# Factories tried in order for a model; the first that does not raise wins
+_TOKENIZER_FACTORIES: List[Callable[[str], Tokenizer]] = [TiktokenTokenizer]
+_tokenizers: Dict[str, Tokenizer] = {}
+_heuristic = HeuristicTokenizer()
+
+def register_tokenizer(factory: Callable[[str], Tokenizer], first: bool = True):
+    """Add a tokenizer factory (raise from it to decline a model)"""
+    if first:
+        _TOKENIZER_FACTORIES.insert(0, factory)
+    else:
+        _TOKENIZER_FACTORIES.append(factory)
+    _tokenizers.clear()
+
+def get_tokenizer(model: Optional[str] = None) -> Tokenizer:
+    """Best available tokenizer for a model, falling back to the heuristic"""
+    if not model:
+        return _heuristic
+
+    tokenizer = _tokenizers.get(model)
+    if tokenizer is None:
+        tokenizer = _heuristic
+        for factory in _TOKENIZER_FACTORIES:
+            try:
+                tokenizer = factory(model)
+                break
+            except Exception:
+                # Optional dependency missing or model not supported
+                continue
+        _tokenizers[model] = tokenizer
+
+    return tokenizer
+
+def count_tokens(text: Optional[str], model: Optional[str] = None) -> int:
+    """Token count for text with the model's tokenizer"""
+    return get_tokenizer(model).count(text or "")
+
+@dataclass
+class BudgetResult:
+    """Outcome of fitting messages into a context budget"""
+    messages: List[Dict[str, str]]
+    original_tokens: int
+    final_tokens: int
+    budget: int
+    dropped_messages: int = 0
+    truncated_messages: int = 0
+    max_tokens: Optional[int] = None    # Completion limit clamped to what the window has left
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.final_tokens
+
+    @property
+    def trimmed(self) -> bool:
+        return self.dropped_messages > 0 or self.truncated_messages > 0
+
+class ContextBudgeter:
+    """Trims chat messages to fit a model's context window minus the output reserve
+
+    Oldest non-system turns are dropped first; if the remaining messages are
+    still too large, the longest ones are compacted by cutting their middle.
+    System prompts and the latest message are never dropped.
+    """
+
+    def __init__(self, min_prompt_tokens: int = 256, min_message_tokens: int = 32,
+                 min_completion_tokens: int = 256):
+        self.min_prompt_tokens = min_prompt_tokens
+        self.min_message_tokens = min_message_tokens
+        self.min_completion_tokens = min_completion_tokens
+        self.logger = logging.getLogger("context_budgeter")
+
+    def prompt_budget(self, model: str, max_tokens: Optional[int],
+                      context_window: Optional[int] = None) -> int:
+        """Tokens available to the prompt once a minimal completion is reserved
+
+        The prompt comes first: max_tokens is clamped to whatever the window
+        has left (see BudgetResult.max_tokens) rather than reserved up front.
+        """
+        window = context_window or get_context_window(model)
+        reserve = min(max_tokens or 0, self.min_completion_tokens)
+        return max(self.min_prompt_tokens, window - reserve)
+
+    def fit(self, messages: List[Dict[str, str]], model: str,
+            max_tokens: Optional[int] = None, context_window: Optional[int] = None,
+            tokenizer: Optional[Tokenizer] = None) -> BudgetResult:
+        """Return messages trimmed to the prompt budget (unchanged if they fit)"""
+        tokenizer = tokenizer or get_tokenizer(model)
+        window = context_window or get_context_window(model)
+        budget = self.prompt_budget(model, max_tokens, window)
+
+        counts = [tokenizer.count(m.get("content") or "") + MESSAGE_OVERHEAD_TOKENS for m in messages]
+        original = sum(counts)
+        result = BudgetResult(list(messages), original, original, budget)
+
+        if original <= budget:
+            result.max_tokens = self._clamp_completion(max_tokens, window, original)
+            return result
+
+        total = original
+
+        # Drop the oldest turns that are neither system prompts nor the latest message
+        droppable = [i for i, m in enumerate(messages[:-1]) if m.get("role") != "system"]
+        dropped = set()
+        for index in droppable:
+            if total <= budget:
+                break
+            dropped.add(index)
+            total -= counts[index]
+
+        kept = [m for i, m in enumerate(messages) if i not in dropped]
+        kept_counts = [c for i, c in enumerate(counts) if i not in dropped]
+        result.dropped_messages = len(dropped)
+
+        # Compact the largest remaining messages until the rest fits
+        truncated = set()
+        while total > budget:
+            index = max(range(len(kept)), key=lambda i: kept_counts[i])
+            content_tokens = kept_counts[index] - MESSAGE_OVERHEAD_TOKENS
+            target = max(self.min_message_tokens, content_tokens - (total - budget))
+            if target >= content_tokens:
+                break
+
+            content = self._truncate_middle(kept[index].get("content") or "", target, content_tokens)
+            new_count = tokenizer.count(content) + MESSAGE_OVERHEAD_TOKENS
+            if new_count >= kept_counts[index]:
+                break
+
+            kept[index] = {**kept[index], "content": content}
+            total -= kept_counts[index] - new_count
+            kept_counts[index] = new_count
+            truncated.add(index)
+
+        result.messages = kept
+        result.truncated_messages = len(truncated)
+        result.final_tokens = total
+        result.max_tokens = self._clamp_completion(max_tokens, window, total)
+        self.logger.debug(f"Trimmed prompt from {original} to {total} tokens (budget {budget})")
+        return result
+
+    def _clamp_completion(self, max_tokens: Optional[int], window: int, prompt_tokens: int) -> Optional[int]:
+        if max_tokens is None:
+            return None
+        return max(1, min(max_tokens, window - prompt_tokens))
+
+    @staticmethod
+    def _truncate_middle(text: str, target_tokens: int, current_tokens: int) -> str:
+        """Keep the head and tail of text, scaled by the token ratio"""
+        keep_chars = max(0, int(len(text) * target_tokens / max(1, current_tokens)) - len(TRUNCATION_MARKER))
+        head = keep_chars // 2
+        tail = keep_chars - head
+        return text[:head] + TRUNCATION_MARKER + (text[-tail:] if tail else "")
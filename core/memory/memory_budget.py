@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Memory Budget - Size limits, decayed retention scores and heap-ordered eviction for memories
+"""
+
+import os
+import sys
+import math
+import heapq
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Rough per-memory cost besides the content string (record, index postings, metadata)
+RECORD_OVERHEAD_BYTES = 600
+
+@dataclass
+class MemoryBudget:
+    """How much MemoryManager may hold and how fast memories fade
+
+    A memory's retention score is
+        (importance + access_weight * ln(1 + access_count)) * 0.5 ** (idle / half_life)
+    where idle is the time since it was stored or last retrieved. Memories
+    scoring below prune_below are dropped, and while the store is over
+    max_memories or max_bytes the lowest scores go first. None means no limit.
+    """
+    max_memories: Optional[int] = None
+    max_bytes: Optional[int] = None
+    half_life_days: float = 90.0
+    access_weight: float = 0.1
+    prune_below: float = 0.1
+    eviction_batch: int = 256       # Evictions between yields to the event loop
+
+    @classmethod
+    def from_env(cls) -> "MemoryBudget":
+        budget = cls()
+        max_memories = os.getenv("JARVIS_MEMORY_MAX_COUNT")
+        max_bytes = os.getenv("JARVIS_MEMORY_MAX_BYTES")
+        budget.max_memories = int(max_memories) if max_memories else None
+        budget.max_bytes = int(max_bytes) if max_bytes else None
+        budget.half_life_days = float(os.getenv("JARVIS_MEMORY_HALF_LIFE_DAYS", budget.half_life_days))
+        return budget
+
+    @property
+    def half_life_seconds(self) -> float:
+        return self.half_life_days * 86400
+
+    def retention_key(self, importance: float, access_count: int, last_used: float) -> float:
+        """log2 of the retention score, shifted so it does not change as time passes
+
+        log2(score at now) = key - now / half_life, so ordering memories by
+        key is ordering them by current score, and keys only change when a
+        memory is touched.
+        """
+        base = importance + self.access_weight * math.log1p(access_count)
+        return math.log2(max(base, 1e-9)) + last_used / self.half_life_seconds
+
+    def score_at(self, key: float, now: float) -> float:
+        """Retention score at epoch time now"""
+        return 2.0 ** (key - now / self.half_life_seconds)
+
+    def over_budget(self, count: int, total_bytes: int) -> bool:
+        return ((self.max_memories is not None and count > self.max_memories) or
+                (self.max_bytes is not None and total_bytes > self.max_bytes))
+
+def memory_size(content: str) -> int:
+    """Approximate resident size of one memory"""
+    return sys.getsizeof(content) + RECORD_OVERHEAD_BYTES
+
+class RetentionHeap:
+    """Min-heap of memory ids by retention key
+
+    Updating a key pushes a new entry and leaves the old one to be skipped
+    when it surfaces, so push, update and pop are all O(log n). The heap is
+    rebuilt when stale entries outnumber live ones.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str]] = []
+        self._current: Dict[str, int] = {}     # memory_id -> sequence of its live entry
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        return len(self._current)
+
+    def push(self, memory_id: str, key: float):
+        """Insert or re-key a memory"""
+        self._sequence += 1
+        self._current[memory_id] = self._sequence
+        heapq.heappush(self._heap, (key, self._sequence, memory_id))
+        if len(self._heap) > 2 * len(self._current) + 1024:
+            self._compact()
+
+    def discard(self, memory_id: str):
+        self._current.pop(memory_id, None)
+
+    def peek(self) -> Optional[Tuple[float, str]]:
+        """Lowest (key, memory_id) without removing it"""
+        heap = self._heap
+        while heap and self._current.get(heap[0][2]) != heap[0][1]:
+            heapq.heappop(heap)
+        return (heap[0][0], heap[0][2]) if heap else None
+
+    def pop(self) -> Optional[Tuple[float, str]]:
+        """Remove and return the lowest (key, memory_id)"""
+        lowest = self.peek()
+        if lowest is not None:
+            heapq.heappop(self._heap)
+            del self._current[lowest[1]]
+        return lowest
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap if self._current.get(entry[2]) == entry[1]]
+        heapq.heapify(self._heap)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Memory Index - Incremental inverted index with BM25 ranking for memory retrieval
+"""
+
+import re
+import math
+import heapq
+from collections import Counter
+from typing import Dict, List, Optional, Tuple, Iterable
+
+_TOKEN = re.compile(r'\w+')
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens"""
+    return _TOKEN.findall(text.lower())
+
+class _Partition:
+    """Postings and length statistics for one memory_type"""
+
+    __slots__ = ("postings", "doc_lengths", "total_length")
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}   # token -> {memory_id: term frequency}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+
+class MemoryIndex:
+    """Inverted index over memory content, partitioned by memory_type
+
+    Documents are added and removed one at a time, so the index stays in
+    step with the store without rebuilds. Queries score only the posting
+    lists of their terms (Okapi BM25) and keep the best `limit` in a heap.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.partitions: Dict[str, _Partition] = {}
+
+    def __len__(self) -> int:
+        return sum(len(p.doc_lengths) for p in self.partitions.values())
+
+    def add(self, memory_id: str, content: str, memory_type: str):
+        """Index a memory (re-adding an id replaces its previous content)"""
+        partition = self.partitions.setdefault(memory_type, _Partition())
+        if memory_id in partition.doc_lengths:
+            self.remove(memory_id, content, memory_type)
+
+        tokens = tokenize(content)
+        for token, count in Counter(tokens).items():
+            partition.postings.setdefault(token, {})[memory_id] = count
+        partition.doc_lengths[memory_id] = len(tokens)
+        partition.total_length += len(tokens)
+
+    def remove(self, memory_id: str, content: str, memory_type: str):
+        """Drop a memory; content must be what was indexed"""
+        partition = self.partitions.get(memory_type)
+        if partition is None or memory_id not in partition.doc_lengths:
+            return
+
+        for token in set(tokenize(content)):
+            posting = partition.postings.get(token)
+            if posting is not None:
+                posting.pop(memory_id, None)
+                if not posting:
+                    del partition.postings[token]
+        partition.total_length -= partition.doc_lengths.pop(memory_id)
+        if not partition.doc_lengths:
+            del self.partitions[memory_type]
+
+    def score(self, query: str, memory_type: Optional[str] = None) -> Dict[str, float]:
+        """BM25 score of every memory containing at least one query term"""
+        terms = set(tokenize(query))
+        partitions = self._partitions(memory_type)
+        doc_count = sum(len(p.doc_lengths) for p in partitions)
+        if not terms or not doc_count:
+            return {}
+        average_length = sum(p.total_length for p in partitions) / doc_count or 1.0
+
+        scores: Dict[str, float] = {}
+        get = scores.get
+        # norm = k1 * (1 - b + b * length / average_length), split into its constant parts
+        base = self.k1 * (1 - self.b)
+        per_token = self.k1 * self.b / average_length
+        for term in terms:
+            matches = [(p, p.postings[term]) for p in partitions if term in p.postings]
+            frequency = sum(len(posting) for _, posting in matches)
+            if not frequency:
+                continue
+            weight = math.log(1 + (doc_count - frequency + 0.5) / (frequency + 0.5)) * (self.k1 + 1)
+
+            for partition, posting in matches:
+                lengths = partition.doc_lengths
+                for memory_id, tf in posting.items():
+                    scores[memory_id] = get(memory_id, 0.0) + weight * tf / (tf + base + per_token * lengths[memory_id])
+
+        return scores
+
+    def search(self, query: str, memory_type: Optional[str] = None,
+               limit: int = 10) -> List[Tuple[float, str]]:
+        """Best (score, memory_id) pairs for query, highest first"""
+        scores = self.score(query, memory_type)
+        return heapq.nlargest(limit, ((score, memory_id) for memory_id, score in scores.items()))
+
+    def memory_ids(self, memory_type: Optional[str] = None) -> Iterable[str]:
+        """Every indexed id (of one memory_type if given)"""
+        for partition in self._partitions(memory_type):
+            yield from partition.doc_lengths
+
+    def _partitions(self, memory_type: Optional[str]) -> List[_Partition]:
+        if memory_type is None:
+            return list(self.partitions.values())
+        partition = self.partitions.get(memory_type)
+        return [partition] if partition else []
@@ -21,7 +21,14 @@ class MemoryIntegration:
     async def initialize(self):
         """Initialize database connections"""
         await self.db.initialize()
-        return await self.db.health_check()
+        status = await self.db.health_check()
+        
+        # Share Redis with the LLM response cache
+        if status["redis"]:
+            from core.llm.llm_manager import llm_manager
+            llm_manager.response_cache.attach_redis(self.db)
+        
+        return status
     
     async def save_conversation_turn(self, session_id: str, user_input: str, 
                                    assistant_response: str, model_used: str = None,
@@ -128,7 +135,7 @@ class MemoryIntegration:
             "memory_ready": db_status["overall"],
             "features": {
                 "conversation_memory": db_status["postgres"],
-                "semantic_search": db_status["qdrant"],
+                "semantic_search": db_status["qdrant"] or db_status["local_vectors"],
                 "response_caching": db_status["redis"]
             }
         }
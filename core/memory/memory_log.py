@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Memory Log - Write-ahead log with group commit and compacted snapshots for memory storage
+"""
+
+import os
+import json
+import zlib
+import time
+import queue
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Any, Tuple
+
+SNAPSHOT_FILE = "snapshot.jsonl"
+SEGMENT_PREFIX = "wal-"
+SEGMENT_SUFFIX = ".log"
+
+def encode_line(entry: Dict[str, Any]) -> str:
+    """One log line: crc32 of the JSON, then the JSON (non-JSON values are stored as str)"""
+    data = json.dumps(entry, separators=(",", ":"), default=str)
+    return f"{zlib.crc32(data.encode()):08x} {data}\n"
+
+def decode_line(line: str) -> Optional[Dict[str, Any]]:
+    """Entry of a complete, intact line (None for a torn or corrupt one)"""
+    if not line.endswith("\n") or len(line) < 10 or line[8] != " ":
+        return None
+    data = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(data.encode()):
+            return None
+        return json.loads(data)
+    except ValueError:
+        return None
+
+def apply_entry(state: Dict[str, Dict[str, Any]], entry: Dict[str, Any]):
+    """Apply one log entry to a {memory_id: record} state"""
+    op = entry.get("op")
+    if op == "put":
+        record = entry["memory"]
+        state[record["id"]] = record
+    elif op == "set":
+        record = state.get(entry["id"])
+        if record is not None:
+            record.update(entry["fields"])
+    elif op == "del":
+        state.pop(entry["id"], None)
+
+class MemoryLog:
+    """Durable storage for memory records in one directory
+
+    append() only queues an entry; a writer thread writes whatever has
+    queued up in one batch and fsyncs once per batch (group commit), so
+    callers never wait on the disk. The log is split into segments of
+    segment_records entries. Once compact_segments segments are sealed, a
+    background thread folds them into a new snapshot (written aside and
+    atomically renamed) and deletes them, so recovery reads one snapshot
+    plus a few segments however long the history is.
+    """
+
+    def __init__(self, directory: str, commit_interval: float = 0.002, max_batch: int = 1024,
+                 segment_records: int = 10000, compact_segments: int = 4):
+        self.directory = directory
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self.segment_records = segment_records
+        self.compact_segments = compact_segments
+        self.logger = logging.getLogger("memory_log")
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._compactor: Optional[threading.Thread] = None
+        self._segment = 1               # Sequence number of the segment being written (segments start at 1)
+        self._segment_entries = 0
+        self._file = None
+
+        self.stats = {
+            "appended": 0,
+            "written": 0,
+            "commits": 0,
+            "snapshots": 0,
+            "recovered": 0,
+            "recovery_seconds": 0.0,
+            "torn_entries": 0
+        }
+
+    # Recovery
+
+    def recover(self) -> Dict[str, Dict[str, Any]]:
+        """Load the snapshot and replay newer segments (call before start)"""
+        start_time = time.perf_counter()
+        os.makedirs(self.directory, exist_ok=True)
+
+        state, covered = self._read_snapshot()
+        segments = [seq for seq in self._segments() if seq > covered]
+        for seq in segments:
+            for entry in self._read_segment(seq):
+                apply_entry(state, entry)
+
+        # Always continue in a fresh segment, after any torn tail
+        self._segment = max(segments + [covered]) + 1
+        self.stats["recovered"] = len(state)
+        self.stats["recovery_seconds"] = time.perf_counter() - start_time
+        self.logger.info(f"Recovered {len(state)} memories from snapshot and {len(segments)} log segments "
+                         f"in {self.stats['recovery_seconds'] * 1000:.0f} ms")
+        return state
+
+    def _read_snapshot(self) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        """Snapshot state and the last segment it covers"""
+        state: Dict[str, Dict[str, Any]] = {}
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if not os.path.exists(path):
+            return state, 0
+
+        with open(path, "r", encoding="utf-8") as f:
+            header = decode_line(f.readline())
+            if header is None:
+                raise ValueError(f"Corrupt memory snapshot header in {path}")
+            for line in f:
+                record = decode_line(line)
+                if record is None:
+                    raise ValueError(f"Corrupt memory snapshot {path}")
+                state[record["id"]] = record
+        return state, header["segment"]
+
+    def _read_segment(self, seq: int) -> List[Dict[str, Any]]:
+        """Intact entries of a segment, skipping torn or corrupt lines
+
+        A failed write may leave a partial line mid-segment; batches
+        committed after it are still intact and are kept.
+        """
+        entries = []
+        torn = 0
+        with open(self._segment_path(seq), "r", encoding="utf-8") as f:
+            for line in f:
+                entry = decode_line(line)
+                if entry is None:
+                    torn += 1
+                    continue
+                entries.append(entry)
+        if torn:
+            self.stats["torn_entries"] += torn
+            self.logger.warning(f"Ignoring {torn} torn or corrupt entries in memory log segment {seq}")
+        return entries
+
+    def _segments(self) -> List[int]:
+        return sorted(
+            int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{seq:08d}{SEGMENT_SUFFIX}")
+
+    # Writing
+
+    def start(self):
+        """Start the writer thread"""
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="jarvis-memory-log", daemon=True)
+            self._writer.start()
+
+    def append(self, entry: Dict[str, Any]):
+        """Queue an entry for the next group commit (never blocks on I/O)
+
+        The entry is encoded here, so a bad entry fails in the caller
+        rather than in the writer thread.
+        """
+        line = encode_line(entry)
+        self.stats["appended"] += 1
+        self._queue.put(line)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything appended so far is on disk"""
+        if self._writer is None:
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    async def flush_async(self, timeout: Optional[float] = None) -> bool:
+        """flush() without blocking the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.flush, timeout)
+
+    def close(self):
+        """Write out queued entries and stop the background threads"""
+        if self._writer is None:
+            return
+        self._queue.put(None)
+        self._writer.join()
+        self._writer = None
+
+        if self._compactor is not None:
+            self._compactor.join()
+        # Catch up on segments sealed while the last compaction was running
+        self._maybe_compact()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+    def _write_loop(self):
+        self._open_segment()
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.commit_interval
+            while len(batch) < self.max_batch and batch[-1] is not None:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = [item for item in batch if isinstance(item, str)]
+            try:
+                self._commit(lines)
+            except Exception as e:
+                # Keep the writer alive; later batches may still succeed
+                self.logger.error(f"Failed to write memory log: {e}")
+                try:
+                    # A partial write leaves a line without its newline, which would
+                    # swallow the next entry; continue in a fresh segment instead
+                    self._rotate()
+                except OSError as rotate_error:
+                    self.logger.error(f"Failed to start a new memory log segment: {rotate_error}")
+
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is None:
+                    running = False
+
+        self._file.close()
+        self._file = None
+
+    def _commit(self, lines: List[str]):
+        """Write a batch of encoded lines and fsync once, rotating segments as they fill"""
+        if not lines:
+            return
+        self._file.write("".join(lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.stats["written"] += len(lines)
+        self.stats["commits"] += 1
+
+        self._segment_entries += len(lines)
+        if self._segment_entries >= self.segment_records:
+            self._rotate()
+            self._maybe_compact()
+
+    def _rotate(self):
+        """Seal the current segment and continue in the next one"""
+        try:
+            self._file.close()
+        except OSError:
+            pass        # Data it could not flush is lost either way
+        self._segment += 1
+        self._open_segment()
+
+    def _open_segment(self):
+        self._file = open(self._segment_path(self._segment), "a", encoding="utf-8")
+        self._segment_entries = 0
+
+    # Compaction
+
+    def _maybe_compact(self):
+        """Start a compaction once enough segments are sealed (one at a time)"""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        sealed = [seq for seq in self._segments() if seq < self._segment]
+        if len(sealed) >= self.compact_segments:
+            self._compactor = threading.Thread(target=self.compact, args=(sealed[-1],),
+                                               name="jarvis-memory-compact", daemon=True)
+            self._compactor.start()
+
+    def compact(self, through_segment: int):
+        """Fold the snapshot and segments up to through_segment into a new snapshot"""
+        try:
+            state, covered = self._read_snapshot()
+            segments = [seq for seq in self._segments() if covered < seq <= through_segment]
+            for seq in segments:
+                for entry in self._read_segment(seq):
+                    apply_entry(state, entry)
+
+            path = os.path.join(self.directory, SNAPSHOT_FILE)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(encode_line({"segment": through_segment, "count": len(state)}))
+                f.writelines(encode_line(record) for record in state.values())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            self._fsync_directory()
+
+            for seq in segments:
+                os.remove(self._segment_path(seq))
+            self.stats["snapshots"] += 1
+            self.logger.info(f"Compacted {len(segments)} log segments into a snapshot of {len(state)} memories")
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Memory log compaction failed: {e}")
+
+    def _fsync_directory(self):
+        try:
+            fd = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return      # Not supported on this platform
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
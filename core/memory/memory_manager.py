@@ -3,36 +3,41 @@ JARVIS Memory Manager - Unified interface for all memory systems
 Handles Vector DB (Qdrant), PostgreSQL, and Redis
 """
 
+import os
 import json
+import time
+import uuid
 import asyncio
 import logging
 from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
 from datetime import datetime
-import hashlib
+from pathlib import Path
 
-# Simplified implementations for now - will expand as packages install
-@dataclass
-class Memory:
-    id: str
-    content: str
-    memory_type: str
-    importance: float = 0.5
-    metadata: Dict = None
-    created_at: datetime = None
-    
-    def __post_init__(self):
-        if self.metadata is None:
-            self.metadata = {}
-        if self.created_at is None:
-            self.created_at = datetime.now()
+from core.memory.memory_index import MemoryIndex, tokenize
+from core.memory.memory_log import MemoryLog
+from core.memory.memory_budget import MemoryBudget, RetentionHeap, memory_size
+from core.memory.memory_store import Memory, MemoryStore
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 
 class MemoryManager:
     """Unified memory interface"""
     
-    def __init__(self):
+    def __init__(self, storage_dir: Optional[str] = None, budget: Optional[MemoryBudget] = None,
+                 access_flush_interval: float = 30.0):
         self.logger = logging.getLogger("memory_manager")
-        self.memories = {}  # Temporary in-memory storage
+        self.memories = MemoryStore()  # In-memory working set, persisted through self.log
+        self.index = MemoryIndex()  # Inverted index over self.memories
+        self.storage_dir = storage_dir  # None keeps memories in this process only
+        self.log: Optional[MemoryLog] = None
+        self.budget = budget or MemoryBudget()
+        self.retention = RetentionHeap()  # Eviction order over self.memories
+        self.total_bytes = 0
+        self.eviction_stats = {"evicted": 0, "pruned": 0}
+        self._consolidation_task: Optional[asyncio.Task] = None
+        self.access_flush_interval = access_flush_interval  # Seconds between access-count log writes
+        self._accessed: Dict[str, None] = {}  # Memories retrieved since access counts were last logged
+        self._access_flushed_at = time.monotonic()
         self.vector_store = None
         self.db_connection = None
         self.redis_client = None
@@ -40,16 +45,69 @@ class MemoryManager:
     async def initialize(self):
         """Initialize all memory systems"""
         try:
-            # For now, use simple file-based storage
-            self.logger.info("Memory manager initialized with file-based storage")
+            if self.storage_dir and self.log is None:
+                log = MemoryLog(self.storage_dir)
+                loop = asyncio.get_running_loop()
+                records = await loop.run_in_executor(None, log.recover)
+                
+                # Memories stored before recovery finished are kept and written to the log
+                pending = [memory for memory in self.memories.values() if memory.id not in records]
+                self._load(records)
+                for memory in pending:
+                    self._add_memory(memory)
+                
+                log.start()
+                self.log = log
+                for memory in pending:
+                    log.append({"op": "put", "memory": memory.to_record()})
+                if self.budget.over_budget(len(self.memories), self.total_bytes):
+                    self._schedule_consolidation()
+                self.logger.info(f"Memory manager initialized with file-based storage in {self.storage_dir} "
+                                 f"({len(self.memories)} memories)")
+            else:
+                self.logger.info("Memory manager initialized with in-process storage")
             return True
         except Exception as e:
             self.logger.error(f"Failed to initialize memory systems: {e}")
             return False
     
+    def _load(self, records: Dict[str, Dict[str, Any]]):
+        """Rebuild memories and the index from recovered records"""
+        memories = MemoryStore()
+        index = MemoryIndex()
+        retention = RetentionHeap()
+        total_bytes = 0
+        for memory_id, record in records.items():
+            memory = Memory.from_record(record)
+            memories.add(memory)
+            index.add(memory_id, memory.content, memory.memory_type)
+            retention.push(memory_id, self.budget.retention_key(memory.importance, memory.access_count, memory.last_used))
+            total_bytes += memory_size(memory.content)
+        self.memories = memories
+        self.index = index
+        self.retention = retention
+        self.total_bytes = total_bytes
+    
+    def _add_memory(self, memory: Memory):
+        """Add a memory to the working set, index and retention heap"""
+        self.memories.add(memory)
+        self.index.add(memory.id, memory.content, memory.memory_type)
+        self.retention.push(memory.id, self._retention_key(memory.id))
+        self.total_bytes += memory_size(memory.content)
+    
+    def _retention_key(self, memory_id: str) -> float:
+        return self.budget.retention_key(*self.memories.retention_fields(memory_id))
+    
+    async def close(self):
+        """Flush pending writes and stop the storage threads"""
+        if self.log is not None:
+            self._flush_access_counts()
+            await asyncio.get_running_loop().run_in_executor(None, self.log.close)
+            self.log = None
+    
     async def store_memory(self, content: str, memory_type: str, importance: float = 0.5, metadata: Dict = None) -> str:
         """Store a memory across all systems"""
-        memory_id = hashlib.md5(f"{content}{datetime.now()}".encode()).hexdigest()
+        memory_id = uuid.uuid4().hex
         
         memory = Memory(
             id=memory_id,
@@ -59,46 +117,128 @@ class MemoryManager:
             metadata=metadata or {}
         )
         
-        # Store in temporary memory
-        self.memories[memory_id] = memory
+        self._add_memory(memory)
+        if self.log is not None:
+            self.log.append({"op": "put", "memory": memory.to_record()})
+        
+        if self.budget.over_budget(len(self.memories), self.total_bytes):
+            self._schedule_consolidation()
         
         self.logger.info(f"Stored memory {memory_id} of type {memory_type}")
         return memory_id
     
     async def retrieve_memories(self, query: str, memory_type: Optional[str] = None, limit: int = 10) -> List[Memory]:
-        """Retrieve relevant memories"""
-        # Simple text matching for now
-        results = []
-        for memory in self.memories.values():
-            if memory_type and memory.memory_type != memory_type:
-                continue
-            if query.lower() in memory.content.lower():
-                results.append(memory)
+        """Retrieve relevant memories, best BM25 match first (then importance and recency)"""
+        
+        store = self.memories
+        if not tokenize(query):
+            # Nothing to rank by: keep the plain substring match (an empty query matches everything)
+            rows = store.rows_of_type(memory_type)
+            if query:
+                query_lower = query.lower()
+                rows = [row for row in rows if query_lower in store.contents[row].lower()]
+            best = store.top(rows, limit)
+        else:
+            scores = self.index.score(query, memory_type)
+            rows = [store.row(memory_id) for memory_id in scores]
+            best = store.top(rows, limit, list(scores.values()))
         
-        # Sort by importance and recency
-        results.sort(key=lambda m: (m.importance, m.created_at), reverse=True)
-        return results[:limit]
+        self._record_access(best)
+        return best
+    
+    def _record_access(self, memories: List[Memory]):
+        """Count a retrieval towards each memory's retention score
+        
+        Access counts are logged at most every access_flush_interval seconds
+        (and on close), one entry per memory retrieved since, so a crash
+        loses at most that much access history.
+        """
+        now = datetime.now()
+        for memory in memories:
+            memory.access_count = self.memories.record_access(memory.id, now)
+            memory.last_accessed = now
+            self.retention.push(memory.id, self._retention_key(memory.id))
+            if self.log is not None:
+                self._accessed[memory.id] = None
+        
+        if time.monotonic() - self._access_flushed_at >= self.access_flush_interval:
+            self._flush_access_counts()
+    
+    def _flush_access_counts(self):
+        """Log the current access count of every memory retrieved since the last flush"""
+        if self.log is not None:
+            for memory_id in self._accessed:
+                _, access_count, last_used = self.memories.retention_fields(memory_id)
+                self.log.append({"op": "set", "id": memory_id, "fields": {
+                    "access_count": access_count,
+                    "last_accessed": datetime.fromtimestamp(last_used).isoformat()
+                }})
+        self._accessed.clear()
+        self._access_flushed_at = time.monotonic()
     
     async def update_memory_importance(self, memory_id: str, importance: float):
         """Update memory importance based on usage"""
         if memory_id in self.memories:
-            self.memories[memory_id].importance = importance
+            self.memories.set_importance(memory_id, importance)
+            self.retention.push(memory_id, self._retention_key(memory_id))
+            if self.log is not None:
+                self.log.append({"op": "set", "id": memory_id, "fields": {"importance": importance}})
             self.logger.info(f"Updated memory {memory_id} importance to {importance}")
     
     async def consolidate_memories(self):
-        """Background task to consolidate and prune memories"""
-        # Remove low-importance old memories
-        cutoff_importance = 0.1
-        to_remove = []
+        """Background task to consolidate and prune memories
         
-        for memory_id, memory in self.memories.items():
-            if memory.importance < cutoff_importance:
-                to_remove.append(memory_id)
+        Pops the lowest retention score from the heap while the store is over
+        budget or that score has faded below budget.prune_below, yielding to
+        the event loop every budget.eviction_batch removals.
+        """
+        budget = self.budget
+        evicted = pruned = 0
         
-        for memory_id in to_remove:
-            del self.memories[memory_id]
-            
-        self.logger.info(f"Consolidated memories, removed {len(to_remove)} low-importance entries")
+        while True:
+            now = time.time()
+            for _ in range(budget.eviction_batch):
+                lowest = self.retention.peek()
+                if lowest is None:
+                    break
+                key, memory_id = lowest
+                if budget.over_budget(len(self.memories), self.total_bytes):
+                    evicted += 1
+                elif budget.score_at(key, now) < budget.prune_below:
+                    pruned += 1
+                else:
+                    break
+                self.retention.pop()
+                self._remove_memory(memory_id)
+            else:
+                await asyncio.sleep(0)
+                continue
+            break
+        
+        self.eviction_stats["evicted"] += evicted
+        self.eviction_stats["pruned"] += pruned
+        self.logger.info(f"Consolidated memories, evicted {evicted} over budget and pruned {pruned} faded entries")
+    
+    def _schedule_consolidation(self):
+        """Start consolidate_memories in the background unless it is already running"""
+        if self._consolidation_task is None or self._consolidation_task.done():
+            self._consolidation_task = asyncio.get_running_loop().create_task(self.consolidate_memories())
+    
+    def _remove_memory(self, memory_id: str):
+        content, memory_type = self.memories.remove(memory_id)
+        self.index.remove(memory_id, content, memory_type)
+        self.retention.discard(memory_id)
+        self._accessed.pop(memory_id, None)
+        self.total_bytes -= memory_size(content)
+        if self.log is not None:
+            self.log.append({"op": "del", "id": memory_id})
+
+def storage_dir_from_env() -> Optional[str]:
+    """JARVIS_MEMORY_DIR (relative paths are under the project root), or None to persist nothing"""
+    storage_dir = os.getenv("JARVIS_MEMORY_DIR")
+    if not storage_dir:
+        return None
+    return str(PROJECT_ROOT / storage_dir)
 
-# Global memory manager instance
-memory_manager = MemoryManager()
+# Global memory manager instance (persistent only when JARVIS_MEMORY_DIR is set)
+memory_manager = MemoryManager(storage_dir=storage_dir_from_env(), budget=MemoryBudget.from_env())
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Memory Store - Compact column storage for memories with vectorized filtering and ranking
+"""
+
+import sys
+import json
+import heapq
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterator, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class Memory:
+    """One memory as handed to callers
+
+    A detached copy: changing it does not change the store (use the
+    MemoryManager methods). Metadata arrives as JSON text and is only
+    parsed when first read.
+    """
+
+    __slots__ = ("id", "content", "memory_type", "importance", "created_at",
+                 "access_count", "last_accessed", "_metadata", "_metadata_json")
+
+    def __init__(self, id: str, content: str, memory_type: str, importance: float = 0.5,
+                 metadata: Optional[Dict] = None, created_at: Optional[datetime] = None,
+                 access_count: int = 0, last_accessed: Optional[datetime] = None):
+        self.id = id
+        self.content = content
+        self.memory_type = memory_type
+        self.importance = importance
+        self.created_at = created_at or datetime.now()
+        self.access_count = access_count
+        self.last_accessed = last_accessed
+        self._metadata = metadata
+        self._metadata_json: Optional[str] = None
+
+    @property
+    def metadata(self) -> Dict:
+        if self._metadata is None:
+            self._metadata = json.loads(self._metadata_json) if self._metadata_json else {}
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, value: Optional[Dict]):
+        self._metadata = value if value is not None else {}
+
+    @property
+    def last_used(self) -> float:
+        """Epoch time the memory was stored or last retrieved"""
+        return (self.last_accessed or self.created_at).timestamp()
+
+    def to_record(self) -> Dict[str, Any]:
+        """JSON-ready form stored in the memory log"""
+        return {
+            "id": self.id,
+            "content": self.content,
+            "memory_type": self.memory_type,
+            "importance": self.importance,
+            "metadata": dict(self.metadata),
+            "created_at": self.created_at.isoformat(),
+            "access_count": self.access_count,
+            "last_accessed": self.last_accessed.isoformat() if self.last_accessed else None
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "Memory":
+        return cls(
+            id=record["id"],
+            content=record["content"],
+            memory_type=record["memory_type"],
+            importance=record["importance"],
+            metadata=record.get("metadata") or {},
+            created_at=datetime.fromisoformat(record["created_at"]),
+            access_count=record.get("access_count", 0),
+            last_accessed=datetime.fromisoformat(record["last_accessed"]) if record.get("last_accessed") else None
+        )
+
+    def _fields(self) -> Tuple:
+        return (self.id, self.content, self.memory_type, self.importance, self.metadata,
+                self.created_at, self.access_count, self.last_accessed)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Memory):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    def __repr__(self) -> str:
+        return (f"Memory(id={self.id!r}, memory_type={self.memory_type!r}, importance={self.importance!r}, "
+                f"content={self.content[:40]!r})")
+
+class MemoryStore:
+    """Struct-of-arrays storage for memories, keyed by memory id
+
+    Each field is one column: memory types are interned to 16-bit codes,
+    importance is float32 and times are epoch seconds, so a memory costs a
+    few dozen bytes besides its content. Metadata is kept as compact JSON
+    and only parsed when a Memory is materialized. Removing a row moves the
+    last row into its place. Reads behave like a dict of Memory copies.
+
+    Importance comes back rounded to 6 decimals, which recovers the value
+    that was stored from its float32 form.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.contents: List[str] = []
+        self.metadata: List[Optional[str]] = []     # JSON text, None when empty
+        self.types = array("H")                     # Codes into type_names
+        self.importance = array("f")
+        self.created = array("d")
+        self.last_accessed = array("d")             # 0.0 = never retrieved
+        self.access_counts = array("I")
+
+        self.type_names: List[str] = []
+        self._type_codes: Dict[str, int] = {}
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self._rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self.ids))
+
+    def __getitem__(self, memory_id: str) -> Memory:
+        return self.materialize(self._rows[memory_id])
+
+    def get(self, memory_id: str) -> Optional[Memory]:
+        row = self._rows.get(memory_id)
+        return None if row is None else self.materialize(row)
+
+    def values(self) -> Iterator[Memory]:
+        return (self.materialize(row) for row in range(len(self.ids)))
+
+    def items(self) -> Iterator[Tuple[str, Memory]]:
+        return ((memory.id, memory) for memory in self.values())
+
+    def row(self, memory_id: str) -> int:
+        return self._rows[memory_id]
+
+    def add(self, memory: Memory):
+        """Append a memory (its id must not be stored yet)"""
+        if memory.id in self._rows:
+            raise KeyError(f"Memory {memory.id} already stored")
+        self._rows[memory.id] = len(self.ids)
+        self.ids.append(memory.id)
+        self.contents.append(memory.content)
+        self.metadata.append(json.dumps(memory.metadata, separators=(",", ":"), default=str)
+                             if memory.metadata else None)
+        self.types.append(self.type_code(memory.memory_type, create=True))
+        self.importance.append(memory.importance)
+        self.created.append(memory.created_at.timestamp())
+        self.last_accessed.append(memory.last_accessed.timestamp() if memory.last_accessed else 0.0)
+        self.access_counts.append(memory.access_count)
+
+    def pop(self, memory_id: str) -> Memory:
+        """Remove a memory and return it"""
+        memory = self.materialize(self._rows[memory_id])
+        self.remove(memory_id)
+        return memory
+
+    def remove(self, memory_id: str) -> Tuple[str, str]:
+        """Remove a memory without materializing it; returns its (content, memory_type)"""
+        row = self._rows.pop(memory_id)
+        removed = (self.contents[row], self.type_names[self.types[row]])
+
+        last = len(self.ids) - 1
+        columns = (self.ids, self.contents, self.metadata, self.types, self.importance,
+                   self.created, self.last_accessed, self.access_counts)
+        if row != last:
+            for column in columns:
+                column[row] = column[last]
+            self._rows[self.ids[row]] = row
+        for column in columns:
+            column.pop()
+        return removed
+
+    def materialize(self, row: int) -> Memory:
+        last_accessed = self.last_accessed[row]
+        memory = Memory(
+            id=self.ids[row],
+            content=self.contents[row],
+            memory_type=self.type_names[self.types[row]],
+            importance=round(self.importance[row], 6),
+            created_at=datetime.fromtimestamp(self.created[row]),
+            access_count=self.access_counts[row],
+            last_accessed=datetime.fromtimestamp(last_accessed) if last_accessed else None
+        )
+        memory._metadata_json = self.metadata[row]
+        return memory
+
+    def type_code(self, memory_type: str, create: bool = False) -> Optional[int]:
+        """Interned code of a memory_type (None if never stored and not create)"""
+        code = self._type_codes.get(memory_type)
+        if code is None and create:
+            code = len(self.type_names)
+            self.type_names.append(sys.intern(memory_type))
+            self._type_codes[memory_type] = code
+        return code
+
+    # Updates
+
+    def set_importance(self, memory_id: str, importance: float):
+        self.importance[self._rows[memory_id]] = importance
+
+    def set_created(self, memory_id: str, created_at: datetime):
+        self.created[self._rows[memory_id]] = created_at.timestamp()
+
+    def record_access(self, memory_id: str, when: datetime) -> int:
+        """Count a retrieval; returns the new access count"""
+        row = self._rows[memory_id]
+        self.access_counts[row] += 1
+        self.last_accessed[row] = when.timestamp()
+        return self.access_counts[row]
+
+    def retention_fields(self, memory_id: str) -> Tuple[float, int, float]:
+        """(importance, access_count, last_used epoch) of one memory"""
+        row = self._rows[memory_id]
+        return self.importance[row], self.access_counts[row], self.last_accessed[row] or self.created[row]
+
+    # Vectorized queries
+
+    def rows_of_type(self, memory_type: Optional[str] = None) -> Sequence[int]:
+        """Rows of one memory_type, or all rows"""
+        if memory_type is None:
+            return range(len(self.ids))
+        code = self.type_code(memory_type)
+        if code is None:
+            return []
+        if np is not None:
+            return np.flatnonzero(np.frombuffer(self.types, dtype=np.uint16) == code)
+        return [row for row, row_code in enumerate(self.types) if row_code == code]
+
+    def top(self, rows: Sequence[int], limit: int, scores: Optional[Sequence[float]] = None) -> List[Memory]:
+        """Best `limit` of rows by (score, importance, created), highest first
+
+        scores, when given, lines up with rows.
+        """
+        if limit <= 0 or not len(rows):
+            return []
+        if np is None:
+            order = heapq.nlargest(limit, range(len(rows)), key=lambda i: (
+                scores[i] if scores is not None else 0.0, self.importance[rows[i]], self.created[rows[i]]))
+            return [self.materialize(rows[i]) for i in order]
+
+        rows = np.asarray(rows, dtype=np.int64)
+        keys = [np.frombuffer(self.created, dtype=np.float64)[rows],
+                np.frombuffer(self.importance, dtype=np.float32)[rows]]
+        if scores is not None:
+            keys.append(np.asarray(scores, dtype=np.float64))
+
+        # Keep everything tied with the limit-th best lead key, then sort just those
+        lead = keys[-1]
+        if len(rows) > limit:
+            threshold = np.partition(lead, len(lead) - limit)[len(lead) - limit]
+            keep = lead >= threshold
+            rows = rows[keep]
+            keys = [key[keep] for key in keys]
+        order = np.lexsort(keys)[::-1][:limit]
+        return [self.materialize(int(row)) for row in rows[order]]
@@ -12,6 +12,7 @@ from dataclasses import dataclass
 from datetime import datetime
 from prometheus_client import Counter, Histogram, Gauge, Info, start_http_server
 import threading
+from core.optimization.lazy import services
 
 @dataclass
 class MetricData:
@@ -209,6 +210,6 @@ class HealthChecker:
                 self.logger.error(f"Error in health monitoring: {e}")
                 await asyncio.sleep(interval * 2)  # Wait longer on error
 
-# Global metrics instance
-jarvis_metrics = JarvisMetrics()
-health_checker = HealthChecker(jarvis_metrics)
+# Global metrics instance (collectors are registered on first use)
+jarvis_metrics = services.lazy("jarvis_metrics", JarvisMetrics)
+health_checker = services.lazy("health_checker", lambda: HealthChecker(jarvis_metrics))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Lazy Singletons - Build global subsystems on first use instead of at import
+"""
+
+import threading
+import logging
+from typing import Dict, Any, Callable, Optional
+
+class ServiceRegistry:
+    """Named factories whose instances are created once, on first request"""
+
+    def __init__(self):
+        self.logger = logging.getLogger("service_registry")
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Register (or replace) the factory for a service"""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Get a service, building it on first access"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            # Another thread may have built it while we waited
+            if name in self._instances:
+                return self._instances[name]
+
+            if name not in self._factories:
+                raise KeyError(f"Unknown service: {name}")
+
+            self.logger.debug(f"Building service {name}")
+            instance = self._factories[name]()
+            self._instances[name] = instance
+            return instance
+
+    def set(self, name: str, instance: Any):
+        """Replace a service instance (e.g. with a test double)"""
+        with self._lock:
+            self._instances[name] = instance
+
+    def is_initialized(self, name: str) -> bool:
+        """Whether the service has been built"""
+        return name in self._instances
+
+    def reset(self, name: str):
+        """Drop the instance so the next access builds a fresh one"""
+        with self._lock:
+            self._instances.pop(name, None)
+
+    def lazy(self, name: str, factory: Callable[[], Any]) -> "LazySingleton":
+        """Register a factory and return a proxy usable as a module global"""
+        self.register(name, factory)
+        return LazySingleton(name, self)
+
+    def get_status(self) -> Dict[str, bool]:
+        """Which registered services have been built"""
+        return {name: name in self._instances for name in self._factories}
+
+class LazySingleton:
+    """Module-level stand-in that forwards to a service built on first use"""
+
+    __slots__ = ("_name", "_registry")
+
+    def __init__(self, name: str, registry: Optional[ServiceRegistry] = None):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_registry", registry or services)
+
+    def _get_instance(self) -> Any:
+        return self._registry.get(self._name)
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._get_instance(), attr)
+
+    def __setattr__(self, attr: str, value: Any):
+        setattr(self._get_instance(), attr, value)
+
+    def __delattr__(self, attr: str):
+        delattr(self._get_instance(), attr)
+
+    def __repr__(self) -> str:
+        if not self._registry.is_initialized(self._name):
+            return f"<lazy {self._name} (not built)>"
+        return repr(self._get_instance())
+
+# Global service registry
+services = ServiceRegistry()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Offload - Run CPU-heavy post-processing off the event loop once payloads get large
+"""
+
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Dict, Any, Callable, Optional
+
+@dataclass
+class OffloadConfig:
+    """Where heavy work runs
+
+    mode is "process", "thread" or "inline". Payloads smaller than threshold
+    (characters) always run inline: handing them to a pool costs more than
+    the work. Processes keep the loop responsive but need picklable
+    arguments and results. Threads only help work made of many short steps,
+    since the interpreter can switch back to the loop between them; a single
+    large re call holds the GIL until it returns.
+    """
+    mode: str = "process"
+    threshold: int = 64 * 1024
+    max_workers: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "OffloadConfig":
+        config = cls()
+        config.mode = os.getenv("JARVIS_OFFLOAD_MODE", config.mode)
+        config.threshold = int(os.getenv("JARVIS_OFFLOAD_THRESHOLD", config.threshold))
+        workers = os.getenv("JARVIS_OFFLOAD_WORKERS")
+        config.max_workers = int(workers) if workers else None
+        return config
+
+@dataclass
+class OffloadStats:
+    """Per-operation counters"""
+    inline_calls: int = 0
+    offloaded_calls: int = 0
+    inline_seconds: float = 0.0           # Time the event loop was blocked
+    offloaded_wall_seconds: float = 0.0   # Wall time spent waiting on workers
+    worker_seconds: float = 0.0           # Time the offloaded work took in its worker
+    blocking_seconds_saved: float = 0.0   # Worker time that could not block the loop (process mode)
+    offloaded_chars: int = 0
+
+def _timed_call(func: Callable, args: tuple, kwargs: Dict[str, Any]):
+    """Run func in a worker, returning (result, seconds it took)"""
+    start_time = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start_time
+
+def payload_size(payload: Any) -> int:
+    """Size used against the threshold (only text and bytes count)"""
+    if isinstance(payload, (str, bytes, bytearray)):
+        return len(payload)
+    return 0
+
+class Offloader:
+    """Runs a function inline or in a worker pool depending on payload size"""
+
+    def __init__(self, config: Optional[OffloadConfig] = None):
+        self.config = config or OffloadConfig.from_env()
+        self.logger = logging.getLogger("offload")
+        self.stats: Dict[str, OffloadStats] = {}
+        self._executor: Optional[Executor] = None
+
+    async def run(self, operation: str, func: Callable, *args, size: Optional[int] = None, **kwargs) -> Any:
+        """Call func(*args, **kwargs), off the loop if the payload is at least the threshold
+
+        size defaults to the length of the first argument.
+        """
+        if size is None:
+            size = payload_size(args[0]) if args else 0
+        stats = self.stats.setdefault(operation, OffloadStats())
+
+        start_time = time.perf_counter()
+        if self.config.mode == "inline" or size < self.config.threshold:
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.inline_calls += 1
+                stats.inline_seconds += time.perf_counter() - start_time
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            result, worker_seconds = await loop.run_in_executor(executor, partial(_timed_call, func, args, kwargs))
+        finally:
+            elapsed = time.perf_counter() - start_time
+            stats.offloaded_calls += 1
+            stats.offloaded_wall_seconds += elapsed
+            stats.offloaded_chars += size
+            self.logger.debug(f"Offloaded {operation} ({size} chars, {elapsed * 1000:.1f} ms)")
+
+        # A thread may still have held the GIL, so only process workers count as saved
+        stats.worker_seconds += worker_seconds
+        if isinstance(executor, ProcessPoolExecutor):
+            stats.blocking_seconds_saved += worker_seconds
+        return result
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.config.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.config.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.config.max_workers,
+                                                    thread_name_prefix="jarvis-offload")
+        return self._executor
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters per operation plus totals for inline, offloaded and saved blocking time"""
+        operations = {name: dict(vars(stats)) for name, stats in self.stats.items()}
+        return {
+            "mode": self.config.mode,
+            "threshold": self.config.threshold,
+            "operations": operations,
+            "offloaded_wall_seconds": sum(stats.offloaded_wall_seconds for stats in self.stats.values()),
+            "blocking_seconds_inline": sum(stats.inline_seconds for stats in self.stats.values()),
+            "blocking_seconds_saved": sum(stats.blocking_seconds_saved for stats in self.stats.values()),
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool (a new one is created on next use)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+# Global offloader
+offloader = Offloader()
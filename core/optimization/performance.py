@@ -2,9 +2,11 @@
 Performance Optimization - Caching and optimization systems
 """
 
+import sys
 import time
 import asyncio
-from typing import Dict, Any, Optional, Callable
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, List
 from dataclasses import dataclass
 from functools import wraps
 
@@ -14,14 +16,22 @@ class CacheEntry:
     timestamp: float
     ttl: float
     hit_count: int = 0
+    size: int = 0
 
 class SimpleCache:
-    """Simple in-memory cache with TTL"""
+    """Simple in-memory LRU cache with TTL and optional size bounds"""
     
-    def __init__(self, default_ttl: float = 300):  # 5 minutes
-        self.cache: Dict[str, CacheEntry] = {}
+    def __init__(self, default_ttl: float = 300,  # 5 minutes
+                 max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        self.cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
         self.default_ttl = default_ttl
-        self.stats = {"hits": 0, "misses": 0}
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or sys.getsizeof
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
     
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
@@ -30,22 +40,51 @@ class SimpleCache:
             if time.time() - entry.timestamp < entry.ttl:
                 entry.hit_count += 1
                 self.stats["hits"] += 1
+                self.cache.move_to_end(key)
                 return entry.value
             else:
-                del self.cache[key]
+                self._remove(key)
         
         self.stats["misses"] += 1
         return None
     
     def set(self, key: str, value: Any, ttl: Optional[float] = None):
-        """Set value in cache"""
+        """Set value in cache, evicting least recently used entries over budget"""
         ttl = ttl or self.default_ttl
-        self.cache[key] = CacheEntry(value, time.time(), ttl)
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        
+        # Values larger than the whole budget are never cached
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        
+        if key in self.cache:
+            self._remove(key)
+        
+        self.cache[key] = CacheEntry(value, time.time(), ttl, size=size)
+        self.total_bytes += size
+        
+        while self.cache and (
+            (self.max_entries is not None and len(self.cache) > self.max_entries) or
+            (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+        ):
+            oldest_key = next(iter(self.cache))
+            self._remove(oldest_key)
+            self.stats["evictions"] += 1
+    
+    def delete(self, key: str):
+        """Remove value from cache"""
+        if key in self.cache:
+            self._remove(key)
+    
+    def _remove(self, key: str):
+        entry = self.cache.pop(key)
+        self.total_bytes -= entry.size
     
     def clear(self):
         """Clear cache"""
         self.cache.clear()
-        self.stats = {"hits": 0, "misses": 0}
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
@@ -54,15 +93,17 @@ class SimpleCache:
         
         return {
             "entries": len(self.cache),
+            "bytes": self.total_bytes,
             "hits": self.stats["hits"],
             "misses": self.stats["misses"],
+            "evictions": self.stats["evictions"],
             "hit_rate": hit_rate
         }
 
-def cached(ttl: float = 300):
+def cached(ttl: float = 300, max_entries: Optional[int] = 1024):
     """Decorator for caching function results"""
     def decorator(func: Callable):
-        cache = SimpleCache(ttl)
+        cache = SimpleCache(ttl, max_entries=max_entries)
         
         @wraps(func)
         async def wrapper(*args, **kwargs):
@@ -141,7 +182,7 @@ class OptimizationEngine:
     """Main optimization engine"""
     
     def __init__(self):
-        self.cache = SimpleCache()
+        self.cache = SimpleCache(max_entries=1024)
         self.profiler = PerformanceProfiler()
         self.optimizations_applied = []
     
@@ -5,6 +5,8 @@ Speech Text Cleaner - Clean text for natural speech
 
 import re
 
+from core.optimization.offload import offloader
+
 class SpeechTextCleaner:
     """Clean text to make it sound natural when spoken"""
     
@@ -115,6 +117,10 @@ class SpeechTextCleaner:
         
         return cleaned
     
+    async def clean_for_speech_async(self, text: str) -> str:
+        """clean_for_speech, run off the event loop for long texts"""
+        return await offloader.run("speech_cleaner.clean_for_speech", self.clean_for_speech, text)
+    
     def _clean_numbers(self, text: str) -> str:
         """Make numbers more natural for speech"""
         
@@ -12,6 +12,7 @@ import json
 from .speech_cleaner import speech_cleaner
 from .audio_manager import audio_manager
 from .multi_stt import MultiProviderSTT, STTConfig, STTProvider
+from core.optimization.lazy import services
 
 @dataclass
 class VoiceConfig:
@@ -165,7 +166,7 @@ class VoiceInterface:
         """Speak text using TTS"""
         try:
             # Clean text for natural speech
-            cleaned_text = speech_cleaner.clean_for_speech(text)
+            cleaned_text = await speech_cleaner.clean_for_speech_async(text)
             
             if save_file:
                 # Use audio manager for organized file storage
@@ -274,7 +275,8 @@ class VoiceInterface:
                     
                     llm_response = await smart_llm.generate(
                         prompt=user_speech,
-                        system_prompt="You are JARVIS, an AI assistant. Keep responses conversational and under 100 words for voice interaction."
+                        system_prompt="You are JARVIS, an AI assistant. Keep responses conversational and under 100 words for voice interaction.",
+                        hedge=True  # Voice replies are latency-critical
                     )
                     
                     response_text = llm_response.content
@@ -304,5 +306,5 @@ class VoiceInterface:
         """Stop voice conversation"""
         self.conversation_mode = False
 
-# Global voice interface
-voice_interface = VoiceInterface()
+# Global voice interface (built on first use)
+voice_interface = services.lazy("voice_interface", VoiceInterface)
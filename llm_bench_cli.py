@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+LLM Benchmark CLI - Load test the LLM layer with simulated users and stand-in providers
+"""
+
+import asyncio
+import sys
+import json
+import argparse
+sys.path.append('/home/krawin/exp.code/jarvis')
+
+from core.llm.load_test import LoadTest, LoadTestConfig, StandInProvider, format_table
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="JARVIS LLM load test",
+        epilog="Example: python llm_bench_cli.py --users 50 --requests 20 "
+               "--provider fast:0.05:0.02 --provider slow:0.2:0.05:8:600"
+    )
+    parser.add_argument("--users", type=int, default=10, help="Concurrent simulated users")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per user")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="Arrival rate per user in requests/second (0 = back to back)")
+    parser.add_argument("--mix", default="short=0.6,medium=0.3,long=0.1",
+                        help="Prompt size weights, e.g. short=0.6,medium=0.3,long=0.1")
+    parser.add_argument("--file-ratio", type=float, default=0.2,
+                        help="Share of file-generation prompts (exercise content filtering)")
+    parser.add_argument("--repeat-ratio", type=float, default=0.2,
+                        help="Share of repeated prompts (exercise the response cache)")
+    parser.add_argument("--provider", action="append", default=[],
+                        help="Stand-in provider name[:mean_latency[:error_rate[:max_concurrency[:rpm]]]]")
+    parser.add_argument("--cassette", help="Replay a recorded cassette instead of synthetic responses")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the response cache")
+    parser.add_argument("--no-filter", action="store_true", help="Call LLMManager directly, skipping SmartLLMWrapper")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path", help="Also write the JSON report to this file")
+    parser.add_argument("--json-only", action="store_true", help="Print only the JSON report")
+    return parser.parse_args(argv)
+
+def build_config(args) -> LoadTestConfig:
+    mix = {}
+    for part in args.mix.split(","):
+        size, weight = part.split("=")
+        mix[size.strip()] = float(weight)
+
+    config = LoadTestConfig(
+        users=args.users,
+        requests_per_user=args.requests,
+        arrival_rate=args.rate,
+        prompt_mix=mix,
+        file_generation_ratio=args.file_ratio,
+        repeat_ratio=args.repeat_ratio,
+        use_smart_wrapper=not args.no_filter,
+        use_cache=not args.no_cache,
+        cassette_path=args.cassette,
+        seed=args.seed
+    )
+    if args.provider:
+        config.providers = [StandInProvider.parse(spec) for spec in args.provider]
+    return config
+
+async def main(argv=None):
+    """Main CLI interface"""
+    args = parse_args(argv)
+    config = build_config(args)
+
+    if not args.json_only:
+        print("🏋️ JARVIS LLM Load Test")
+        print("=" * 40)
+        print(f"Users: {config.users}, requests/user: {config.requests_per_user}, "
+              f"providers: {', '.join(p.name for p in config.providers)}")
+        print()
+
+    report = await LoadTest(config).run()
+    report_json = json.dumps(report, indent=2)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            f.write(report_json)
+
+    if args.json_only:
+        print(report_json)
+    else:
+        print(format_table(report))
+        print()
+        print(report_json)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -57,6 +57,9 @@ Examples:
   python llm_cli.py switch qwen
   python llm_cli.py test claude
   python llm_cli.py chat
+
+Load testing:
+  python llm_bench_cli.py --users 20 --requests 10
 """)
 
 async def show_status():
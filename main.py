@@ -258,6 +258,8 @@ async def main():
     print("   🚀 Intelligence: ✅ Complete")
     print("   📊 Production: ✅ Complete")
     print("\n🎊 PRODUCTION-GRADE AI AGENT SYSTEM COMPLETE! 🎊")
+    
+    await memory_manager.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
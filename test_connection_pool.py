@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test Connection Pool - Verify pooled LLM transports are reused and closed
+"""
+
+import asyncio
+import importlib.util
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm.connection_pool import ConnectionPool, PoolConfig
+from core.llm.llm_manager import LLMManager
+
+class FakeSDKClient:
+    """Stands in for AsyncAnthropic/AsyncOpenAI"""
+
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+def test_client_reuse():
+    """Test SDK clients are built once per key"""
+
+    print("♻️  Testing pooled client reuse")
+    print("=" * 50)
+
+    pool = ConnectionPool()
+    built = []
+
+    def factory():
+        built.append(FakeSDKClient())
+        return built[-1]
+
+    first = pool.get_client("claude", factory)
+    second = pool.get_client("claude", factory)
+
+    assert first is second
+    assert len(built) == 1
+    print("✅ Client built once and reused")
+
+def test_provider_limits():
+    """Test per-provider limits override the defaults"""
+
+    print("\n⚙️  Testing provider limits")
+    print("=" * 50)
+
+    pool = ConnectionPool(PoolConfig(limit=50), {"ollama": PoolConfig(limit_per_host=4)})
+
+    assert pool.get_config("qwen").limit == 50
+    assert pool.get_config("ollama").limit_per_host == 4
+    print("✅ Per-provider limits applied")
+
+def test_manager_cleanup_closes_pool():
+    """Test LLMManager.cleanup shuts the shared pool down"""
+
+    print("\n🧹 Testing graceful shutdown")
+    print("=" * 50)
+
+    manager = LLMManager()
+    sdk_client = manager.pool.get_client("gpt", FakeSDKClient)
+
+    for client in manager.clients.values():
+        assert client.pool is manager.pool
+
+    asyncio.run(manager.cleanup())
+
+    assert sdk_client.closed
+    assert manager.get_status()["connection_pool"]["closed"]
+    print("✅ Pooled clients closed on cleanup")
+
+def test_sessions_are_per_event_loop():
+    """Test each event loop gets its own session and dead loops' sessions are dropped"""
+
+    print("\n🔁 Testing sessions across event loops")
+    print("=" * 50)
+
+    class FakeSession:
+        closed = False
+
+    pool = ConnectionPool()
+    finished = asyncio.new_event_loop()
+    finished.close()
+    pool._sessions[("qwen", finished)] = FakeSession()
+    assert pool.get_status()["sessions"] == []
+
+    pool._drop_dead_sessions()
+    assert not pool._sessions
+
+    if importlib.util.find_spec("aiohttp"):
+        async def session_for(provider):
+            return await pool.get_session(provider)
+
+        first = asyncio.run(session_for("ollama"))
+        second = asyncio.run(session_for("ollama"))
+        assert first is not second
+        assert len(pool._sessions) == 1
+    print("✅ Sessions keyed by event loop")
+
+if __name__ == "__main__":
+    test_client_reuse()
+    test_provider_limits()
+    test_manager_cleanup_closes_pool()
+    test_sessions_are_per_event_loop()
+    print("\n🎉 Connection pool tests completed!")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test Content Filter Performance - Verify extraction stays linear on multi-hundred-KB responses
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm.content_filter import content_filter, scan_fences
+
+# Minimum throughput; the old backtracking patterns managed well under 0.1 MB/s on these
+MIN_MB_PER_SECOND = 5.0
+
+SECTION = "<section>\n  <h2>Card</h2>\n  <p>Lorem ipsum { color: red }</p>\n</section>\n"
+PROSE = "Here's an explanation with `inline` code, a stray ``` fence and more words.\n"
+
+def _large_responses():
+    html_body = "<!DOCTYPE html>\n<html>\n<body>\n" + SECTION * 4000 + "</body>\n</html>"
+    python_body = "import os\n\n" + "def handler_{0}(event):\n    return event.get('{0}')\n\n" * 6000
+    return {
+        'html': ("Sure! Here's the page:\n\n```html\n" + html_body + "\n```\n\nLet me know!", html_body),
+        'python': ("Here's the module:\n\n```python\n" + python_body + "```\n\nThis code works.", python_body.strip()),
+        'css': (PROSE * 6000 + "```css\nbody { color: red; }\n```", "body { color: red; }"),
+        'json': (PROSE * 6000, None),
+        'javascript': (PROSE * 6000, None),
+        'generic': (PROSE * 6000, None),
+    }
+
+def test_scan_fences():
+    """Test fences and language tags are tokenized once"""
+
+    print("🧱 Testing fence scanner")
+    print("=" * 50)
+
+    blocks = scan_fences("Intro\n```HTML\n<p>x</p>\n```\nbetween\n```\nplain\n```\nunclosed ```")
+    # Every marker opens a block, so the code blocks are every other entry
+    assert [block.lang for block in blocks] == ['html', '', '', '']
+    assert [block.body for block in blocks[::2]] == ["<p>x</p>", "plain"]
+    print(f"✅ {len(blocks)} blocks tokenized")
+
+def test_multi_fence_pairing():
+    """Test how responses with several fences are paired and which block each type picks"""
+
+    print("\n🧩 Testing multi-fence pairing")
+    print("=" * 50)
+
+    blocks = scan_fences("```py\nx = 1\n```\nthen\n```js\nlet y;\n```")
+    assert [(block.lang, block.body) for block in blocks] == [('py', 'x = 1'), ('', 'then'), ('js', 'let y;')]
+
+    # Tags are whole words: a json block is not a js block
+    response = "Config:\n```json\n{\"a\": 1}\n```\nScript:\n```js\nconst a = 1;\n```"
+    assert content_filter.extract_code(response, 'javascript') == "const a = 1;"
+    assert content_filter.extract_code(response, 'json') == '{"a": 1}'
+
+    # A tagged block wins over an earlier untagged one that merely looks like code
+    response = "```\nimport os\n```\nBetter:\n```python\nimport sys\n```"
+    assert content_filter.extract_code(response, 'python') == "import sys"
+
+    # Without a matching tag, the first entry that looks like the code is used, prose entries included
+    response = "```text\nnotes\n```\ndef main(): pass\n```\nmore\n```"
+    assert content_filter.extract_code(response, 'python') == "def main(): pass"
+
+    # Generic takes the first entry, and tags match case-insensitively
+    assert content_filter.extract_code("```\nfirst\n```\n```\nsecond\n```", 'generic') == "first"
+    assert content_filter.extract_code("```HTML\n<p>x</p>\n```", 'html') == "<p>x</p>"
+    print("✅ Multi-fence responses resolve to the intended block")
+
+def test_extraction_throughput():
+    """Test every file type extracts large responses at linear-time speed"""
+
+    print("\n🏎️ Testing extraction throughput")
+    print("=" * 50)
+
+    for file_type, (response, expected) in _large_responses().items():
+        start = time.perf_counter()
+        code = content_filter.extract_code(response, file_type)
+        elapsed = time.perf_counter() - start
+
+        if expected is not None:
+            assert code == expected, f"{file_type} extraction changed"
+
+        mb_per_second = len(response) / 1e6 / max(elapsed, 1e-9)
+        print(f"   {file_type:<10} {len(response) // 1024:>4} KB in {elapsed * 1000:7.1f} ms "
+              f"({mb_per_second:.0f} MB/s)")
+        assert mb_per_second >= MIN_MB_PER_SECOND, f"{file_type} extraction too slow: {mb_per_second:.2f} MB/s"
+
+    print("✅ All file types extracted in linear time")
+
+if __name__ == "__main__":
+    test_scan_fences()
+    test_multi_fence_pairing()
+    test_extraction_throughput()
+    print("\n🎉 Content filter performance tests completed!")
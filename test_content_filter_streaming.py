@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test Content Filter Streaming - Verify code is extracted incrementally from streamed responses
+"""
+
+import asyncio
+import random
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm.content_filter import content_filter, StreamingCodeFilter
+
+RESPONSES = {
+    'html': ("I'll create a website for you:\n\n```html\n<!DOCTYPE html>\n<html>\n<body><h1>Hi</h1></body>\n</html>\n```\n\n"
+             "This creates a simple page.",
+             "<!DOCTYPE html>\n<html>\n<body><h1>Hi</h1></body>\n</html>"),
+    'python': ("Install it first:\n\n```bash\npip install requests\n```\n\nHere's the script:\n\n```python\n"
+               "def main():\n    print('done')\n\n\nmain()\n```\nThis code works.",
+               "def main():\n    print('done')\n\n\nmain()"),
+    None: ("Sure! Here it is:\n<!DOCTYPE html>\n<html><body>x</body></html>\nHope it helps!",
+           "<!DOCTYPE html>\n<html><body>x</body></html>"),
+    'json': ('{"name": "jarvis"}', '{"name": "jarvis"}'),
+}
+
+def _stream(text: str, rng: random.Random):
+    """Split text into randomly sized chunks"""
+    chunks, i = [], 0
+    while i < len(text):
+        size = rng.randint(1, 8)
+        chunks.append(text[i:i + size])
+        i += size
+    return chunks
+
+async def _agen(chunks):
+    for chunk in chunks:
+        yield chunk
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+def test_stream_matches_any_chunking():
+    """Test the streamed code is the same however the response is split"""
+
+    print("🌊 Testing streamed extraction")
+    print("=" * 50)
+
+    rng = random.Random(7)
+    for file_type, (response, expected) in RESPONSES.items():
+        for _ in range(50):
+            stream_filter = StreamingCodeFilter(file_type)
+            code = "".join(stream_filter.feed(chunk) for chunk in _stream(response, rng)) + stream_filter.finish()
+            assert code == expected, f"{file_type}: {code!r}"
+        print(f"   ✅ {file_type}: {len(response)} → {len(expected)} chars")
+
+    # The async helper yields the same code
+    chunks = _stream(RESPONSES['html'][0], rng)
+    streamed = asyncio.run(_collect(content_filter.extract_code_stream(_agen(chunks), 'html')))
+    assert "".join(streamed) == RESPONSES['html'][1]
+
+def test_stream_memory_stays_flat():
+    """Test a large generation is passed on as it arrives, holding back only a few characters"""
+
+    print("\n📈 Testing held-back buffer on a large stream")
+    print("=" * 50)
+
+    stream_filter = StreamingCodeFilter('python')
+    emitted = stream_filter.feed("Here's the module:\n\n```python\n")
+    peak_pending = 0
+    for i in range(20000):
+        emitted += stream_filter.feed(f"def handler_{i}(event):\n    return event\n\n")
+        peak_pending = max(peak_pending, len(stream_filter._buffer))
+    emitted += stream_filter.feed("```\n\nLet me know if you need more!")
+    emitted += stream_filter.finish()
+
+    assert peak_pending <= 8
+    assert emitted.startswith("def handler_0") and emitted.endswith("return event")
+    assert "Let me know" not in emitted
+    print(f"✅ {stream_filter.chars_out} chars streamed, at most {peak_pending} held back")
+
+def test_stream_matches_extract_code():
+    """Test an untagged fence before the wanted block streams the block extract_code picks"""
+
+    print("\n🔍 Testing parity with extract_code")
+    print("=" * 50)
+
+    tree = "demo/\n├── index.html\n└── style.css"
+    page = "<!DOCTYPE html>\n<html>\n<body>x</body>\n</html>"
+    responses = [
+        f"Layout:\n\n```\n{tree}\n```\n\nThe page:\n\n```html\n{page}\n```\nDone.",
+        f"Layout:\n\n```\n{tree}\n```\n\nThe page:\n\n```htm\n{page}\n```\nDone.",
+        f"Inline ``` fence, then:\n```html\n{page}\n```\n```html\nnot this\n```",
+        f"Cut off:\n\n```\n{tree}\n```\n\n```html\n{page}",
+    ]
+
+    rng = random.Random(11)
+    for response in responses:
+        for file_type in (None, 'html', 'generic'):
+            expected = content_filter.extract_code(response, file_type)
+            for _ in range(20):
+                stream_filter = StreamingCodeFilter(file_type)
+                code = "".join(stream_filter.feed(chunk) for chunk in _stream(response, rng)) + stream_filter.finish()
+                assert code == expected, f"{file_type}: {code!r} != {expected!r}"
+
+    stream_filter = StreamingCodeFilter('html')
+    code = stream_filter.feed(responses[0]) + stream_filter.finish()
+    assert code == page
+    print("✅ Streamed code matches extract_code")
+
+def test_stream_starts_before_the_end():
+    """Test aliased tags, untagged code and raw HTML stream before the response ends"""
+
+    print("\n⏩ Testing early streaming")
+    print("=" * 50)
+
+    cases = [
+        ('python', "Here you go:\n```py\nimport os\nprint(os.name)\n```\nDone.", "import os\nprint(os.name)"),
+        ('javascript', "Sure:\n```js\nconst a = 1;\nconsole.log(a);\n```", "const a = 1;\nconsole.log(a);"),
+        ('python', "Sure:\n```\ndef main():\n    return 1\n```", "def main():\n    return 1"),
+        (None, "```python\nclass A:\n    pass\n```", "class A:\n    pass"),
+        (None, "Sure! Here it is:\n<!DOCTYPE html>\n<html><body>x</body></html>\nEnjoy!",
+         "<!DOCTYPE html>\n<html><body>x</body></html>"),
+    ]
+
+    for file_type, response, expected in cases:
+        stream_filter = StreamingCodeFilter(file_type)
+        before_end = "".join(stream_filter.feed(chunk) for chunk in _stream(response, random.Random(5)))
+        code = before_end + stream_filter.finish()
+        assert code == expected, f"{file_type}: {code!r}"
+        assert before_end and len(before_end) >= len(expected) - 8, f"{file_type}: only {before_end!r} streamed"
+        assert code == content_filter.extract_code(response, file_type)
+    print(f"✅ {len(cases)} responses streamed before finish()")
+
+def test_stream_buffer_is_capped():
+    """Test a response with no recognisable block is passed through past max_buffer"""
+
+    print("\n🧱 Testing scan buffer cap")
+    print("=" * 50)
+
+    stream_filter = StreamingCodeFilter('python', max_buffer=1024)
+    emitted = ""
+    peak = 0
+    for i in range(500):
+        emitted += stream_filter.feed(f"x{i} = {i}\n")
+        peak = max(peak, len(stream_filter._buffer))
+    emitted += stream_filter.finish()
+
+    assert peak <= 1024 + 16
+    assert emitted.startswith("x0 = 0") and emitted.endswith("x499 = 499")
+    print(f"✅ At most {peak} chars buffered")
+
+if __name__ == "__main__":
+    test_stream_matches_any_chunking()
+    test_stream_memory_stays_flat()
+    test_stream_matches_extract_code()
+    test_stream_starts_before_the_end()
+    test_stream_buffer_is_capped()
+    print("\n🎉 Content filter streaming tests completed!")
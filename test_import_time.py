@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test Import Time - Verify core modules import within budget without building singletons
+"""
+
+import os
+import subprocess
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Cumulative import budget per module in seconds (generous for slow CI machines)
+IMPORT_BUDGETS = {
+    "core.llm.llm_manager": 1.5,
+    "core.llm.smart_llm_wrapper": 1.5,
+    "core.voice.voice_interface": 1.5,
+    "core.engines.execution.execution_engine": 1.5,
+    "core.monitoring.metrics": 1.5,
+}
+
+LAZY_SERVICES = ["llm_manager", "voice_interface", "execution_engine", "jarvis_metrics", "health_checker"]
+
+def _run(code: str):
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, timeout=60
+    )
+
+def _cumulative_seconds(stderr: str, module: str) -> float:
+    """Cumulative time of the top-level import line for module"""
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and line.rsplit("|", 1)[-1].strip() == module:
+            return int(line.split("|")[1]) / 1_000_000
+    raise AssertionError(f"No importtime entry for {module}")
+
+def test_import_budget():
+    """Test each module's cold import stays within budget"""
+
+    print("⏱️ Testing import-time budget")
+    print("=" * 50)
+
+    for module, budget in IMPORT_BUDGETS.items():
+        result = _run(f"import {module}")
+        if result.returncode != 0 and "ModuleNotFoundError" in result.stderr:
+            # Optional dependency (e.g. prometheus_client, psutil) not installed here
+            print(f"⏭️ {module}: skipped ({result.stderr.strip().splitlines()[-1]})")
+            continue
+
+        assert result.returncode == 0, result.stderr
+        seconds = _cumulative_seconds(result.stderr, module)
+        assert seconds < budget, f"{module} took {seconds:.3f}s to import (budget {budget}s)"
+        print(f"✅ {module}: {seconds * 1000:.0f}ms")
+
+def test_singletons_are_lazy():
+    """Test importing modules does not build their global singletons"""
+
+    print("\n💤 Testing lazy singletons")
+    print("=" * 50)
+
+    code = "\n".join([
+        "import importlib",
+        *[f"try:\n    importlib.import_module({m!r})\nexcept ModuleNotFoundError:\n    pass"
+          for m in IMPORT_BUDGETS],
+        "from core.optimization.lazy import services",
+        f"built = [s for s in {LAZY_SERVICES!r} if services.is_initialized(s)]",
+        "print(','.join(built))",
+    ])
+    result = _run(code)
+
+    assert result.returncode == 0, result.stderr
+    built = [s for s in result.stdout.strip().splitlines()[-1:] if s]
+    assert not built, f"Built at import time: {built}"
+    print("✅ No singleton built during import")
+
+def test_lazy_singleton_builds_once():
+    """Test the proxy builds on first use and forwards attribute access"""
+
+    print("\n🏗️ Testing lazy singleton proxy")
+    print("=" * 50)
+
+    from core.optimization.lazy import ServiceRegistry
+
+    class Service:
+        def __init__(self):
+            self.value = 1
+
+    built = []
+    registry = ServiceRegistry()
+    proxy = registry.lazy("service", lambda: built.append(1) or Service())
+
+    assert not registry.is_initialized("service") and not built
+    assert proxy.value == 1
+    proxy.value = 2
+    assert proxy.value == 2 and registry.get("service").value == 2
+    assert len(built) == 1
+
+    registry.reset("service")
+    assert proxy.value == 1 and len(built) == 2
+    print("✅ Built once per reset, attributes forwarded")
+
+if __name__ == "__main__":
+    test_import_budget()
+    test_singletons_are_lazy()
+    test_lazy_singleton_builds_once()
+    print("\n🎉 Import time tests completed!")
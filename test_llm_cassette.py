@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test LLM Cassette - Verify record/replay, latency models, error injection and concurrency limits
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm.llm_manager import BaseLLMClient, LLMConfig, LLMProvider, LLMResponse
+from core.llm.cassette_client import CassetteClient, LatencyModel, load_cassette
+from core.llm.circuit_breaker import FailureKind, classify_error
+
+class EchoClient(BaseLLMClient):
+    """Upstream client to record from"""
+
+    def __init__(self):
+        super().__init__(LLMConfig(provider=LLMProvider.OLLAMA, model="echo"))
+
+    async def generate(self, prompt, system_prompt=None, **kwargs):
+        await asyncio.sleep(0.02)
+        return LLMResponse(content=f"echo: {prompt}", model="echo", provider="ollama", tokens_used=len(prompt))
+
+    async def chat(self, messages, **kwargs):
+        return await self.generate(messages[-1]["content"])
+
+def _cassette(path: str, **settings) -> LLMConfig:
+    return LLMConfig(provider=LLMProvider.CASSETTE, model="cassette",
+                     extra_params={"cassette": {"path": path, **settings}})
+
+def _record(path: str, prompts, **settings):
+    recorder = CassetteClient(_cassette(path, mode="record", upstream=EchoClient(), **settings))
+
+    async def run():
+        for prompt in prompts:
+            await recorder.generate(prompt)
+        await recorder.close()
+
+    asyncio.run(run())
+    return recorder
+
+def test_record_then_replay_through_manager(make_manager):
+    """Test recorded responses replay with their latency via register_client"""
+
+    print("📼 Testing record and replay")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "calls.jsonl.gz")
+        recorder = _record(path, ["one", "two"])
+
+        entries = load_cassette(path)
+        assert recorder.stats["recorded"] == 2 and len(entries) == 2
+        assert entries[0].latency >= 0.02 and entries[0].tokens_used == 3
+
+        manager = make_manager({})
+        manager.register_client("cassette_replay", _cassette(path))
+        assert "cassette_replay" in manager.clients
+
+        start = time.monotonic()
+        response = asyncio.run(manager.generate("two", provider="cassette_replay"))
+        assert response.content == "echo: two" and response.metadata["cassette"]
+        assert time.monotonic() - start >= 0.02
+
+        try:
+            asyncio.run(manager.generate("never recorded", provider="cassette_replay"))
+            raise AssertionError("miss should raise")
+        except Exception as e:
+            assert "Cassette miss" in str(e)
+
+        # An empty cassette cannot replay anything, so registration is refused
+        manager.register_client("cassette_empty", _cassette(os.path.join(tmp, "missing.jsonl")))
+        assert "cassette_empty" not in manager.clients
+
+    print("✅ Recorded, replayed and missed as expected")
+
+def test_recording_is_buffered():
+    """Test recordings are written in batches and flushed on close"""
+
+    print("\n💾 Testing buffered recording")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "calls.jsonl")
+        recorder = CassetteClient(_cassette(path, mode="record", upstream=EchoClient(), flush_every=3))
+
+        async def run():
+            for prompt in ["one", "two"]:
+                await recorder.generate(prompt)
+            before_batch = len(load_cassette(path))
+
+            await recorder.generate("three")
+            await recorder._flush_task
+            after_batch = len(load_cassette(path))
+
+            await recorder.generate("four")
+            await recorder.close()
+            return before_batch, after_batch
+
+        before_batch, after_batch = asyncio.run(run())
+        entries = load_cassette(path)
+
+    assert (before_batch, after_batch) == (0, 3)
+    assert [entry.content for entry in entries] == ["echo: one", "echo: two", "echo: three", "echo: four"]
+    print("✅ Entries written in a batch of 3, the rest on close")
+
+def test_latency_models_and_error_injection():
+    """Test seeded latency distributions and injected failure kinds"""
+
+    print("\n🎲 Testing latency models and error injection")
+    print("=" * 50)
+
+    rng = random.Random(1)
+    assert LatencyModel(kind="fixed", mean=0.3).sample(rng, 9.0) == 0.3
+    assert LatencyModel(scale=2.0).sample(rng, 0.1) == 0.2
+    samples = [LatencyModel(kind="lognormal", mean=0.5, stddev=0.2).sample(rng, 0) for _ in range(2000)]
+    assert 0.45 < sum(samples) / len(samples) < 0.55
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "calls.jsonl")
+        _record(path, ["hello"])
+
+        client = CassetteClient(_cassette(
+            path, seed=7, on_miss="cycle", latency={"kind": "fixed", "mean": 0.0},
+            errors={"rate_limit": 0.2, "timeout": 0.1, "server_error": 0.2, "timeout_after": 0.0}
+        ))
+
+        async def run():
+            kinds = []
+            for i in range(200):
+                try:
+                    await client.generate(f"prompt {i}")
+                    kinds.append(None)
+                except Exception as e:
+                    kinds.append(classify_error(e))
+            return kinds
+
+        kinds = asyncio.run(run())
+
+    assert 0.3 < kinds.count(None) / len(kinds) < 0.7
+    for kind in (FailureKind.RATE_LIMIT, FailureKind.TIMEOUT, FailureKind.SERVER_ERROR):
+        assert kind in kinds
+    assert client.stats["misses"] == 200
+    print(f"✅ {kinds.count(None)}/200 succeeded, {client.stats['injected_errors']} injected errors")
+
+def test_concurrency_limit():
+    """Test replay concurrency is capped (queued or rejected with 429)"""
+
+    print("\n🚦 Testing concurrency limits")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "calls.jsonl")
+        _record(path, ["hello"])
+        latency = {"kind": "fixed", "mean": 0.02}
+
+        queued = CassetteClient(_cassette(path, max_concurrency=2, latency=latency))
+        rejecting = CassetteClient(_cassette(path, max_concurrency=2, latency=latency, on_overload="reject"))
+
+        async def burst(client):
+            return await asyncio.gather(*(client.generate("hello") for _ in range(6)), return_exceptions=True)
+
+        queued_results = asyncio.run(burst(queued))
+        rejected_results = asyncio.run(burst(rejecting))
+
+    assert all(isinstance(r, LLMResponse) for r in queued_results)
+    assert queued.stats["peak_concurrency"] == 2
+    assert rejecting.stats["rejected"] == 4
+    assert sum(classify_error(r) == FailureKind.RATE_LIMIT for r in rejected_results if isinstance(r, Exception)) == 4
+    print("✅ Queued to 2 in flight; overflow rejected with 429")
+
+if __name__ == "__main__":
+    from conftest import build_manager
+
+    test_record_then_replay_through_manager(build_manager)
+    test_recording_is_buffered()
+    test_latency_models_and_error_injection()
+    test_concurrency_limit()
+    print("\n🎉 LLM cassette tests completed!")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test LLM Load Test - Verify the load-test harness reports on routing, caching and filtering
+"""
+
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm.quota_manager import quota_manager
+from core.llm.load_test import LoadTest, LoadTestConfig, StandInProvider, format_table, percentile
+from core.optimization.lazy import services
+
+def test_percentile():
+    """Test nearest-rank percentiles"""
+
+    print("📏 Testing percentiles")
+    print("=" * 50)
+
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) is None
+    assert StandInProvider.parse("p:0.2:0.1:4:60") == StandInProvider(
+        "p", mean_latency=0.2, stddev=0.2 * 0.3, rate_limit_errors=0.05, server_errors=0.05,
+        max_concurrency=4, requests_per_minute=60
+    )
+    print("✅ Percentiles and provider specs parsed")
+
+def test_load_test_report():
+    """Test a small run exercises fallback, caching, filtering and quota limits"""
+
+    print("\n🏋️ Testing load test run")
+    print("=" * 50)
+
+    config = LoadTestConfig(
+        users=8, requests_per_user=6, repeat_ratio=0.3, file_generation_ratio=0.3, seed=3,
+        prompt_mix={"short": 0.8, "medium": 0.2},
+        providers=[
+            StandInProvider("loadtest_flaky", mean_latency=0.005, stddev=0.001, server_errors=0.6),
+            StandInProvider("loadtest_limited", mean_latency=0.01, stddev=0.002, requests_per_minute=6),
+        ]
+    )
+    was_built = services.is_initialized("llm_manager")
+    load_test = LoadTest(config)
+    report = asyncio.run(load_test.run())
+
+    assert report["requests"] == 48
+    assert report["succeeded"] + report["failed"] == 48
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p95"] <= report["latency_ms"]["p99"]
+    assert report["fallbacks"] > 0
+    assert "_call_provider" not in vars(load_test.manager)
+    assert report["cache_hit_rate"] > 0
+    assert report["filtered_responses"] > 0
+    assert report["quota_rejections"] + report["errors"].get("no_provider", 0) > 0
+
+    # The global manager is restored after the run, and the global quotas never saw the stand-ins
+    assert services.is_initialized("llm_manager") == was_built
+    assert "loadtest_limited" not in quota_manager.rate_limiters
+    assert "loadtest_flaky" not in quota_manager.quotas
+
+    table = format_table(report)
+    assert "Latency p99 (ms)" in table
+    print(table)
+
+if __name__ == "__main__":
+    test_percentile()
+    test_load_test_report()
+    print("\n🎉 LLM load test tests completed!")
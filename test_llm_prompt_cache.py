@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test LLM Prompt Cache - Verify cacheable prefixes and cache-hit token reporting
+"""
+
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm.llm_manager import ClaudeClient, LLMConfig, LLMProvider
+from core.llm.prompt_cache import PromptCacheConfig, openai_cache_usage, split_system_messages, stable_text
+
+LONG_PERSONA = "You are JARVIS, a precise assistant.   \r\n" + "Follow the house rules carefully. " * 400
+
+class FakeMessages:
+    """Stands in for AsyncAnthropic().messages"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        cached = len(self.requests) > 1
+        usage = SimpleNamespace(
+            input_tokens=10, output_tokens=5,
+            cache_read_input_tokens=2000 if cached else 0,
+            cache_creation_input_tokens=0 if cached else 2000
+        )
+        return SimpleNamespace(content=[SimpleNamespace(text="ok")], usage=usage)
+
+def _claude_client(**prompt_cache):
+    config = LLMConfig(provider=LLMProvider.CLAUDE, model="claude-test",
+                       extra_params={"prompt_cache": prompt_cache})
+    client = ClaudeClient(config)
+    fake = SimpleNamespace(messages=FakeMessages())
+    client._get_client = lambda: fake
+    return client, fake.messages
+
+def test_stable_prefix_helpers():
+    """Test system prompts keep their content and are merged deterministically"""
+
+    print("🧱 Testing stable prefix helpers")
+    print("=" * 50)
+
+    # Only line endings change; a Markdown hard break (two trailing spaces) survives
+    assert stable_text("a  \r\nb\r\n\n") == "a  \nb\n\n"
+
+    system, rest = split_system_messages([
+        {"role": "system", "content": "persona "},
+        {"role": "user", "content": "hi"},
+        {"role": "system", "content": "rules"},
+    ])
+    assert system == "persona \n\nrules"
+    assert rest == [{"role": "user", "content": "hi"}]
+
+    assert openai_cache_usage({"prompt_tokens_details": {"cached_tokens": 1024}}) == {"cache_read_tokens": 1024}
+    assert openai_cache_usage(None) == {"cache_read_tokens": 0}
+    print("✅ Prefixes normalized")
+
+def test_claude_marks_long_system_prompt():
+    """Test long system prompts get a cache_control block and usage is recorded"""
+
+    print("\n📌 Testing Claude cache_control")
+    print("=" * 50)
+
+    client, messages = _claude_client()
+
+    first = asyncio.run(client.generate("question one", LONG_PERSONA))
+    second = asyncio.run(client.generate("question two", LONG_PERSONA.replace("\r\n", "\n")))
+
+    system_blocks = [request["system"] for request in messages.requests]
+    assert system_blocks[0] == system_blocks[1]              # byte-identical prefix
+    assert system_blocks[0][0]["cache_control"] == {"type": "ephemeral"}
+    assert first.metadata["cache_write_tokens"] == 2000
+    assert second.metadata["cache_read_tokens"] == 2000
+
+    # Short prompts stay plain strings
+    asyncio.run(client.generate("hi", "short persona"))
+    assert messages.requests[-1]["system"] == "short persona"
+    print("✅ Stable prefix cached and reused")
+
+def test_claude_caches_conversation_history():
+    """Test multi-turn chats mark the latest turn so the next call reuses the history"""
+
+    print("\n💬 Testing conversation caching")
+    print("=" * 50)
+
+    client, messages = _claude_client()
+    history = [
+        {"role": "system", "content": LONG_PERSONA},
+        {"role": "user", "content": "first"},
+        {"role": "assistant", "content": "answer"},
+        {"role": "user", "content": "second"},
+    ]
+    asyncio.run(client.chat(history))
+
+    sent = messages.requests[-1]["messages"]
+    assert sent[:2] == history[1:3]
+    assert sent[-1]["content"][0]["cache_control"] == {"type": "ephemeral"}
+
+    client, messages = _claude_client(enabled=False)
+    asyncio.run(client.chat(history))
+    assert messages.requests[-1]["system"] == LONG_PERSONA
+    assert messages.requests[-1]["messages"] == history[1:]
+    print("✅ History breakpoint set (and skipped when disabled)")
+
+def test_manager_totals_cache_tokens(make_manager):
+    """Test LLMManager aggregates provider cache usage"""
+
+    print("\n📊 Testing prompt cache stats")
+    print("=" * 50)
+
+    client, _ = _claude_client()
+    manager = make_manager({"prompt_cache_claude": client})
+
+    asyncio.run(manager.generate("one", LONG_PERSONA))
+    asyncio.run(manager.generate("two", LONG_PERSONA))
+
+    stats = manager.get_status()["prompt_cache"]
+    assert stats == {"cache_read_tokens": 2000, "cache_write_tokens": 2000}
+    print(f"✅ {stats}")
+
+if __name__ == "__main__":
+    from conftest import build_manager
+
+    test_stable_prefix_helpers()
+    test_claude_marks_long_system_prompt()
+    test_claude_caches_conversation_history()
+    test_manager_totals_cache_tokens(build_manager)
+    print("\n🎉 LLM prompt cache tests completed!")
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Test LLM Response Cache - Verify LRU budget, bypass, Redis tier and request coalescing
+"""
+
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.optimization.performance import SimpleCache
+from core.llm.llm_manager import BaseLLMClient, LLMConfig, LLMProvider, LLMResponse
+from core.llm.response_cache import LLMResponseCache
+
+class CountingClient(BaseLLMClient):
+    """Client that counts provider calls"""
+
+    def __init__(self):
+        super().__init__(LLMConfig(provider=LLMProvider.OLLAMA, model="counting"))
+        self.calls = 0
+
+    async def generate(self, prompt, system_prompt=None, **kwargs):
+        self.calls += 1
+        return LLMResponse(content=f"answer {self.calls}", model="counting", provider="ollama")
+
+    async def chat(self, messages, **kwargs):
+        return await self.generate(messages[-1]["content"])
+
+class SlowClient(CountingClient):
+    """Client that holds the request open long enough to overlap callers"""
+
+    async def generate(self, prompt, system_prompt=None, **kwargs):
+        await asyncio.sleep(0.05)
+        return await super().generate(prompt, system_prompt, **kwargs)
+
+class FailingClient(CountingClient):
+    """Client whose provider is down"""
+
+    async def generate(self, prompt, system_prompt=None, **kwargs):
+        self.calls += 1
+        raise Exception("API error 502: bad gateway")
+
+class FakeDatabase:
+    """Stands in for DatabaseManager's Redis helpers"""
+
+    def __init__(self):
+        self.store = {}
+
+    async def cache_get(self, key):
+        return self.store.get(key)
+
+    async def cache_set(self, key, value, expire=3600):
+        self.store[key] = value
+        return True
+
+def test_lru_byte_budget():
+    """Test least recently used entries are evicted over the byte budget"""
+
+    print("📦 Testing LRU byte budget")
+    print("=" * 50)
+
+    cache = SimpleCache(max_bytes=10, sizeof=len)
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    cache.get("a")
+    cache.set("c", "cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.total_bytes == 8
+    assert cache.get_stats()["evictions"] == 1
+    print("✅ Least recently used entry evicted")
+
+def test_repeated_prompt_is_cached(make_manager):
+    """Test identical prompts hit the cache and bypass skips it"""
+
+    print("\n♻️  Testing cached generate")
+    print("=" * 50)
+
+    client = CountingClient()
+    manager = make_manager({"cached_provider": client}, cache=True)
+
+    async def run():
+        first = await manager.generate("Plan execution for: report", "You are JARVIS")
+        second = await manager.generate("Plan execution for: report", "You are JARVIS")
+        third = await manager.generate("Plan execution for: report", "You are JARVIS", use_cache=False)
+        other = await manager.generate("Plan execution for: report", "You are JARVIS", temperature=0.1)
+        return first, second, third, other
+
+    first, second, third, other = asyncio.run(run())
+
+    assert first.content == second.content == "answer 1"
+    assert second.metadata["cache_hit"]
+    assert third.content == "answer 2"
+    assert other.content == "answer 3"
+    assert client.calls == 3
+
+    second.content = "mutated"
+    again = asyncio.run(manager.generate("Plan execution for: report", "You are JARVIS"))
+    assert again.content == "answer 1"
+    print(f"✅ Provider called {client.calls} times for 5 requests")
+
+def test_redis_tier():
+    """Test responses are shared through the Redis tier"""
+
+    print("\n🗄️  Testing Redis tier")
+    print("=" * 50)
+
+    db = FakeDatabase()
+    writer = LLMResponseCache()
+    writer.attach_redis(db)
+    reader = LLMResponseCache()
+    reader.attach_redis(db)
+
+    key = writer.make_key("qwen", "m", [{"role": "user", "content": "hi"}], 0.7, 100)
+    response = LLMResponse(content="hello", model="m", provider="qwen", tokens_used=3)
+
+    async def run():
+        await writer.set(key, response, ttl=60)
+        return await reader.get(key)
+
+    cached = asyncio.run(run())
+
+    assert key.startswith("llm_cache:m:")
+    assert cached.content == "hello"
+    assert reader.get_stats()["redis_hits"] == 1
+    print("✅ Response served from Redis tier")
+
+def test_concurrent_requests_coalesce(make_manager):
+    """Test identical concurrent requests share one provider call"""
+
+    print("\n🔗 Testing single-flight coalescing")
+    print("=" * 50)
+
+    client = SlowClient()
+    manager = make_manager({"cached_provider": client}, cache=True)
+
+    async def run():
+        return await asyncio.gather(*[
+            manager.generate("Analyze the results", use_cache=False) for _ in range(5)
+        ])
+
+    responses = asyncio.run(run())
+
+    assert client.calls == 1
+    assert all(r.content == "answer 1" for r in responses)
+    assert len({id(r) for r in responses}) == 5
+    assert sum(1 for r in responses if r.metadata.get("coalesced")) == 4
+    assert manager.get_status()["single_flight"]["in_flight"] == 0
+    print(f"✅ 5 concurrent callers, {client.calls} provider call")
+
+def test_fallback_response_is_cached_under_its_provider(make_manager):
+    """Test a fallback answer is not stored as the failed provider's response"""
+
+    print("\n🔀 Testing cache key after fallback")
+    print("=" * 50)
+
+    manager = make_manager({"cache_primary": FailingClient(), "cache_fallback": CountingClient()}, cache=True)
+    messages = [{"role": "user", "content": "Which provider answered?"}]
+
+    async def run():
+        response = await manager.generate("Which provider answered?")
+        primary = await manager.response_cache.get(manager._cache_key("cache_primary", messages, {}))
+        fallback = await manager.response_cache.get(manager._cache_key("cache_fallback", messages, {}))
+        return response, primary, fallback
+
+    response, primary, fallback = asyncio.run(run())
+
+    assert response.metadata["fallback_provider"] == "cache_fallback"
+    assert primary is None
+    assert fallback is not None and fallback.content == response.content
+    print("✅ Fallback response cached under the provider that answered")
+
+def test_spreading_policy_still_coalesces_and_caches(make_manager):
+    """Test requests routed to different providers share one call and one cache entry"""
+
+    print("\n⚖️  Testing coalescing under least-loaded routing")
+    print("=" * 50)
+
+    first, second = SlowClient(), SlowClient()
+    manager = make_manager({"spread_a": first, "spread_b": second}, cache=True)
+    manager.quota_manager.set_routing_policy("least_loaded")
+
+    async def run():
+        responses = await asyncio.gather(*[manager.generate("Summarize the log") for _ in range(4)])
+        repeat = await manager.generate("Summarize the log")
+        pinned = await manager.generate("Summarize the log", provider="spread_b")
+        return responses, repeat, pinned
+
+    responses, repeat, pinned = asyncio.run(run())
+
+    assert first.calls + second.calls == 2
+    assert sum(1 for r in responses if r.metadata.get("coalesced")) == 3
+    assert repeat.content == responses[0].content
+    assert pinned.content == "answer 1" and second.calls == 1
+    print(f"✅ 5 unpinned requests, {first.calls} provider call; pinned call kept its own key")
+
+if __name__ == "__main__":
+    from conftest import build_manager
+
+    test_lru_byte_budget()
+    test_repeated_prompt_is_cached(build_manager)
+    test_redis_tier()
+    test_concurrent_requests_coalesce(build_manager)
+    test_fallback_response_is_cached_under_its_provider(build_manager)
+    test_spreading_policy_still_coalesces_and_caches(build_manager)
+    print("\n🎉 LLM response cache tests completed!")
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Test LLM Routing - Verify hedging, routing policies, rate limits and circuit breaking
+"""
+
+import asyncio
+import threading
+import time
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm.llm_manager import BaseLLMClient, LLMConfig, LLMManager, LLMProvider, LLMResponse
+from core.llm.quota_manager import QuotaManager
+from core.llm.routing_policy import WeightedRandomPolicy
+from core.llm.rate_limiter import ProviderRateLimiter, RateLimitConfig, RateLimitExceeded
+from core.llm.circuit_breaker import BreakerConfig, CircuitState, FailureKind, classify_error
+
+class DelayedClient(BaseLLMClient):
+    """Client that answers after a fixed delay"""
+
+    def __init__(self, name: str, delay: float, error: str = None):
+        super().__init__(LLMConfig(provider=LLMProvider.OLLAMA, model=name))
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate(self, prompt, system_prompt=None, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise Exception(self.error)
+        return LLMResponse(content=f"from {self.name}", model=self.name, provider="ollama")
+
+    async def chat(self, messages, **kwargs):
+        return await self.generate(messages[-1]["content"])
+
+def test_hedge_beats_slow_primary(make_manager):
+    """Test a slow primary is raced and cancelled once the hedge answers"""
+
+    print("🏁 Testing hedged request")
+    print("=" * 50)
+
+    slow = DelayedClient("hedge_slow", delay=1.0)
+    fast = DelayedClient("hedge_fast", delay=0.01)
+    manager = make_manager({"hedge_slow": slow, "hedge_fast": fast})
+    manager.hedge_config.default_delay = 0.05
+    manager.hedge_config.min_delay = 0.01
+
+    async def run():
+        start = asyncio.get_running_loop().time()
+        response = await manager.generate("hi", hedge=True)
+        await asyncio.sleep(0)
+        return response, asyncio.get_running_loop().time() - start
+
+    response, elapsed = asyncio.run(run())
+
+    assert response.content == "from hedge_fast"
+    assert response.metadata["hedge_winner"] == "hedge_fast"
+    assert elapsed < 0.5
+    assert slow.cancelled == 1
+    assert manager.hedge_stats["hedge_wins"] == 1
+    print(f"✅ Hedge answered in {elapsed:.2f}s, loser cancelled")
+
+def test_fast_primary_is_not_hedged(make_manager):
+    """Test no second request is sent when the primary meets its deadline"""
+
+    print("\n⚡ Testing primary within deadline")
+    print("=" * 50)
+
+    primary = DelayedClient("nohedge_primary", delay=0.01)
+    backup = DelayedClient("nohedge_backup", delay=0.01)
+    manager = make_manager({"nohedge_primary": primary, "nohedge_backup": backup})
+    manager.hedge_config.default_delay = 0.5
+
+    response = asyncio.run(manager.generate("hi", hedge=True))
+
+    assert response.content == "from nohedge_primary"
+    assert backup.calls == 0
+    print("✅ Backup provider untouched")
+
+def test_bad_request_is_not_hedged(make_manager):
+    """Test a non-retryable primary error is raised instead of hedged"""
+
+    print("\n🚫 Testing bad request with hedging")
+    print("=" * 50)
+
+    primary = DelayedClient("badreq_primary", delay=0, error="API error 400: bad prompt")
+    backup = DelayedClient("badreq_backup", delay=0.01)
+    manager = make_manager({"badreq_primary": primary, "badreq_backup": backup})
+    manager.hedge_config.default_delay = 0.5
+
+    try:
+        asyncio.run(manager.generate("hi", hedge=True))
+        assert False, "expected the 400 to be raised"
+    except Exception as e:
+        assert "400" in str(e)
+
+    assert primary.calls == 1 and backup.calls == 0
+    assert manager.hedge_stats["hedged"] == 0
+    print("✅ 400 raised without a second request")
+
+def test_latency_percentile():
+    """Test the adaptive deadline uses recorded latencies"""
+
+    print("\n📈 Testing latency percentile")
+    print("=" * 50)
+
+    quotas = QuotaManager()
+    assert quotas.get_latency_percentile("p", 95) is None
+
+    for latency in [0.1, 0.2, 0.3, 0.4, 2.0]:
+        quotas.record_success("p", latency=latency)
+
+    assert quotas.get_latency_percentile("p", 50) == 0.3
+    assert quotas.get_latency_percentile("p", 95) == 2.0
+    print("✅ Percentiles computed from recent samples")
+
+def test_fastest_policy_follows_latency():
+    """Test traffic moves to the provider that is fastest right now"""
+
+    print("\n🚀 Testing fastest routing")
+    print("=" * 50)
+
+    quotas = QuotaManager()
+    assert quotas.routing_policy.name == "priority"
+    quotas.set_routing_policy("fastest")
+    providers = ["qwen", "gemini", "ollama"]
+
+    assert quotas.get_best_provider(providers) == "qwen"
+
+    quotas.record_success("qwen", latency=2.0)
+    quotas.record_success("gemini", latency=0.5)
+
+    # Unmeasured providers are explored first, then ranked on their latency
+    assert quotas.get_best_provider(providers) == "ollama"
+    quotas.record_success("ollama", latency=3.0)
+    assert quotas.get_best_provider(providers) == "gemini"
+
+    # ...unless they have only been failing
+    quotas.record_quota_error("claude", "500 internal error")
+    assert quotas.get_best_provider(providers + ["claude"]) == "gemini"
+
+    # Errors push a fast provider behind a slower reliable one
+    for _ in range(5):
+        quotas.record_quota_error("gemini", "500 internal error")
+    assert quotas.get_best_provider(providers) == "qwen"
+    print("✅ Fastest healthy provider selected")
+
+def test_other_policies():
+    """Test priority, cheapest, least-loaded and weighted random policies"""
+
+    print("\n🧭 Testing routing policies")
+    print("=" * 50)
+
+    quotas = QuotaManager()
+    providers = ["claude", "qwen", "ollama"]
+    quotas.record_success("ollama", latency=5.0)
+
+    quotas.set_routing_policy("priority")
+    assert quotas.get_best_provider(providers) == "qwen"
+
+    quotas.set_routing_policy("cheapest")
+    assert quotas.get_best_provider(providers) == "ollama"
+
+    quotas.set_routing_policy("least_loaded")
+    quotas.begin_request("qwen")
+    quotas.begin_request("ollama")
+    assert quotas.get_best_provider(providers) == "claude"
+
+    quotas.set_routing_policy(WeightedRandomPolicy(weights={"claude": 0, "qwen": 1, "ollama": 0}))
+    assert quotas.get_best_provider(providers) == "qwen"
+
+    summary = quotas.get_status_summary()
+    assert summary["ollama"]["in_flight"] == 1
+    assert summary["ollama"]["ewma_latency"] == 5.0
+    print("✅ All policies route as configured")
+
+def test_routing_policy_is_opt_in():
+    """Test managers route by priority unless config selects another policy"""
+
+    print("\n⚙️  Testing routing policy config")
+    print("=" * 50)
+
+    previous = os.environ.pop("LLM_ROUTING_POLICY", None)
+    try:
+        assert LLMManager(quota_manager=QuotaManager()).quota_manager.routing_policy.name == "priority"
+
+        os.environ["LLM_ROUTING_POLICY"] = "fastest"
+        assert LLMManager(quota_manager=QuotaManager()).quota_manager.routing_policy.name == "fastest"
+
+        os.environ["LLM_ROUTING_POLICY"] = "no_such_policy"
+        assert LLMManager(quota_manager=QuotaManager()).quota_manager.routing_policy.name == "priority"
+    finally:
+        os.environ.pop("LLM_ROUTING_POLICY", None)
+        if previous is not None:
+            os.environ["LLM_ROUTING_POLICY"] = previous
+    print("✅ fastest only when configured")
+
+def test_token_bucket_paces_requests():
+    """Test requests beyond the per-minute budget queue, then are rejected past max wait"""
+
+    print("\n🪣 Testing token bucket pacing")
+    print("=" * 50)
+
+    # 600 req/min = one request every 0.1s after a burst of 600
+    limiter = ProviderRateLimiter(RateLimitConfig(requests_per_minute=600, max_queue_wait=1.0))
+    limiter.requests.level = 0
+
+    async def run():
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(limiter.acquire(), limiter.acquire())
+        return asyncio.get_running_loop().time() - start
+
+    elapsed = asyncio.run(run())
+    status = limiter.get_status()
+
+    assert 0.15 <= elapsed < 0.5
+    assert status["queued_requests"] == 2
+    assert status["total_wait_seconds"] > 0
+
+    strict = ProviderRateLimiter(RateLimitConfig(tokens_per_minute=60, max_queue_wait=0.1))
+    strict.tokens.level = 0
+    try:
+        asyncio.run(strict.acquire(tokens=30))
+        assert False, "expected RateLimitExceeded"
+    except RateLimitExceeded:
+        pass
+    print(f"✅ Two queued requests admitted after {elapsed:.2f}s")
+
+def test_rate_limits_from_config_and_env():
+    """Test provider limits are read from config blocks and env overrides"""
+
+    print("\n📋 Testing rate limit config")
+    print("=" * 50)
+
+    assert RateLimitConfig.from_settings("qwen", {"temperature": 0.4}) is None
+    config = RateLimitConfig.from_settings("qwen", {"requests_per_minute": 60, "tokens_per_minute": 90000})
+    assert config.requests_per_minute == 60 and config.tokens_per_minute == 90000
+
+    previous = os.environ.pop("OLLAMA_RPM", None)
+    try:
+        os.environ["OLLAMA_RPM"] = "30"
+        assert RateLimitConfig.from_settings("ollama", {"requests_per_minute": 60}).requests_per_minute == 30
+
+        manager = LLMManager(quota_manager=QuotaManager())
+        assert manager.quota_manager.rate_limiters["ollama"].config.requests_per_minute == 30
+    finally:
+        os.environ.pop("OLLAMA_RPM", None)
+        if previous is not None:
+            os.environ["OLLAMA_RPM"] = previous
+    print("✅ Limits configured without code")
+
+def test_rate_limiter_works_across_event_loops():
+    """Test one limiter paces callers on several event loops"""
+
+    print("\n🧵 Testing rate limiter across event loops")
+    print("=" * 50)
+
+    limiter = ProviderRateLimiter(RateLimitConfig(requests_per_minute=1200, max_queue_wait=5.0))
+    limiter.requests.level = 0
+    errors = []
+
+    def worker():
+        async def run():
+            await asyncio.gather(limiter.acquire(), limiter.acquire())
+        try:
+            asyncio.run(run())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors, errors
+    assert limiter.requests.available < 1
+    print(f"✅ 6 requests admitted from 3 loops in {limiter.get_status()['total_wait_seconds']}s of queueing")
+
+def test_rate_limited_provider_is_rerouted():
+    """Test routing prefers a provider with bucket capacity"""
+
+    print("\n↪️  Testing rate-limit rerouting")
+    print("=" * 50)
+
+    quotas = QuotaManager(rate_limits={"qwen": RateLimitConfig(requests_per_minute=1)})
+    assert quotas.get_best_provider(["qwen", "ollama"]) == "qwen"
+
+    asyncio.run(quotas.acquire_rate_limit("qwen"))
+
+    assert quotas.get_best_provider(["qwen", "ollama"]) == "ollama"
+    assert quotas.get_best_provider(["qwen"]) == "qwen"
+    assert quotas.get_status_summary()["qwen"]["rate_limit"]["available_requests"] == 0
+
+    # Prompts are only tokenized for admission once a token budget exists
+    assert not quotas.limits_tokens()
+    quotas.configure_rate_limit("ollama", tokens_per_minute=10000)
+    assert quotas.limits_tokens()
+    print("✅ Saturated provider skipped while another has capacity")
+
+def test_error_classification():
+    """Test 429s, timeouts and 5xx are told apart"""
+
+    print("\n🏷️  Testing error classification")
+    print("=" * 50)
+
+    assert classify_error("Qwen API error 429: Too Many Requests") == FailureKind.RATE_LIMIT
+    assert classify_error(asyncio.TimeoutError()) == FailureKind.TIMEOUT
+    assert classify_error("Ollama API error 503: busy") == FailureKind.SERVER_ERROR
+    assert classify_error("Error code: 529 - overloaded") == FailureKind.SERVER_ERROR
+    assert classify_error("Ollama API error 400: bad prompt") == FailureKind.OTHER
+    print("✅ Failures classified")
+
+def test_circuit_breaker_lifecycle():
+    """Test open -> half-open probe -> closed with exponential cooldown"""
+
+    print("\n🔌 Testing circuit breaker")
+    print("=" * 50)
+
+    quotas = QuotaManager(breaker_config=BreakerConfig(
+        failure_threshold=2, base_cooldown=0.05, rate_limit_cooldown=0.05, half_open_probes=1
+    ))
+    breaker = quotas.get_quota_info("qwen").breaker
+
+    # Client errors never open the circuit
+    quotas.record_quota_error("qwen", "API error 400: bad request")
+    assert quotas.is_provider_available("qwen")
+
+    quotas.record_quota_error("qwen", "API error 500: boom")
+    assert quotas.is_provider_available("qwen")
+    quotas.record_quota_error("qwen", "API error 500: boom")
+    assert breaker.state == CircuitState.OPEN
+    assert not quotas.is_provider_available("qwen")
+
+    time.sleep(0.06)
+
+    # One probe is allowed, a second concurrent one is not
+    assert quotas.is_provider_available("qwen")
+    assert breaker.state == CircuitState.HALF_OPEN
+    quotas.begin_request("qwen")
+    assert not quotas.is_provider_available("qwen")
+
+    # Failed probe reopens with a doubled cooldown
+    quotas.record_quota_error("qwen", asyncio.TimeoutError())
+    quotas.end_request("qwen")
+    assert breaker.state == CircuitState.OPEN
+    assert 0.05 < breaker.cooldown_remaining <= 0.1
+
+    time.sleep(0.11)
+    assert quotas.is_provider_available("qwen")
+    quotas.begin_request("qwen")
+    quotas.record_success("qwen")
+    quotas.end_request("qwen")
+    assert breaker.state == CircuitState.CLOSED
+    assert quotas.get_status_summary()["qwen"]["circuit"]["trips"] == 0
+    print("✅ Breaker opened, probed and recovered")
+
+def test_stale_results_are_ignored():
+    """Test results of requests sent before a trip neither close nor reopen the circuit"""
+
+    print("\n🕰️ Testing stale breaker results")
+    print("=" * 50)
+
+    quotas = QuotaManager(breaker_config=BreakerConfig(failure_threshold=1, base_cooldown=0.05))
+    breaker = quotas.get_quota_info("qwen").breaker
+
+    slow = quotas.breaker_generation("qwen")
+    quotas.record_quota_error("qwen", "API error 500: boom", generation=quotas.breaker_generation("qwen"))
+    assert breaker.state == CircuitState.OPEN
+
+    # The slow request sent before the trip finishes while the circuit is open
+    quotas.record_success("qwen", latency=1.0, generation=slow)
+    assert breaker.state == CircuitState.OPEN and not quotas.is_provider_available("qwen")
+
+    time.sleep(0.06)
+    assert quotas.is_provider_available("qwen")
+    probe = quotas.breaker_generation("qwen")
+    quotas.record_quota_error("qwen", "API error 500: boom", generation=slow)
+    assert breaker.state == CircuitState.HALF_OPEN and breaker.trips == 1
+
+    quotas.record_success("qwen", generation=probe)
+    assert breaker.state == CircuitState.CLOSED
+    print("✅ Only the probe closed the circuit")
+
+def test_half_open_probe_is_reserved(make_manager):
+    """Test concurrent requests send only one probe to a recovering provider"""
+
+    print("\n🧪 Testing concurrent half-open probes")
+    print("=" * 50)
+
+    recovering = DelayedClient("probe_recovering", delay=0.05)
+    healthy = DelayedClient("probe_healthy", delay=0.05)
+    manager = make_manager({"probe_recovering": recovering, "probe_healthy": healthy})
+    quota_manager = manager.quota_manager
+
+    # The recovering provider is the faster one, so routing prefers it
+    quota_manager.record_success("probe_recovering", latency=0.01)
+    quota_manager.record_success("probe_healthy", latency=1.0)
+    breaker = quota_manager.get_quota_info("probe_recovering").breaker
+    breaker.config = BreakerConfig(half_open_probes=1)
+    breaker.state = CircuitState.OPEN
+    breaker.open_until = time.time() - 1
+
+    async def run():
+        return await asyncio.gather(*(
+            manager.generate(f"question {i}", use_cache=False) for i in range(10)
+        ))
+
+    responses = asyncio.run(run())
+
+    assert recovering.calls == 1 and healthy.calls == 9
+    assert sum(r.content == "from probe_recovering" for r in responses) == 1
+    assert breaker.state == CircuitState.CLOSED and breaker.probes_in_flight == 0
+    assert quota_manager.get_quota_info("probe_recovering").in_flight == 0
+    assert quota_manager.get_quota_info("probe_healthy").in_flight == 0
+    print("✅ One probe sent, the rest routed to the healthy provider")
+
+def test_server_error_falls_back(make_manager):
+    """Test 5xx errors fail over to another provider immediately"""
+
+    print("\n🔄 Testing 5xx failover")
+    print("=" * 50)
+
+    broken = DelayedClient("failover_broken", delay=0, error="API error 502: bad gateway")
+    healthy = DelayedClient("failover_healthy", delay=0)
+    manager = make_manager({"failover_broken": broken, "failover_healthy": healthy})
+
+    response = asyncio.run(manager.generate("hi"))
+
+    assert response.content == "from failover_healthy"
+    print("✅ Request served by healthy provider")
+
+def test_chat_uses_fallback_and_quota(make_manager):
+    """Test chat routes, fails over and records quota/metrics like generate"""
+
+    print("\n💬 Testing chat failover")
+    print("=" * 50)
+
+    broken = DelayedClient("chat_broken", delay=0, error="429 Too Many Requests")
+    healthy = DelayedClient("chat_healthy", delay=0)
+    manager = make_manager({"chat_broken": broken, "chat_healthy": healthy})
+
+    recorded = []
+    manager._record_metrics = lambda provider, model, duration, tokens_used=None, error=None: \
+        recorded.append((provider, error is None))
+
+    messages = [{"role": "user", "content": "hello"}]
+    response = asyncio.run(manager.chat(messages))
+    assert response.content == "from chat_healthy"
+
+    # The healthy provider is preferred now the broken one's circuit is open
+    response = asyncio.run(manager.chat(messages))
+    assert response.content == "from chat_healthy"
+
+    assert manager.quota_manager.get_quota_info("chat_healthy").requests_made == 2
+    assert broken.calls <= 1
+    assert recorded.count(("chat_healthy", True)) == 2
+    print(f"✅ Chat served by healthy provider, metrics: {recorded}")
+
+def test_chat_honors_switched_provider(make_manager):
+    """Test chat sends to the provider chosen with switch_provider while it is available"""
+
+    print("\n🎯 Testing switched provider for chat")
+    print("=" * 50)
+
+    fast = DelayedClient("switch_fast", delay=0)
+    chosen = DelayedClient("switch_chosen", delay=0)
+    manager = make_manager({"switch_fast": fast, "switch_chosen": chosen})
+    manager.quota_manager.record_success("switch_fast", latency=0.01)
+    manager.quota_manager.record_success("switch_chosen", latency=1.0)
+
+    messages = [{"role": "user", "content": "hello"}]
+    assert asyncio.run(manager.chat(messages)).content == "from switch_fast"
+
+    assert manager.switch_provider("switch_chosen")
+    assert asyncio.run(manager.chat(messages, use_cache=False)).content == "from switch_chosen"
+
+    # An unavailable switched provider falls back to routing
+    manager.quota_manager.record_quota_error("switch_chosen", "429 Too Many Requests")
+    assert asyncio.run(manager.chat(messages, use_cache=False)).content == "from switch_fast"
+    print("✅ Switched provider used until its circuit opened")
+
+if __name__ == "__main__":
+    from conftest import build_manager
+
+    test_hedge_beats_slow_primary(build_manager)
+    test_fast_primary_is_not_hedged(build_manager)
+    test_bad_request_is_not_hedged(build_manager)
+    test_latency_percentile()
+    test_fastest_policy_follows_latency()
+    test_other_policies()
+    test_routing_policy_is_opt_in()
+    test_token_bucket_paces_requests()
+    test_rate_limits_from_config_and_env()
+    test_rate_limiter_works_across_event_loops()
+    test_rate_limited_provider_is_rerouted()
+    test_error_classification()
+    test_circuit_breaker_lifecycle()
+    test_stale_results_are_ignored()
+    test_half_open_probe_is_reserved(build_manager)
+    test_server_error_falls_back(build_manager)
+    test_chat_uses_fallback_and_quota(build_manager)
+    test_chat_honors_switched_provider(build_manager)
+    print("\n🎉 LLM routing tests completed!")
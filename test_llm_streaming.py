@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Test LLM Streaming - Verify SSE/NDJSON parsing and streamed fallback
+"""
+
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm.llm_manager import (
+    BaseLLMClient, LLMConfig, LLMProvider, LLMResponse,
+    _iter_sse_data, _iter_ndjson
+)
+from core.llm.rate_limiter import RateLimitExceeded
+
+async def _lines(raw: bytes):
+    """Simulate an aiohttp StreamReader yielding lines"""
+    for line in raw.splitlines(keepends=True):
+        yield line
+
+class StreamingStubClient(BaseLLMClient):
+    """Client that streams fixed chunks, optionally failing first"""
+
+    def __init__(self, chunks, error: str = None):
+        super().__init__(LLMConfig(provider=LLMProvider.OLLAMA, model="stub"))
+        self.chunks = chunks
+        self.error = error
+
+    async def generate(self, prompt, system_prompt=None, **kwargs):
+        return LLMResponse(content="".join(self.chunks), model="stub", provider="stub")
+
+    async def chat(self, messages, **kwargs):
+        return await self.generate(messages[-1]["content"])
+
+    async def generate_stream(self, prompt, system_prompt=None, **kwargs):
+        if self.error:
+            raise Exception(self.error)
+        for chunk in self.chunks:
+            yield chunk
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+def test_sse_parsing():
+    """Test OpenAI-style SSE parsing stops at [DONE]"""
+
+    print("📡 Testing SSE parsing")
+    print("=" * 50)
+
+    raw = (
+        b': keep-alive\n\n'
+        b'data: {"choices":[{"delta":{"content":"Hel"}}]}\n\n'
+        b'data: {"choices":[{"delta":{"content":"lo"}}]}\n\n'
+        b'data: [DONE]\n\n'
+        b'data: {"choices":[{"delta":{"content":"ignored"}}]}\n\n'
+    )
+
+    payloads = asyncio.run(_collect(_iter_sse_data(_lines(raw))))
+
+    assert len(payloads) == 2
+    assert '"Hel"' in payloads[0]
+    print(f"✅ Parsed {len(payloads)} SSE events")
+
+def test_ndjson_parsing():
+    """Test Ollama-style NDJSON parsing"""
+
+    print("\n📡 Testing NDJSON parsing")
+    print("=" * 50)
+
+    raw = b'{"response":"a","done":false}\n\n{"response":"b","done":true}\n'
+
+    events = asyncio.run(_collect(_iter_ndjson(_lines(raw))))
+
+    assert [e["response"] for e in events] == ["a", "b"]
+    assert events[-1]["done"] is True
+    print(f"✅ Parsed {len(events)} NDJSON events")
+
+def test_stream_fallback_on_quota(make_manager):
+    """Test quota errors before the first chunk fall back to another provider"""
+
+    print("\n🔄 Testing streamed fallback")
+    print("=" * 50)
+
+    manager = make_manager({
+        "stream_primary": StreamingStubClient([], error="429 quota exceeded"),
+        "stream_backup": StreamingStubClient(["Hello", ", ", "world"]),
+    })
+
+    chunks = asyncio.run(_collect(manager.generate_stream("hi")))
+
+    assert "".join(chunks) == "Hello, world"
+    assert manager.quota_manager.get_quota_info("stream_backup").requests_made >= 1
+    assert not manager.quota_manager.is_provider_available("stream_primary")
+    print(f"✅ Received {len(chunks)} chunks from fallback provider")
+
+def test_stream_rate_limit_falls_back_and_records(make_manager):
+    """Test a local rate-limit rejection falls back and streamed calls reach routing and metrics"""
+
+    print("\n⏳ Testing streamed rate-limit fallback")
+    print("=" * 50)
+
+    manager = make_manager({
+        "stream_limited": StreamingStubClient(["never"]),
+        "stream_open": StreamingStubClient(["Hello", "!"]),
+    })
+    quotas = manager.quota_manager
+    quotas.set_routing_policy("priority")
+    quotas.provider_priority = ["stream_limited", "stream_open"]
+
+    acquire_rate_limit = quotas.acquire_rate_limit
+
+    async def reject_limited(provider, estimated_tokens=0):
+        if provider == "stream_limited":
+            raise RateLimitExceeded("Rate limit queue wait 5.0s exceeds 0s")
+        await acquire_rate_limit(provider, estimated_tokens)
+
+    quotas.acquire_rate_limit = reject_limited
+    recorded = []
+    manager._record_metrics = lambda provider, model, duration, tokens_used=None, error=None: \
+        recorded.append((provider, error is None))
+
+    chunks = asyncio.run(_collect(manager.generate_stream("hi")))
+
+    assert "".join(chunks) == "Hello!"
+    assert quotas.get_quota_info("stream_open").ewma_latency is not None
+    assert quotas.get_quota_info("stream_limited").in_flight == 0
+    assert recorded == [("stream_open", True)]
+    print(f"✅ Fell back past the limited provider, metrics: {recorded}")
+
+def test_stream_records_token_usage(make_manager):
+    """Test completed streams count their estimated tokens against the provider's limits"""
+
+    print("\n🧮 Testing streamed token usage")
+    print("=" * 50)
+
+    manager = make_manager({"stream_counted": StreamingStubClient(["word "] * 200)})
+    quotas = manager.quota_manager
+    quotas.configure_rate_limit("stream_counted", tokens_per_minute=10000)
+    bucket = quotas.rate_limiters["stream_counted"].tokens
+
+    chunks = asyncio.run(_collect(manager.generate_stream("Summarize the news for me")))
+    used = 10000 - bucket.available
+
+    assert len(chunks) == 200
+    assert used >= 200, f"stream only counted {used:.0f} tokens"
+    assert quotas.get_quota_info("stream_counted").tokens_per_second
+    print(f"✅ Stream counted ~{used:.0f} tokens")
+
+def test_default_stream_uses_generate():
+    """Test clients without native streaming yield a single chunk"""
+
+    print("\n📦 Testing default streaming")
+    print("=" * 50)
+
+    class NonStreamingClient(StreamingStubClient):
+        generate_stream = BaseLLMClient.generate_stream
+
+    client = NonStreamingClient(["one ", "chunk"])
+    chunks = asyncio.run(_collect(client.generate_stream("hi")))
+
+    assert chunks == ["one chunk"]
+    print("✅ Default stream yields full completion")
+
+if __name__ == "__main__":
+    from conftest import build_manager
+
+    test_sse_parsing()
+    test_ndjson_parsing()
+    test_stream_fallback_on_quota(build_manager)
+    test_stream_rate_limit_falls_back_and_records(build_manager)
+    test_stream_records_token_usage(build_manager)
+    test_default_stream_uses_generate()
+    print("\n🎉 LLM streaming tests completed!")
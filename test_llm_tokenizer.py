@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Test LLM Tokenizer - Verify token counting and context-budget trimming
+"""
+
+import asyncio
+import logging
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm.llm_manager import BaseLLMClient, OllamaClient, LLMConfig, LLMProvider, LLMResponse
+from core.llm.tokenizer import (
+    ContextBudgeter, HeuristicTokenizer, Tokenizer, get_context_window, get_tokenizer, register_tokenizer,
+    tiktoken_cache_dir
+)
+
+class RecordingClient(BaseLLMClient):
+    """Client that records the messages it was sent"""
+
+    def __init__(self, model: str, max_tokens: int = 100):
+        super().__init__(LLMConfig(provider=LLMProvider.OLLAMA, model=model, max_tokens=max_tokens))
+        self.sent = None
+
+    async def generate(self, prompt, system_prompt=None, **kwargs):
+        self.sent = [system_prompt, prompt]
+        return LLMResponse(content="ok", model=self.config.model, provider="ollama")
+
+    async def chat(self, messages, **kwargs):
+        self.sent = messages
+        return LLMResponse(content="ok", model=self.config.model, provider="ollama")
+
+def test_token_counting():
+    """Test the heuristic counts and tokenizer selection"""
+
+    print("🔢 Testing token counting")
+    print("=" * 50)
+
+    heuristic = HeuristicTokenizer()
+    assert heuristic.count("") == 0
+    assert heuristic.count("hello world") == 4        # hell/o worl/d
+    assert heuristic.count("a, b.") == 4
+
+    assert get_context_window("claude-3-5-sonnet") == 200000
+    assert get_context_window("gpt-4o-mini") == 128000
+    assert get_context_window("qwen3-coder-plus") == 1000000
+    assert get_context_window("qwen2.5-coder:7b") == 32768
+    assert get_context_window("unknown-model") == 131072
+
+    class WordTokenizer(Tokenizer):
+        name = "words"
+
+        def __init__(self, model):
+            if not model.startswith("words"):
+                raise ValueError("not mine")
+
+        def count(self, text):
+            return len(text.split())
+
+    register_tokenizer(WordTokenizer)
+    assert get_tokenizer("words-model").name == "words"
+    assert get_tokenizer("other-model").name != "words"
+    print(f"✅ Heuristic and pluggable tokenizers work (default: {get_tokenizer('gpt-4').name})")
+
+def test_budgeter_drops_then_compacts():
+    """Test old turns are dropped first and system/latest messages kept"""
+
+    print("\n✂️ Testing context budgeter")
+    print("=" * 50)
+
+    budgeter = ContextBudgeter(min_prompt_tokens=10)
+    history = [{"role": "system", "content": "be brief"}]
+    for i in range(20):
+        history.append({"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "word " * 50})
+    history.append({"role": "user", "content": "latest question"})
+
+    result = budgeter.fit(history, "test-model", max_tokens=100, context_window=400)
+
+    assert result.final_tokens <= result.budget == 300
+    assert result.messages[0]["content"] == "be brief"
+    assert result.messages[-1]["content"] == "latest question"
+    assert result.dropped_messages > 0 and result.tokens_saved > 0
+
+    # A single huge message is compacted from the middle instead
+    huge = [{"role": "user", "content": "start " + "x " * 5000 + " end"}]
+    result = budgeter.fit(huge, "test-model", max_tokens=100, context_window=400)
+
+    assert result.truncated_messages == 1 and result.final_tokens <= 300
+    assert result.messages[0]["content"].startswith("start") and result.messages[0]["content"].endswith("end")
+    print(f"✅ Saved {result.tokens_saved} tokens")
+
+def test_manager_trims_chat_and_generate(make_manager):
+    """Test LLMManager fits prompts to the client's model and reports savings"""
+
+    print("\n📉 Testing manager context budget")
+    print("=" * 50)
+
+    client = RecordingClient("llama2", max_tokens=100)    # 4096-token window
+    manager = make_manager({"budget_client": client})
+
+    history = [{"role": "user", "content": "old " * 5000}, {"role": "user", "content": "new question"}]
+    response = asyncio.run(manager.chat(history))
+
+    assert client.sent == [{"role": "user", "content": "new question"}]
+    assert response.metadata["context_tokens_saved"] > 0
+
+    response = asyncio.run(manager.generate("tell me " + "more " * 5000, system_prompt="sys"))
+    assert client.sent[0] == "sys" and "[...]" in client.sent[1]
+    assert response.metadata["context_tokens_saved"] > 0
+
+    stats = manager.get_status()["context_budget"]
+    assert stats["trimmed_requests"] == 2 and stats["tokens_saved"] > 0
+    print(f"✅ Trimmed {stats['trimmed_requests']} requests, saved {stats['tokens_saved']} tokens")
+
+def test_ollama_window_comes_from_num_ctx(make_manager):
+    """Test Ollama prompts are budgeted to a configured num_ctx and sent untrimmed otherwise"""
+
+    print("\n🦙 Testing Ollama num_ctx budget")
+    print("=" * 50)
+
+    class RecordingOllama(OllamaClient):
+        async def chat(self, messages, **kwargs):
+            self.sent = messages
+            self.options = self._options(kwargs)
+            return LLMResponse(content="ok", model=self.config.model, provider="ollama")
+
+    unset = RecordingOllama(LLMConfig(provider=LLMProvider.OLLAMA, model="llama3.2", max_tokens=4000))
+    small = RecordingOllama(LLMConfig(
+        provider=LLMProvider.OLLAMA, model="llama3.2", max_tokens=4000, extra_params={"num_ctx": 2048}
+    ))
+    large = RecordingOllama(LLMConfig(
+        provider=LLMProvider.OLLAMA, model="llama3.2", max_tokens=4000, extra_params={"num_ctx": 8192}
+    ))
+    assert unset.context_window == 0 and small.context_window == 2048
+
+    history = [{"role": "user", "content": "old " * 1500}, {"role": "user", "content": "new question"}]
+    for client in (unset, small, large):
+        asyncio.run(make_manager({"ollama": client}).chat(history))
+
+    # Nothing is trimmed without a known window, and max_tokens is left alone
+    assert unset.sent == history and "num_ctx" not in unset.options
+    assert unset.options["num_predict"] == 4000
+
+    # max_tokens no longer takes half the window: the prompt fits, the completion gets the rest
+    assert small.sent == history and small.options["num_ctx"] == 2048
+    assert 0 < small.options["num_predict"] < 2048 - 1500
+
+    assert large.sent == history and large.options["num_predict"] == 4000
+    print(f"✅ Unset num_ctx sent untrimmed, 2048 clamped num_predict to {small.options['num_predict']}")
+
+def test_trimming_is_logged(make_manager):
+    """Test a trimmed prompt is reported as a warning"""
+
+    print("\n📣 Testing trim warning")
+    print("=" * 50)
+
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger("llm_manager")
+    logger.addHandler(handler)
+    try:
+        client = RecordingClient("llama2", max_tokens=100)
+        asyncio.run(make_manager({"budget_client": client}).generate("tell me " + "more " * 5000))
+    finally:
+        logger.removeHandler(handler)
+
+    assert any(r.levelno == logging.WARNING and "Trimmed prompt" in r.getMessage() for r in records)
+    print("✅ Trim logged as a warning")
+
+def test_tiktoken_cache_dir():
+    """Test the tiktoken cache location follows its environment variables"""
+
+    print("\n📁 Testing tiktoken cache lookup")
+    print("=" * 50)
+
+    saved = {name: os.environ.pop(name, None) for name in ("TIKTOKEN_CACHE_DIR", "DATA_GYM_CACHE_DIR")}
+    try:
+        assert tiktoken_cache_dir().endswith("data-gym-cache")
+        os.environ["DATA_GYM_CACHE_DIR"] = "/tmp/gym"
+        assert tiktoken_cache_dir() == "/tmp/gym"
+        os.environ["TIKTOKEN_CACHE_DIR"] = ""
+        assert tiktoken_cache_dir() is None
+    finally:
+        for name, value in saved.items():
+            os.environ.pop(name, None)
+            if value is not None:
+                os.environ[name] = value
+    print("✅ Cache directory resolved like tiktoken")
+
+if __name__ == "__main__":
+    from conftest import build_manager
+
+    test_token_counting()
+    test_budgeter_drops_then_compacts()
+    test_manager_trims_chat_and_generate(build_manager)
+    test_ollama_window_comes_from_num_ctx(build_manager)
+    test_trimming_is_logged(build_manager)
+    test_tiktoken_cache_dir()
+    print("\n🎉 LLM tokenizer tests completed!")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test Memory Budget - Verify decayed retention scores and incremental heap eviction
+"""
+
+import asyncio
+import random
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.memory.memory_manager import MemoryManager
+from core.memory.memory_budget import MemoryBudget, RetentionHeap
+
+def test_retention_scores_and_heap():
+    """Test keys order memories by current score and the heap honours re-keys"""
+
+    print("📉 Testing retention scores")
+    print("=" * 50)
+
+    budget = MemoryBudget(half_life_days=10)
+    now = time.time()
+    day = 86400
+
+    fresh = budget.retention_key(0.5, 0, now)
+    old = budget.retention_key(0.5, 0, now - 10 * day)
+    used = budget.retention_key(0.5, 20, now - 10 * day)
+    assert abs(budget.score_at(fresh, now) - 0.5) < 1e-9
+    assert abs(budget.score_at(old, now) - 0.25) < 1e-9      # One half-life idle
+    assert old < used < fresh
+    # Keys stay comparable later: the ratio of scores does not change with time
+    later = now + 100 * day
+    assert abs(budget.score_at(fresh, later) / budget.score_at(old, later) - 2.0) < 1e-9
+
+    heap = RetentionHeap()
+    for memory_id, key in (("a", 3.0), ("b", 1.0), ("c", 2.0)):
+        heap.push(memory_id, key)
+    heap.push("b", 5.0)     # Re-keyed after being retrieved
+    heap.discard("c")       # Removed elsewhere
+    assert len(heap) == 2
+    assert heap.pop() == (3.0, "a") and heap.pop() == (5.0, "b") and heap.pop() is None
+    print("✅ Decay, access boost and heap ordering work")
+
+def test_count_and_byte_budgets():
+    """Test background eviction keeps the store within budget, lowest scores first"""
+
+    print("\n🧹 Testing memory budgets")
+    print("=" * 50)
+
+    async def run():
+        manager = MemoryManager(budget=MemoryBudget(max_memories=1000, eviction_batch=100))
+        manager.logger.disabled = True
+        rng = random.Random(3)
+        favourite = await manager.store_memory("The user's favourite colour is teal", "preference", importance=0.2)
+        for i in range(1499):
+            await manager.store_memory(f"Observation {i}", "fact", importance=rng.uniform(0.1, 0.9))
+        # Retrieval keeps a low-importance memory around
+        for _ in range(20):
+            await manager.retrieve_memories("favourite colour")
+        await manager._consolidation_task
+        await manager.consolidate_memories()
+        return manager, favourite
+
+    manager, favourite = asyncio.run(run())
+    importances = sorted(m.importance for m in manager.memories.values() if m.memory_type == "fact")
+    assert len(manager.memories) == len(manager.index) == len(manager.retention) == 1000
+    assert favourite in manager.memories
+    assert importances[0] > 0.3      # The lowest ~third went first
+    assert manager.eviction_stats["evicted"] == 500
+    print(f"   Kept 1000 of 1500, lowest kept importance {importances[0]:.2f}")
+
+    async def run_bytes():
+        manager = MemoryManager(budget=MemoryBudget(max_bytes=200_000))
+        manager.logger.disabled = True
+        for i in range(1000):
+            await manager.store_memory(f"Log line {i} " + "x" * 200, "fact")
+        await manager.consolidate_memories()
+        return manager
+
+    manager = asyncio.run(run_bytes())
+    assert manager.total_bytes <= 200_000 and len(manager.memories) < 1000
+    print(f"   Byte budget: {len(manager.memories)} memories in {manager.total_bytes} bytes")
+    print("✅ Count and byte budgets enforced")
+
+def test_faded_memories_are_pruned():
+    """Test old, unused memories fade below the prune threshold"""
+
+    print("\n🍂 Testing time decay")
+    print("=" * 50)
+
+    async def run():
+        manager = MemoryManager(budget=MemoryBudget(half_life_days=30))
+        fresh = await manager.store_memory("Meeting notes from today", "conversation", importance=0.6)
+        stale = await manager.store_memory("Meeting notes from last year", "conversation", importance=0.6)
+        manager.memories.set_created(stale, datetime.now() - timedelta(days=365))
+        await manager.update_memory_importance(stale, 0.6)      # Re-keys with the backdated time
+        await manager.consolidate_memories()
+        return manager, fresh, stale
+
+    manager, fresh, stale = asyncio.run(run())
+    assert fresh in manager.memories and stale not in manager.memories
+    assert manager.eviction_stats["pruned"] == 1
+    print("✅ A year-old memory faded out, a fresh one stayed")
+
+def test_eviction_is_incremental():
+    """Benchmark a large eviction backlog while another coroutine keeps ticking"""
+
+    print("\n⏱️ Benchmarking incremental eviction")
+    print("=" * 50)
+
+    async def run():
+        manager = MemoryManager()
+        manager.logger.disabled = True
+        for i in range(150_000):
+            await manager.store_memory(f"Memory {i} about topic {i % 500}", "fact", importance=(i % 1000) / 1000 + 0.1)
+        manager.budget.max_memories = 100_000       # Shrink the budget under a full store
+
+        gaps = []
+        done = asyncio.Event()
+
+        async def ticker():
+            last = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(0)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        task = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        await manager.consolidate_memories()
+        elapsed = time.perf_counter() - start
+        done.set()
+        await task
+        return manager, elapsed, gaps
+
+    manager, elapsed, gaps = asyncio.run(run())
+    print(f"   Evicted 50000 in {elapsed * 1000:.0f} ms ({elapsed / 50000 * 1e6:.1f} µs each), "
+          f"longest loop stall {max(gaps) * 1000:.1f} ms over {len(gaps)} ticks")
+    assert len(manager.memories) == 100_000
+    assert len(gaps) >= 50000 // manager.budget.eviction_batch
+    assert max(gaps) < elapsed / 10
+    print("✅ Eviction yields to the event loop between batches")
+
+if __name__ == "__main__":
+    test_retention_scores_and_heap()
+    test_count_and_byte_budgets()
+    test_faded_memories_are_pruned()
+    test_eviction_is_incremental()
+    print("\n🎉 Memory budget tests completed!")
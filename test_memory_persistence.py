@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Test Memory Persistence - Verify the memory write-ahead log, snapshots and recovery
+"""
+
+import asyncio
+import copy
+import sys
+import os
+import tempfile
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.memory.memory_manager import MemoryManager
+from core.memory.memory_log import MemoryLog, SNAPSHOT_FILE
+
+def test_memories_survive_restart():
+    """Test stored, updated and pruned memories come back after a restart"""
+
+    print("💾 Testing memory persistence")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        async def first_run():
+            manager = MemoryManager(storage_dir=storage_dir)
+            await manager.initialize()
+            kept = await manager.store_memory("The user likes green tea", "preference", metadata={"source": "chat"})
+            pruned = await manager.store_memory("Temporary note", "task", importance=0.05)
+            await manager.update_memory_importance(kept, 0.8)
+            await manager.consolidate_memories()
+            before = manager.memories[kept]
+            await manager.close()
+            return kept, pruned, before
+
+        async def second_run():
+            manager = MemoryManager(storage_dir=storage_dir)
+            await manager.initialize()
+            restored = {memory_id: copy.copy(memory) for memory_id, memory in manager.memories.items()}
+            results = await manager.retrieve_memories("green tea")
+            await manager.close()
+            return restored, results
+
+        kept, pruned, before = asyncio.run(first_run())
+        memories, results = asyncio.run(second_run())
+
+    assert set(memories) == {kept} and pruned not in memories
+    assert memories[kept] == before and memories[kept].importance == 0.8
+    assert memories[kept].metadata == {"source": "chat"}
+    assert [m.id for m in results] == [kept]
+    print("✅ Memories, ids and updates survive a restart")
+
+def test_torn_tail_is_ignored():
+    """Test a half-written last entry (crash mid-write) is dropped on recovery"""
+
+    print("\n🩹 Testing torn log tail")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        log = MemoryLog(storage_dir)
+        log.recover()
+        log.start()
+        log.append({"op": "put", "memory": {"id": "a", "content": "kept"}})
+        log.close()
+
+        segment = os.path.join(storage_dir, sorted(os.listdir(storage_dir))[-1])
+        with open(segment, "a") as f:
+            f.write('0badc0de {"op":"put","memory":{"id":"b"')
+
+        recovered = MemoryLog(storage_dir)
+        state = recovered.recover()
+
+    assert list(state) == ["a"] and recovered.stats["torn_entries"] == 1
+    print("✅ Torn entry ignored, earlier entries kept")
+
+def test_entries_after_a_failed_write_are_kept():
+    """Test a partial write mid-log loses only itself, not later committed batches"""
+
+    print("\n🧯 Testing recovery past a failed write")
+    print("=" * 50)
+
+    class FailingOnce:
+        """Segment file whose next write lands only partially, then raises"""
+
+        def __init__(self, f):
+            self.f = f
+            self.fail = True
+
+        def write(self, data):
+            if self.fail:
+                self.fail = False
+                self.f.write(data[:len(data) // 2])
+                self.f.flush()
+                raise OSError("No space left on device")
+            return self.f.write(data)
+
+        def __getattr__(self, name):
+            return getattr(self.f, name)
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        log = MemoryLog(storage_dir)
+        log.recover()
+        log.start()
+        log.append({"op": "put", "memory": {"id": "a"}})
+        log.flush()
+
+        log._file = FailingOnce(log._file)
+        log.append({"op": "put", "memory": {"id": "lost"}})
+        log.flush()
+        log.append({"op": "put", "memory": {"id": "b"}})
+        log.append({"op": "put", "memory": {"id": "c"}})
+        log.close()
+
+        # Even a corrupt line in the middle of a segment only drops that line
+        segment = os.path.join(storage_dir, sorted(os.listdir(storage_dir))[-1])
+        with open(segment, "r+") as f:
+            lines = f.readlines()
+            lines.insert(1, "0badc0de {}\n")
+            f.seek(0)
+            f.writelines(lines)
+
+        recovered = MemoryLog(storage_dir)
+        state = recovered.recover()
+
+    assert sorted(state) == ["a", "b", "c"], sorted(state)
+    assert recovered.stats["torn_entries"] == 2
+    print("✅ Entries committed after the failed write were recovered")
+
+def test_unserializable_metadata_is_logged():
+    """Test metadata json cannot encode (e.g. datetime) is stored as text, not lost"""
+
+    print("\n📅 Testing non-JSON metadata")
+    print("=" * 50)
+
+    when = datetime(2026, 5, 1, 9, 30)
+    with tempfile.TemporaryDirectory() as storage_dir:
+        async def first_run():
+            manager = MemoryManager(storage_dir=storage_dir)
+            await manager.initialize()
+            meeting = await manager.store_memory("Dentist appointment", "task", metadata={"when": when})
+            later = await manager.store_memory("Buy more green tea", "task")
+            flushed = await manager.log.flush_async(timeout=5)
+            await manager.close()
+            return meeting, later, flushed
+
+        async def second_run():
+            manager = MemoryManager(storage_dir=storage_dir)
+            await manager.initialize()
+            restored = {memory_id: copy.copy(memory) for memory_id, memory in manager.memories.items()}
+            await manager.close()
+            return restored
+
+        meeting, later, flushed = asyncio.run(first_run())
+        memories = asyncio.run(second_run())
+
+    assert flushed
+    assert set(memories) == {meeting, later}
+    assert memories[meeting].metadata == {"when": str(when)}
+    print("✅ Writer kept running and both memories were recovered")
+
+def test_access_counts_are_coalesced():
+    """Test repeated retrievals log one access entry per memory, written on flush"""
+
+    print("\n👀 Testing coalesced access counts")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        async def first_run():
+            manager = MemoryManager(storage_dir=storage_dir)
+            await manager.initialize()
+            memory_id = await manager.store_memory("The user likes green tea", "preference")
+            appended = manager.log.stats["appended"]
+            for _ in range(50):
+                await manager.retrieve_memories("green tea")
+            during = manager.log.stats["appended"] - appended
+            await manager.close()
+            return memory_id, during
+
+        async def second_run():
+            manager = MemoryManager(storage_dir=storage_dir)
+            await manager.initialize()
+            memory = manager.memories[memory_id]
+            await manager.close()
+            return memory
+
+        memory_id, during = asyncio.run(first_run())
+        memory = asyncio.run(second_run())
+
+    assert during == 0
+    assert memory.access_count == 50 and memory.last_accessed is not None
+    print("✅ 50 retrievals, access count logged once on close")
+
+def test_compaction_bounds_recovery():
+    """Test sealed segments fold into a snapshot so replay stays short"""
+
+    print("\n🗜️ Testing snapshot compaction")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        log = MemoryLog(storage_dir, segment_records=500, compact_segments=2)
+        log.recover()
+        log.start()
+        expected = {}
+        for i in range(10000):
+            memory_id = f"m{i % 2000}"      # Rewrites the same 2000 memories
+            record = {"id": memory_id, "content": f"version {i}"}
+            log.append({"op": "put", "memory": record})
+            expected[memory_id] = record
+        for i in range(0, 2000, 4):
+            log.append({"op": "del", "id": f"m{i}"})
+            expected.pop(f"m{i}")
+        log.close()
+
+        files = os.listdir(storage_dir)
+        segments = [name for name in files if name.startswith("wal-")]
+        recovered = MemoryLog(storage_dir)
+        state = recovered.recover()
+
+    print(f"   {log.stats['written']} entries in {log.stats['commits']} commits, "
+          f"{log.stats['snapshots']} snapshots, {len(segments)} segments left")
+    assert SNAPSHOT_FILE in files and log.stats["snapshots"] >= 1
+    assert len(segments) <= 4
+    assert state == expected
+    print("✅ Recovery reads one snapshot plus a few segments")
+
+def test_store_does_not_wait_for_disk():
+    """Benchmark store_memory with the log on, and recovery time"""
+
+    print("\n⏱️ Benchmarking logged stores and recovery")
+    print("=" * 50)
+
+    count = 20000
+    with tempfile.TemporaryDirectory() as storage_dir:
+        async def store_all():
+            manager = MemoryManager(storage_dir=storage_dir)
+            manager.logger.disabled = True
+            await manager.initialize()
+            start = time.perf_counter()
+            for i in range(count):
+                await manager.store_memory(f"Memory number {i} about project topic {i % 97}", "fact")
+            elapsed = time.perf_counter() - start
+            stats = dict(manager.log.stats)
+            await manager.close()
+            return elapsed, stats
+
+        async def reload():
+            manager = MemoryManager(storage_dir=storage_dir)
+            start = time.perf_counter()
+            await manager.initialize()
+            elapsed = time.perf_counter() - start
+            await manager.close()
+            return elapsed, len(manager.memories)
+
+        store_seconds, stats = asyncio.run(store_all())
+        recovery_seconds, recovered = asyncio.run(reload())
+
+    print(f"   store_memory: {store_seconds / count * 1e6:.1f} µs each, "
+          f"{stats['appended']} entries in {stats['commits']} fsync batches")
+    print(f"   Recovery of {recovered} memories: {recovery_seconds * 1000:.0f} ms")
+    assert recovered == count
+    assert stats["commits"] < count / 10
+    assert store_seconds / count < 0.001
+    print("✅ Stores are queued and committed in groups")
+
+def test_memories_stored_during_recovery_are_kept():
+    """Test memories stored before initialize finishes are merged and logged, not discarded"""
+
+    print("\n🔀 Testing stores during recovery")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        async def seed():
+            manager = MemoryManager(storage_dir=storage_dir)
+            await manager.initialize()
+            memory_id = await manager.store_memory("Recovered from disk", "fact")
+            await manager.close()
+            return memory_id
+
+        async def racing_run():
+            manager = MemoryManager(storage_dir=storage_dir)
+            initializing = asyncio.ensure_future(manager.initialize())
+            early = await manager.store_memory("Stored while recovering", "fact")
+            await initializing
+            ids = set(manager.memories)
+            results = await manager.retrieve_memories("stored while recovering")
+            await manager.close()
+            return early, ids, results
+
+        async def reopen():
+            manager = MemoryManager(storage_dir=storage_dir)
+            await manager.initialize()
+            ids = set(manager.memories)
+            await manager.close()
+            return ids
+
+        recovered = asyncio.run(seed())
+        early, ids, results = asyncio.run(racing_run())
+        reopened = asyncio.run(reopen())
+
+    assert ids == {recovered, early}
+    assert [m.id for m in results][:1] == [early]
+    assert reopened == {recovered, early}
+    print("✅ Early memories merged with recovered ones and persisted")
+
+if __name__ == "__main__":
+    test_memories_survive_restart()
+    test_torn_tail_is_ignored()
+    test_entries_after_a_failed_write_are_kept()
+    test_unserializable_metadata_is_logged()
+    test_access_counts_are_coalesced()
+    test_compaction_bounds_recovery()
+    test_store_does_not_wait_for_disk()
+    test_memories_stored_during_recovery_are_kept()
+    print("\n🎉 Memory persistence tests completed!")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test Memory Retrieval - Verify BM25 ranking over the inverted index and benchmark it
+
+Run directly with a size to benchmark larger stores, e.g.
+    python test_memory_retrieval.py 1000000
+"""
+
+import asyncio
+import itertools
+import random
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.memory.memory_manager import MemoryManager
+
+MEMORY_TYPES = ["conversation", "fact", "task", "preference", "development"]
+
+def test_bm25_ranking_and_partitions():
+    """Test ranking, memory_type filtering and index maintenance"""
+
+    print("🔎 Testing memory retrieval ranking")
+    print("=" * 50)
+
+    async def run():
+        manager = MemoryManager()
+        await manager.store_memory("The user likes green tea in the morning", "preference", importance=0.4)
+        await manager.store_memory("Deploy the JARVIS voice service on Friday", "task", importance=0.9)
+        await manager.store_memory("JARVIS voice latency was high, JARVIS voice needs tuning", "development")
+        await manager.store_memory("The user likes the morning news", "preference", importance=0.05)
+
+        # More query terms matched (and repeated) ranks higher
+        voice = await manager.retrieve_memories("jarvis voice tuning")
+        assert [m.memory_type for m in voice] == ["development", "task"]
+
+        # Partitioned by memory_type
+        tasks = await manager.retrieve_memories("jarvis", memory_type="task")
+        assert [m.memory_type for m in tasks] == ["task"]
+        assert await manager.retrieve_memories("tea", memory_type="task") == []
+
+        # An empty query still lists everything by importance
+        everything = await manager.retrieve_memories("", limit=2)
+        assert [m.importance for m in everything] == [0.9, 0.5]
+
+        # Pruned memories leave the index
+        await manager.consolidate_memories()
+        likes = await manager.retrieve_memories("likes morning")
+        assert [m.content for m in likes] == ["The user likes green tea in the morning"]
+        assert len(manager.index) == len(manager.memories) == 3
+
+    asyncio.run(run())
+    print("✅ BM25 ranking, partitions and pruning work")
+
+def _build_store(size: int, seed: int = 1) -> MemoryManager:
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(20000)]
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))  # Zipf-like
+
+    manager = MemoryManager()
+    manager.logger.disabled = True
+
+    async def fill():
+        for i in range(size):
+            words = rng.choices(vocabulary, cum_weights=cumulative, k=12)
+            await manager.store_memory(" ".join(words), MEMORY_TYPES[i % len(MEMORY_TYPES)],
+                                       importance=rng.random())
+
+    asyncio.run(fill())
+    return manager
+
+def _linear_scan(memories, query: str, limit: int = 10):
+    """The previous retrieval: substring match over every memory, then a full sort"""
+    results = [m for m in memories if query.lower() in m.content.lower()]
+    results.sort(key=lambda m: (m.importance, m.created_at), reverse=True)
+    return results[:limit]
+
+def benchmark(size: int):
+    """Average query latency of the index against a linear scan"""
+
+    start = time.perf_counter()
+    manager = _build_store(size)
+    build_seconds = time.perf_counter() - start
+
+    queries = ["w150 w2000", "w420", "w999 w5000 w80", "w70 w19000"]
+
+    async def indexed():
+        for query in queries:
+            await manager.retrieve_memories(query, limit=10)
+            await manager.retrieve_memories(query, memory_type="fact", limit=10)
+
+    start = time.perf_counter()
+    asyncio.run(indexed())
+    index_ms = (time.perf_counter() - start) / (len(queries) * 2) * 1000
+
+    memories = list(manager.memories.values())
+    start = time.perf_counter()
+    for query in queries:
+        _linear_scan(memories, query)
+    scan_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    print(f"   {size:>9,} memories (built in {build_seconds:.1f}s): "
+          f"index {index_ms:.2f} ms/query, linear scan {scan_ms:.1f} ms/query")
+    return index_ms, scan_ms
+
+def test_retrieval_benchmark():
+    """Benchmark retrieval at 10^5 memories"""
+
+    print("\n⏱️ Benchmarking memory retrieval")
+    print("=" * 50)
+
+    index_ms, scan_ms = benchmark(100_000)
+    assert index_ms < scan_ms / 5
+    print("✅ Indexed retrieval is well below a linear scan")
+
+if __name__ == "__main__":
+    test_bm25_ranking_and_partitions()
+    if len(sys.argv) > 1:
+        print()
+        benchmark(int(sys.argv[1]))
+    else:
+        test_retrieval_benchmark()
+    print("\n🎉 Memory retrieval tests completed!")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test Memory Store - Verify the columnar memory store and measure its footprint
+"""
+
+import asyncio
+import heapq
+import random
+import sys
+import os
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.memory import memory_store
+from core.memory.memory_store import Memory, MemoryStore
+from core.memory.memory_manager import MemoryManager
+
+MEMORY_TYPES = ["conversation", "fact", "task", "preference", "development"]
+
+@dataclass
+class _LegacyMemory:
+    """The record MemoryManager kept per memory before the column store"""
+    id: str
+    content: str
+    memory_type: str
+    importance: float = 0.5
+    metadata: Dict = None
+    created_at: datetime = None
+
+    def __post_init__(self):
+        if self.metadata is None:
+            self.metadata = {}
+        if self.created_at is None:
+            self.created_at = datetime.now()
+
+def _random_memories(count: int, seed: int = 5):
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    return [
+        Memory(id=f"m{i}", content=f"Memory {i}", memory_type=rng.choice(MEMORY_TYPES),
+               importance=round(rng.random(), 3), created_at=start + timedelta(seconds=rng.randrange(10 ** 7)))
+        for i in range(count)
+    ]
+
+def test_round_trip_and_removal():
+    """Test fields survive the columns, types are interned and removal keeps rows consistent"""
+
+    print("🗃️ Testing memory store round trip")
+    print("=" * 50)
+
+    store = MemoryStore()
+    memories = _random_memories(1000)
+    memories[0].metadata = {"source": "chat", "tags": ["tea"]}
+    for memory in memories:
+        store.add(memory)
+
+    restored = store["m0"]
+    assert restored._metadata is None                     # Parsed only when read
+    assert restored.metadata == {"source": "chat", "tags": ["tea"]}
+    assert restored == memories[0]
+    assert store["m1"].importance == memories[1].importance    # float32 column, rounded back
+    assert len(store.type_names) == len(MEMORY_TYPES)
+    assert len({id(store[f"m{i}"].memory_type) for i in range(1000)}) == len(MEMORY_TYPES)   # Shared strings
+
+    for i in range(0, 1000, 3):
+        assert store.remove(f"m{i}") == (f"Memory {i}", memories[i].memory_type)
+    assert len(store) == 666 and "m3" not in store
+    for memory_id in store:
+        assert store[memory_id] == memories[int(memory_id[1:])]
+    print("✅ Round trip, interning and removal work")
+
+def test_vectorized_ranking_matches_reference():
+    """Test filtering and top-k ranking with and without numpy"""
+
+    print("\n📊 Testing vectorized ranking")
+    print("=" * 50)
+
+    store = MemoryStore()
+    memories = _random_memories(5000)
+    for memory in memories:
+        store.add(memory)
+
+    rng = random.Random(9)
+    rows = list(store.rows_of_type("fact"))
+    scores = [float(rng.randrange(20)) for _ in rows]       # Plenty of ties
+    expected_plain = [m.id for m in heapq.nlargest(
+        25, (m for m in memories if m.memory_type == "fact"), key=lambda m: (m.importance, m.created_at))]
+    expected_scored = [memories[rows[i]].id for i in heapq.nlargest(
+        25, range(len(rows)), key=lambda i: (scores[i], memories[rows[i]].importance, memories[rows[i]].created_at))]
+
+    numpy_module = memory_store.np
+    try:
+        for label in ("numpy", "python"):
+            if label == "python":
+                memory_store.np = None
+            elif numpy_module is None:
+                continue
+            rows = list(store.rows_of_type("fact"))
+            assert [m.id for m in store.top(rows, 25)] == expected_plain
+            assert [m.id for m in store.top(rows, 25, scores)] == expected_scored
+            assert list(store.rows_of_type("unknown")) == []
+            print(f"   ✅ {label} path matches the reference ranking")
+    finally:
+        memory_store.np = numpy_module
+
+def test_footprint_and_listing_benchmark():
+    """Measure per-memory overhead and empty-query listing at 10^5 memories"""
+
+    print("\n⏱️ Measuring memory footprint")
+    print("=" * 50)
+
+    count = 100_000
+    ids = [f"{i:032x}" for i in range(count)]
+    contents = [f"Memory {i} about topic {i % 500}" for i in range(count)]
+    now = datetime.now()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    legacy = {ids[i]: _LegacyMemory(ids[i], contents[i], MEMORY_TYPES[i % 5], (i % 100) / 100,
+                                    created_at=now + timedelta(microseconds=i)) for i in range(count)}
+    legacy_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = MemoryStore()
+    for i in range(count):
+        store.add(Memory(ids[i], contents[i], MEMORY_TYPES[i % 5], (i % 100) / 100,
+                         created_at=now + timedelta(microseconds=i)))
+    store_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    print(f"   Dataclass records: {legacy_bytes / count:.0f} bytes/memory besides content")
+    print(f"   Column store:      {store_bytes / count:.0f} bytes/memory besides content "
+          f"({sys.getsizeof(store._rows) / count:.0f} of them the id lookup)")
+    assert store_bytes * 2 < legacy_bytes
+
+    start = time.perf_counter()
+    for _ in range(10):
+        heapq.nlargest(10, (m for m in legacy.values() if m.memory_type == "fact"),
+                       key=lambda m: (m.importance, m.created_at))
+    legacy_ms = (time.perf_counter() - start) * 100
+
+    manager = MemoryManager()
+    manager.memories = store
+
+    async def listing():
+        for _ in range(10):
+            await manager.retrieve_memories("", memory_type="fact", limit=10)
+
+    start = time.perf_counter()
+    asyncio.run(listing())
+    store_ms = (time.perf_counter() - start) * 100
+
+    print(f"   Top 10 'fact' memories: {legacy_ms:.1f} ms scanning records, {store_ms:.1f} ms on columns")
+    print("✅ Footprint measured")
+
+if __name__ == "__main__":
+    test_round_trip_and_removal()
+    test_vectorized_ranking_matches_reference()
+    test_footprint_and_listing_benchmark()
+    print("\n🎉 Memory store tests completed!")
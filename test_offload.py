@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test Offload - Verify large post-processing payloads run off the event loop
+"""
+
+import asyncio
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.optimization.offload import Offloader, OffloadConfig, offloader
+from core.voice.speech_cleaner import speech_cleaner
+from core.engines.execution.result_processor import result_processor
+from modules.tools.base_tool import ToolResult
+
+LOG_LINE = ("Server 10.0.0.1 at https://example.com/api?x=1 replied: status: ok, took 3.14s on 2024-01-02; "
+            "contact admin@example.com or 555-123-4567. Path /var/log/app.log\n")
+
+def test_threshold_routing():
+    """Test small payloads stay inline and large ones go to the pool with the same result"""
+
+    print("📦 Testing offload threshold")
+    print("=" * 50)
+
+    local = Offloader(OffloadConfig(threshold=1000))
+    assert local.config.mode == "process"
+
+    async def run():
+        small = await local.run("clean", speech_cleaner.clean_for_speech, LOG_LINE)
+        large = await local.run("clean", speech_cleaner.clean_for_speech, LOG_LINE * 20)
+        return small, large
+
+    small, large = asyncio.run(run())
+    local.shutdown()
+
+    assert small == speech_cleaner.clean_for_speech(LOG_LINE)
+    assert large == speech_cleaner.clean_for_speech(LOG_LINE * 20)
+
+    stats = local.get_stats()["operations"]["clean"]
+    assert stats["inline_calls"] == 1 and stats["offloaded_calls"] == 1
+    assert stats["offloaded_chars"] == len(LOG_LINE) * 20
+    assert 0 < stats["blocking_seconds_saved"] == stats["worker_seconds"]
+    assert local.get_stats()["blocking_seconds_saved"] == stats["blocking_seconds_saved"]
+    print(f"✅ Small payload inline, large payload offloaded ({stats['worker_seconds'] * 1000:.1f} ms off the loop)")
+
+async def _max_loop_gap(work) -> float:
+    """Longest stall of a 1 ms ticker while work runs"""
+    gaps = []
+    done = asyncio.Event()
+
+    async def ticker():
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    await work()
+    done.set()
+    await task
+    return max(gaps)
+
+def test_large_payload_keeps_loop_responsive():
+    """Test a ~500 KB output no longer freezes other coroutines"""
+
+    print("\n🧊 Testing event loop responsiveness")
+    print("=" * 50)
+
+    text = LOG_LINE * 3500
+    original_config = offloader.config
+
+    async def work():
+        await speech_cleaner.clean_for_speech_async(text)
+        await result_processor.process_result_async(ToolResult(success=True, output=text))
+
+    try:
+        offloader.config = OffloadConfig(mode="inline")
+        inline_gap = asyncio.run(_max_loop_gap(work))
+
+        offloader.config = OffloadConfig(mode="thread")
+        offloaded_before = offloader.get_stats()["offloaded_wall_seconds"]
+        thread_gap = asyncio.run(_max_loop_gap(work))
+        offloaded = offloader.get_stats()["offloaded_wall_seconds"] - offloaded_before
+        offloader.shutdown()
+
+        offloader.config = OffloadConfig(mode="process")
+        saved_before = offloader.get_stats()["blocking_seconds_saved"]
+        asyncio.run(work())    # Start the worker processes outside the measurement
+        process_gap = asyncio.run(_max_loop_gap(work))
+        saved = offloader.get_stats()["blocking_seconds_saved"] - saved_before
+    finally:
+        offloader.shutdown()
+        offloader.config = original_config
+
+    print(f"   Inline: loop stalled up to {inline_gap * 1000:.0f} ms")
+    print(f"   Thread: loop stalled up to {thread_gap * 1000:.0f} ms ({offloaded * 1000:.0f} ms spent in workers)")
+    print(f"   Process: loop stalled up to {process_gap * 1000:.0f} ms ({saved * 1000:.0f} ms of blocking saved)")
+    assert thread_gap < inline_gap / 3
+    assert process_gap < inline_gap / 3
+    assert offloaded > 0 and saved > 0
+    print("✅ Other coroutines keep running during large post-processing")
+
+if __name__ == "__main__":
+    test_threshold_routing()
+    test_large_payload_keeps_loop_responsive()
+    print("\n🎉 Offload tests completed!")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test Prompt Intent - Verify one-pass prompt classification and benchmark it
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm.prompt_intent import classify_prompt, PromptIntent
+
+def test_classification_rules():
+    """Test keyword, whole-word and same-line sequence rules"""
+
+    print("🧭 Testing prompt classification")
+    print("=" * 50)
+
+    cases = [
+        ("Create a portfolio website", PromptIntent(True, "html")),
+        ("Save the report as summary.py", PromptIntent(True, "python")),
+        ("Write a config loader in JSON", PromptIntent(False, "json")),
+        ("Build a full-stack dashboard", PromptIntent(True, "generic")),
+        # Language names only set the type as whole words
+        ("I enjoy jsonify and pythonic code", PromptIntent(True, "generic")),
+        ("Explain how Python works", PromptIntent(False, "python")),
+        ("What is the weather today?", PromptIntent(False, "generic")),
+        # "create ... file" must be on one line
+        ("Create something\nthen tell me about the file", PromptIntent(False, "generic")),
+        # Substrings count, as they always have: "javascript" contains "script"
+        ("Teach me JavaScript", PromptIntent(True, "javascript")),
+    ]
+
+    for prompt, expected in cases:
+        intent = classify_prompt(prompt)
+        assert intent == expected, f"{prompt!r}: {intent}"
+        print(f"   ✅ {prompt[:40]!r} → {intent.is_file_generation}, {intent.file_type}")
+
+def test_classification_benchmark():
+    """Micro-benchmark uncached and cached classification"""
+
+    print("\n⏱️ Benchmarking prompt classification")
+    print("=" * 50)
+
+    prompts = [f"Please tell me about the weather in city {i} and what I should wear" for i in range(300)]
+    prompts += [f"Create a portfolio website for client {i} with a contact page" for i in range(300)]
+
+    classify_prompt.cache_clear()
+    start = time.perf_counter()
+    for prompt in prompts:
+        classify_prompt(prompt)
+    uncached_us = (time.perf_counter() - start) / len(prompts) * 1e6
+
+    start = time.perf_counter()
+    for _ in range(10):
+        for prompt in prompts:
+            classify_prompt(prompt)
+    cached_us = (time.perf_counter() - start) / (len(prompts) * 10) * 1e6
+
+    info = classify_prompt.cache_info()
+    print(f"   Uncached: {uncached_us:.1f} µs/prompt")
+    print(f"   Cached:   {cached_us:.2f} µs/prompt ({info.hits} hits, {info.misses} misses)")
+
+    assert info.misses == len(prompts) and info.hits == len(prompts) * 10
+    assert uncached_us < 500
+    assert cached_us < uncached_us
+    print("✅ Classification benchmark completed")
+
+if __name__ == "__main__":
+    test_classification_rules()
+    test_classification_benchmark()
+    print("\n🎉 Prompt intent tests completed!")
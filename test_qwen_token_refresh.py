@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Test Qwen Token Refresh - Verify background OAuth refresh against a local token endpoint
+"""
+
+import asyncio
+import json
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm.qwen_auth import QwenAuthManager, QwenAuthError
+
+class TokenEndpoint:
+    """Local stand-in for the Qwen OAuth token endpoint"""
+
+    def __init__(self, delay: float = 0.0, status: int = 200):
+        self.requests = []
+        self.delay = delay
+        self.status = status
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                form = urllib.parse.parse_qs(self.rfile.read(length).decode())
+                endpoint.requests.append({k: v[0] for k, v in form.items()})
+                time.sleep(endpoint.delay)
+
+                if endpoint.status == 200:
+                    body = {"access_token": f"access-{len(endpoint.requests)}", "token_type": "Bearer",
+                            "refresh_token": f"refresh-{len(endpoint.requests)}", "expires_in": 3600}
+                else:
+                    body = {"error": "invalid_grant"}
+
+                payload = json.dumps(body).encode()
+                self.send_response(endpoint.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/v1/oauth2/token"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def _write_creds(path: str, access_token: str, expires_in: float, refresh_token: str = "refresh-0"):
+    with open(path, "w") as f:
+        json.dump({
+            "access_token": access_token,
+            "token_type": "Bearer",
+            "refresh_token": refresh_token,
+            "resource_url": "portal.qwen.ai",
+            "expiry_date": int((time.time() + expires_in) * 1000)
+        }, f)
+
+def _manager(creds_path: str, endpoint: TokenEndpoint, **kwargs) -> QwenAuthManager:
+    return QwenAuthManager(creds_path, token_endpoint=endpoint.url, client_id="test-client", **kwargs)
+
+def test_background_refresh_before_expiry():
+    """Test the token is renewed ahead of expiry and written back to disk"""
+
+    print("🔄 Testing background refresh")
+    print("=" * 50)
+
+    endpoint = TokenEndpoint()
+    with tempfile.TemporaryDirectory() as tmp:
+        creds_path = os.path.join(tmp, "oauth_creds.json")
+        _write_creds(creds_path, "access-old", expires_in=60)
+        auth = _manager(creds_path, endpoint, refresh_margin=600, poll_interval=0.05)
+
+        async def run():
+            headers = await auth.get_auth_headers_async()       # never waits on the refresh
+            assert headers["Authorization"] == "Bearer access-old"
+
+            for _ in range(100):
+                if auth.refresh_stats["refreshes"]:
+                    break
+                await asyncio.sleep(0.02)
+            await auth.stop_background_refresh()
+            return await auth.get_auth_headers_async()
+
+        headers = asyncio.run(run())
+
+        assert headers["Authorization"] == "Bearer access-1"
+        assert endpoint.requests[0] == {"grant_type": "refresh_token", "refresh_token": "refresh-0",
+                                        "client_id": "test-client"}
+        with open(creds_path) as f:
+            saved = json.load(f)
+        assert saved["access_token"] == "access-1" and saved["refresh_token"] == "refresh-1"
+        assert saved["expiry_date"] > (time.time() + 3000) * 1000
+
+    endpoint.close()
+    print("✅ Token refreshed in the background and persisted")
+
+def test_concurrent_refreshes_share_one_request():
+    """Test the lock collapses concurrent refreshes into one endpoint call"""
+
+    print("\n🔒 Testing refresh lock")
+    print("=" * 50)
+
+    endpoint = TokenEndpoint(delay=0.1)
+    with tempfile.TemporaryDirectory() as tmp:
+        creds_path = os.path.join(tmp, "oauth_creds.json")
+        _write_creds(creds_path, "access-old", expires_in=-10)    # fully expired
+        auth = _manager(creds_path, endpoint)
+        assert auth.is_authenticated()                             # refreshable, so still usable
+
+        async def run():
+            tokens = await asyncio.gather(*(auth.get_valid_token_async() for _ in range(5)))
+            await auth.stop_background_refresh()
+            return tokens
+
+        tokens = asyncio.run(run())
+
+        assert len(endpoint.requests) == 1
+        assert all(token.access_token == "access-1" for token in tokens)
+
+    endpoint.close()
+    print("✅ Five callers, one refresh")
+
+def test_external_update_and_failures():
+    """Test external credential updates are picked up and failures keep the old token"""
+
+    print("\n👀 Testing credentials file watch")
+    print("=" * 50)
+
+    endpoint = TokenEndpoint(status=400)
+    with tempfile.TemporaryDirectory() as tmp:
+        creds_path = os.path.join(tmp, "oauth_creds.json")
+        _write_creds(creds_path, "access-old", expires_in=3600)
+        auth = _manager(creds_path, endpoint, poll_interval=0.05)
+
+        async def run():
+            auth.get_valid_token()
+            auth.ensure_background_refresh()
+
+            # Another tool refreshes the token on disk
+            await asyncio.sleep(0.05)
+            _write_creds(creds_path, "access-external", expires_in=3600)
+            os.utime(creds_path, (time.time() + 5, time.time() + 5))
+
+            for _ in range(100):
+                if auth.refresh_stats["file_reloads"]:
+                    break
+                await asyncio.sleep(0.02)
+            external = auth.get_valid_token().access_token
+
+            try:
+                await auth.refresh(force=True)
+                raise AssertionError("refresh should fail")
+            except QwenAuthError:
+                pass
+
+            await auth.stop_background_refresh()
+            return external
+
+        external = asyncio.run(run())
+
+        assert external == "access-external"
+        assert auth.get_valid_token().access_token == "access-external"
+        assert auth.refresh_stats["failures"] == 1
+
+    endpoint.close()
+    print("✅ External update loaded, failed refresh kept the current token")
+
+def test_save_keeps_file_mode():
+    """Test rewriting the credentials file keeps its permissions"""
+
+    print("\n🔐 Testing credentials file mode")
+    print("=" * 50)
+
+    endpoint = TokenEndpoint()
+    with tempfile.TemporaryDirectory() as tmp:
+        creds_path = os.path.join(tmp, "oauth_creds.json")
+        _write_creds(creds_path, "access-old", expires_in=3600)
+        os.chmod(creds_path, 0o600)
+        auth = _manager(creds_path, endpoint)
+
+        previous_umask = os.umask(0o022)
+        try:
+            auth._save_token(auth.get_valid_token())
+        finally:
+            os.umask(previous_umask)
+
+        assert stat.S_IMODE(os.stat(creds_path).st_mode) == 0o600
+        assert not os.path.exists(f"{creds_path}.tmp")
+
+    endpoint.close()
+    print("✅ Credentials file still owner-only after a save")
+
+if __name__ == "__main__":
+    test_background_refresh_before_expiry()
+    test_concurrent_refreshes_share_one_request()
+    test_external_update_and_failures()
+    test_save_keeps_file_mode()
+    print("\n🎉 Qwen token refresh tests completed!")
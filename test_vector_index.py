@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Test Vector Index - Verify the embedded Qdrant stand-in and benchmark its search
+"""
+
+import asyncio
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from core.database.vector_index import LocalVectorIndex
+from core.database.database_manager import DatabaseManager, DatabaseConfig, MEMORY_VECTOR_DIMENSION
+
+def _clustered_vectors(count: int, dimension: int, clusters: int = 64, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension))
+    return (centers[rng.integers(clusters, size=count)] + 0.5 * rng.normal(size=(count, dimension))).astype(np.float32)
+
+def _brute_force(vectors, query, limit):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:limit])
+
+def test_exact_search_and_delete():
+    """Test exact cosine ranking, upsert and delete"""
+
+    print("🧮 Testing exact vector search")
+    print("=" * 50)
+
+    vectors = _clustered_vectors(5000, 32)
+    index = LocalVectorIndex(block_rows=1000)   # Several blocks per scan
+    for i, vector in enumerate(vectors):
+        index.upsert(str(i), vector, {"content": f"memory {i}"})
+
+    queries = vectors[:20] + 0.1
+    for query, results in zip(queries, index.search_batch(queries, limit=5)):
+        assert [int(point_id) for point_id, _, _ in results] == _brute_force(vectors, query, 5)
+        scores = [score for _, score, _ in results]
+        assert scores == sorted(scores, reverse=True) and scores[0] <= 1.0001
+
+    point_id, score, payload = index.search(vectors[7], limit=1)[0]
+    assert point_id == "7" and payload == {"content": "memory 7"} and abs(score - 1.0) < 1e-5
+
+    assert index.delete("7") and not index.delete("7")
+    assert "7" not in index and len(index) == 4999
+    assert index.search(vectors[7], limit=1)[0][0] != "7"
+    # The row that filled the gap is still found under its own id
+    assert index.search(vectors[4999], limit=1)[0][0] == "4999"
+
+    index.upsert("4999", vectors[0], {"content": "replaced"})
+    assert len(index) == 4999
+    assert {point_id for point_id, _, _ in index.search(vectors[0], limit=2)} == {"0", "4999"}
+
+    try:
+        index.search([1.0, 2.0], limit=1)
+        assert False, "dimension mismatch should raise"
+    except ValueError:
+        pass
+    print("✅ Exact search matches brute force")
+
+def test_ivf_recall():
+    """Test partitioned search stays close to exact search"""
+
+    print("\n🗂️ Testing IVF partitioned search")
+    print("=" * 50)
+
+    vectors = _clustered_vectors(20000, 64)
+    index = LocalVectorIndex(ivf_lists=32, ivf_probes=4, ivf_min_size=10000)
+    for i, vector in enumerate(vectors):
+        index.upsert(str(i), vector)
+    assert index._centroids is not None
+
+    queries = vectors[:100] + 0.2
+    hits = 0
+    for query, results in zip(queries, index.search_batch(queries, limit=10)):
+        hits += len({int(point_id) for point_id, _, _ in results} & set(_brute_force(vectors, query, 10)))
+    recall = hits / 1000
+
+    print(f"   Recall@10 with 4 of 32 lists probed: {recall:.2f}")
+    assert recall > 0.9
+    print("✅ IVF search recall is high")
+
+def test_database_manager_fallback():
+    """Test save_memory_vector/search_memories work without Qdrant"""
+
+    print("\n🔌 Testing DatabaseManager without Qdrant")
+    print("=" * 50)
+
+    async def run():
+        manager = DatabaseManager()
+        tea = [1.0] + [0.0] * 1535
+        news = [0.0, 1.0] + [0.0] * 1534
+        tea_id = await manager.save_memory_vector("The user likes green tea", tea, "preference")
+        await manager.save_memory_vector("The user reads the news", news, "preference")
+
+        results = await manager.search_memories([0.9, 0.1] + [0.0] * 1534, limit=1)
+        status = await manager.health_check()
+        return tea_id, results, status
+
+    tea_id, results, status = asyncio.run(run())
+    assert results[0]["id"] == tea_id and results[0]["content"] == "The user likes green tea"
+    assert results[0]["memory_type"] == "preference" and results[0]["timestamp"]
+    assert status["local_vectors"] and not status["qdrant"]
+    print("✅ Semantic search works with the embedded index")
+
+def test_persistence_across_restart():
+    """Test vectors saved while Qdrant is down survive a restart"""
+
+    print("\n💾 Testing embedded index persistence")
+    print("=" * 50)
+
+    tea = [1.0] + [0.0] * (MEMORY_VECTOR_DIMENSION - 1)
+
+    async def run(path):
+        manager = DatabaseManager(DatabaseConfig(local_vectors_path=path))
+        tea_id = await manager.save_memory_vector("The user likes green tea", tea, "preference")
+        await manager.close()
+
+        restarted = DatabaseManager(DatabaseConfig(local_vectors_path=path))
+        results = await restarted.search_memories(tea, limit=1)
+        return tea_id, results
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tea_id, results = asyncio.run(run(os.path.join(tmp, "memories.npz")))
+
+    assert results and results[0]["id"] == tea_id
+    assert results[0]["content"] == "The user likes green tea"
+
+    index = LocalVectorIndex(dimension=4)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "small.npz")
+        index.save(path)
+        try:
+            LocalVectorIndex.load(path, dimension=8)
+            assert False, "dimension mismatch should be rejected"
+        except ValueError:
+            pass
+    print("✅ Embedded index reloads after a restart")
+
+def test_search_benchmark():
+    """Benchmark exact and IVF search at 10^5 vectors"""
+
+    print("\n⏱️ Benchmarking vector search")
+    print("=" * 50)
+
+    vectors = _clustered_vectors(100000, 256)
+    queries = vectors[:32] + 0.1
+
+    for label, index in (("exact", LocalVectorIndex()),
+                         ("ivf", LocalVectorIndex(ivf_lists=64, ivf_probes=8, ivf_min_size=50000))):
+        for i, vector in enumerate(vectors):
+            index.upsert(str(i), vector)
+
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query, limit=10)
+        single_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        start = time.perf_counter()
+        index.search_batch(queries, limit=10)
+        batch_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        print(f"   {label:>5}: {single_ms:.2f} ms/query, batched {batch_ms:.2f} ms/query")
+        assert single_ms < 100
+
+    print("✅ Vector search benchmark completed")
+
+if __name__ == "__main__":
+    test_exact_search_and_delete()
+    test_ivf_recall()
+    test_database_manager_fallback()
+    test_persistence_across_restart()
+    test_search_benchmark()
+    print("\n🎉 Vector index tests completed!")